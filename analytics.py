@@ -0,0 +1,206 @@
+"""
+analytics.py - Margin and sales analysis for the MuskieCo management system
+
+This module loads sold line items into NumPy arrays and computes revenue,
+cost, margin and discount leakage per store and per product with vectorized
+grouped sums instead of looping over rows in Python.
+
+Money is kept as integer cents (int64) so totals are exact, and ids are
+stored as int32. Rows are streamed from the server in chunks, so only the
+compact column arrays are held in memory, never the full Python row list.
+
+Return transactions count with negative quantities, so they reduce revenue,
+cost and units.
+"""
+import numpy as np
+
+from export import streaming_cursor
+
+# Rows fetched from the server per chunk
+DEFAULT_CHUNK_SIZE = 100_000
+
+# One row per sold line item; prices as cents and discounts as basis points (1% = 100)
+SALES_COLUMNS_QUERY = """
+    SELECT t.StoreID,
+           ti.ProductID,
+           IF(t.TransactionType = 'Return', -ti.Quantity, ti.Quantity),
+           CAST(ROUND(p.SellPrice * 100) AS SIGNED),
+           CAST(ROUND(p.BuyPrice * 100) AS SIGNED),
+           CAST(ROUND(COALESCE(ti.DiscountPercentageApplied, 0) * 100) AS SIGNED)
+    FROM TransactionItem ti
+    JOIN Transaction t ON t.TransactionID = ti.TransactionID
+    JOIN Product p ON p.ProductID = ti.ProductID
+    WHERE {conditions}
+"""
+
+COLUMN_TYPES = (
+    ("store_id", np.int32),
+    ("product_id", np.int32),
+    ("quantity", np.int64),
+    ("sell_cents", np.int64),
+    ("buy_cents", np.int64),
+    ("discount_bp", np.int64),
+)
+
+
+def load_sales_columns(conn, store_id=None, start=None, end=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Loads sold line items into NumPy column arrays.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        store_id (int): Only load this store; every store when omitted.
+        start (str/date): First purchase date to include.
+        end (str/date): Day after the last purchase date to include.
+        chunk_size (int): Rows fetched and converted per chunk.
+
+    Returns:
+        dict: Column name -> NumPy array for store_id, product_id, quantity,
+              sell_cents, buy_cents and discount_bp.
+    """
+    conditions = ["t.StoreID IS NOT NULL"]
+    params = []
+    if store_id is not None:
+        conditions.append("t.StoreID = %s")
+        params.append(store_id)
+    if start is not None:
+        conditions.append("t.PurchaseDate >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append("t.PurchaseDate < %s")
+        params.append(end)
+
+    # Each chunk is split into the typed columns as it arrives; the columns grow by
+    # doubling and are trimmed in place at the end, so only one chunk is ever held twice
+    columns = {name: np.empty(chunk_size, dtype=dtype) for name, dtype in COLUMN_TYPES}
+    count = 0
+    with streaming_cursor(conn) as cursor:
+        cursor.execute(SALES_COLUMNS_QUERY.format(conditions=" AND ".join(conditions)), params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            chunk = np.array(rows, dtype=np.int64).reshape(-1, len(COLUMN_TYPES))
+            if count + len(chunk) > len(columns["store_id"]):
+                capacity = max(2 * len(columns["store_id"]), count + len(chunk))
+                for array in columns.values():
+                    array.resize(capacity, refcheck=False)
+            for index, (name, _) in enumerate(COLUMN_TYPES):
+                columns[name][count:count + len(chunk)] = chunk[:, index]
+            count += len(chunk)
+
+    for array in columns.values():
+        array.resize(count, refcheck=False)
+    return columns
+
+
+def line_amounts(columns):
+    """
+    Computes per-line money amounts in cents.
+
+    The discount is rounded half away from zero per line, the same way the
+    pricing engine rounds it in SQL.
+
+    Args:
+        columns (dict): Arrays from load_sales_columns().
+
+    Returns:
+        dict: gross, discount, revenue (gross less discount), cost and margin arrays in cents.
+    """
+    quantity = columns["quantity"]
+    gross = quantity * columns["sell_cents"]
+    discount = np.sign(gross) * ((np.abs(gross) * columns["discount_bp"] + 5000) // 10000)
+    revenue = gross - discount
+    cost = quantity * columns["buy_cents"]
+    return {"gross": gross, "discount": discount, "revenue": revenue, "cost": cost, "margin": revenue - cost}
+
+
+def _group_sums(keys, values):
+    # Sum every value array per distinct key; float64 sums of cents stay exact below 2**53
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    sums = {name: np.rint(np.bincount(inverse, weights=array, minlength=len(unique_keys))).astype(np.int64)
+            for name, array in values.items()}
+    return unique_keys, sums
+
+
+def margin_analysis(columns):
+    """
+    Aggregates revenue, cost, margin and discount leakage per product and per store.
+
+    Args:
+        columns (dict): Arrays from load_sales_columns().
+
+    Returns:
+        dict: 'products' and 'stores', each a dictionary of equally long arrays.
+              products has store_id and product_id, stores has store_id; both have
+              units, gross, discount, revenue, cost, margin (cents) plus
+              margin_pct (margin / revenue) and discount_pct (discount / gross).
+    """
+    amounts = line_amounts(columns)
+    values = dict(amounts, units=columns["quantity"])
+
+    # Combine (store, product) into one int64 key so a single np.unique groups both
+    product_keys = (columns["store_id"].astype(np.int64) << 32) | columns["product_id"].astype(np.int64)
+    keys, product_sums = _group_sums(product_keys, values)
+    products = {"store_id": (keys >> 32).astype(np.int32), "product_id": (keys & 0xFFFFFFFF).astype(np.int32)}
+    products.update(product_sums)
+
+    store_keys, store_sums = _group_sums(columns["store_id"], values)
+    stores = {"store_id": store_keys.astype(np.int32)}
+    stores.update(store_sums)
+
+    for group in (products, stores):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            group["margin_pct"] = np.where(group["revenue"] != 0, group["margin"] / group["revenue"], 0.0)
+            group["discount_pct"] = np.where(group["gross"] != 0, group["discount"] / group["gross"], 0.0)
+    return {"products": products, "stores": stores}
+
+
+def get_margin_report(conn, store_id=None, start=None, end=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Loads sales and runs margin_analysis() in one call.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        store_id (int): Only analyse this store; every store when omitted.
+        start (str/date): First purchase date to include.
+        end (str/date): Day after the last purchase date to include.
+        chunk_size (int): Rows fetched per chunk.
+
+    Returns:
+        dict: The result of margin_analysis(), None if an error occurs.
+    """
+    try:
+        return margin_analysis(load_sales_columns(conn, store_id, start, end, chunk_size))
+    except Exception as e:
+        print(f"Error generating margin report: {e}")
+        return None
+
+
+def _money(cents):
+    return f"{cents / 100:,.2f}"
+
+
+def print_margin_report(report, top=20):
+    """
+    Prints per-store totals and the products with the highest margin.
+
+    Args:
+        report (dict): The result of margin_analysis().
+        top (int): Number of products to list.
+    """
+    stores = report["stores"]
+    for i in range(len(stores["store_id"])):
+        print(f"Store {stores['store_id'][i]}: units {stores['units'][i]}, revenue {_money(stores['revenue'][i])}, "
+              f"cost {_money(stores['cost'][i])}, margin {_money(stores['margin'][i])} "
+              f"({stores['margin_pct'][i]:.1%}), discounts {_money(stores['discount'][i])} "
+              f"({stores['discount_pct'][i]:.1%} of gross)")
+
+    products = report["products"]
+    order = np.argsort(-products["margin"], kind="stable")[:top]
+    print(f"--- Top {len(order)} products by margin ---")
+    for i in order:
+        print(f"Store {products['store_id'][i]}, ProductID {products['product_id'][i]}: "
+              f"units {products['units'][i]}, revenue {_money(products['revenue'][i])}, "
+              f"margin {_money(products['margin'][i])} ({products['margin_pct'][i]:.1%}), "
+              f"discounts {_money(products['discount'][i])}")
@@ -0,0 +1,103 @@
+"""
+batch_reports.py - Month-end reports for every store at once
+
+This module runs the monthly sales, annual sales and stock reports for all
+stores in parallel. A bounded pool of worker threads handles one store at a
+time, and each worker borrows its own connection from the connection pool,
+so stores never wait behind each other's queries on a shared socket.
+
+The results are merged into one dictionary keyed by StoreID, with the time
+each report took.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from database import get_all_products_quantity, get_monthly_sales_report, get_sales_report_year
+
+
+def list_store_ids(conn):
+    """
+    Retrieves the ID of every store.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+
+    Returns:
+        list: StoreIDs in ascending order.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT StoreID FROM Store ORDER BY StoreID")
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _store_reports(pool, store_id, year, month, annual_rollup):
+    result = {"store_id": store_id, "timings": {}}
+    started = time.perf_counter()
+    with pool.connection() as conn:
+        result["timings"]["wait"] = time.perf_counter() - started
+        reports = (
+            ("monthly", lambda: get_monthly_sales_report(conn, store_id, year, month, use_rollup=True, verbose=False)),
+            ("annual", lambda: get_sales_report_year(conn, store_id, year, use_rollup=annual_rollup, verbose=False)),
+            ("stock", lambda: get_all_products_quantity(conn, store_id, verbose=False)),
+        )
+        for name, report in reports:
+            report_started = time.perf_counter()
+            result[name] = report()
+            result["timings"][name] = time.perf_counter() - report_started
+    result["timings"]["total"] = time.perf_counter() - started
+    return result
+
+
+def run_store_reports(pool, year, month, store_ids=None, max_workers=4, annual_rollup=True):
+    """
+    Runs the monthly, annual and stock reports for many stores in parallel.
+
+    Args:
+        pool (ConnectionPool): The connection pool; each worker borrows one connection.
+        year (int): The year for the monthly and annual reports.
+        month (int): The month for the monthly report.
+        store_ids (list): Stores to report on; every store when omitted.
+        max_workers (int): Maximum number of stores processed at the same time.
+                           Keep this at or below the pool's max_size.
+        annual_rollup (bool): Build the annual report from the daily rollup
+                              (monthly totals) instead of every line item.
+
+    Returns:
+        dict: StoreID -> dictionary with monthly, annual and stock report results
+              and a timings dictionary (seconds for wait, each report and total).
+              A store whose reports failed has an error entry instead.
+    """
+    if store_ids is None:
+        with pool.connection() as conn:
+            store_ids = list_store_ids(conn)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_store_reports, pool, store_id, year, month, annual_rollup): store_id
+                   for store_id in store_ids}
+        for future in as_completed(futures):
+            store_id = futures[future]
+            try:
+                results[store_id] = future.result()
+            except Exception as e:
+                results[store_id] = {"store_id": store_id, "error": str(e), "timings": {}}
+    return dict(sorted(results.items()))
+
+
+def print_store_reports(results):
+    """
+    Prints a one-line summary per store from run_store_reports().
+
+    Args:
+        results (dict): The merged results returned by run_store_reports().
+    """
+    for store_id, result in results.items():
+        if "error" in result:
+            print(f"Store {store_id}: failed ({result['error']})")
+            continue
+        monthly = result["monthly"][0] if result["monthly"] else (0, None)
+        timings = result["timings"]
+        print(f"Store {store_id}: month transactions {monthly[0]}, month sales {monthly[1]}, "
+              f"annual rows {len(result['annual'] or [])}, products {len(result['stock'] or [])} "
+              f"(monthly {timings['monthly']:.3f}s, annual {timings['annual']:.3f}s, "
+              f"stock {timings['stock']:.3f}s, total {timings['total']:.3f}s)")
@@ -0,0 +1,131 @@
+"""
+cache.py - Size-bounded in-process cache for the MuskieCo management system
+
+LRUCache keeps up to max_entries values, dropping the least recently used
+entry when it is full. Every entry also expires ttl seconds after it was
+stored, so values changed by other registers are picked up eventually even
+without an explicit invalidation.
+
+The cache is thread-safe so the parallel report runner can share it.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+# Returned by get() when a key is not cached, so None can be cached as a value
+MISSING = object()
+
+
+class LRUCache:
+    """
+    A thread-safe least-recently-used cache with a time-to-live.
+
+    Args:
+        max_entries (int): Maximum number of cached values.
+        ttl (float): Seconds a value stays valid; None keeps values until evicted.
+    """
+
+    def __init__(self, max_entries=256, ttl=300.0):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def get(self, key):
+        """
+        Looks up a key.
+
+        Returns:
+            The cached value, or MISSING if the key is not cached or has expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return MISSING
+            value, expires_at = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key, value):
+        """Stores a value, evicting the least recently used entry when the cache is full."""
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def get_or_load(self, key, loader):
+        """
+        Returns the cached value for key, calling loader() and caching its result on a miss.
+
+        Exceptions raised by loader are passed on and nothing is cached.
+        """
+        value = self.get(key)
+        if value is MISSING:
+            value = loader()
+            self.put(key, value)
+        return value
+
+    def invalidate(self, key):
+        """Removes one key; returns True if it was cached."""
+        with self._lock:
+            if self._entries.pop(key, None) is None:
+                return False
+            self._invalidations += 1
+            return True
+
+    def invalidate_where(self, predicate):
+        """
+        Removes every entry whose key satisfies predicate(key).
+
+        Returns:
+            int: The number of entries removed.
+        """
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            self._invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        """Removes every entry."""
+        with self._lock:
+            self._invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Reports cache usage.
+
+        Returns:
+            dict: size, max_entries, hits, misses, hit_rate, evictions, expirations and invalidations.
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidations": self._invalidations,
+            }
@@ -0,0 +1,183 @@
+"""
+checkout.py - Atomic checkout for the MuskieCo management system
+
+This module records a complete sale (or return) in one short database
+transaction: the Transaction row, all of its TransactionItem rows, the stock
+change for every product and the server-computed TotalPrice either all happen
+or none do.
+
+The stock change is appended to the StockMovement journal (see stock.py), so
+the inventory rows themselves are never rewritten by a sale. A sale still has
+to lock the store's StoreInventory rows, in ascending ProductID order (one
+primary-key range), while it checks the current stock, so two registers
+selling overlapping baskets wait for each other instead of deadlocking or
+overselling. To keep that wait short, everything else (the Transaction and
+TransactionItem rows and the pricing) is written first, and the locks, the
+journal rows and the daily rollup row come last, just before commit. The
+checkout runs in READ COMMITTED so the stock read after the locks sees every
+sale committed before them. Returns only add stock and take no inventory
+locks. A failed sale touches nothing.
+"""
+import pymysql
+
+from concurrency import begin_read_committed
+from database import coerce_line_items, insert_transaction_items
+from pricing import LINE_COLUMNS
+from report_cache import invalidate_sales, invalidate_stock
+from rollup import record_transaction
+from stock import append_movements, pending_stock
+
+# MySQL error codes for deadlock and lock wait timeout; both are safe to retry
+RETRYABLE_ERRORS = (1213, 1205)
+
+
+class CheckoutError(Exception):
+    """Raised when a checkout cannot be completed; nothing is written."""
+
+
+class UnknownProductError(CheckoutError):
+    """Raised when products in the basket do not exist or are not sold at the store."""
+
+    def __init__(self, product_ids, store_id):
+        self.product_ids = product_ids
+        super().__init__(f"Products not available at store {store_id}: {', '.join(map(str, product_ids))}")
+
+
+class InsufficientStockError(CheckoutError):
+    """
+    Raised when there is not enough stock for one or more products.
+
+    Attributes:
+        shortages (list): (product_id, requested, available) for every short product.
+    """
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        details = ", ".join(f"product {product_id}: requested {requested}, available {available}"
+                            for product_id, requested, available in shortages)
+        super().__init__(f"Insufficient stock ({details})")
+
+
+def _checkout_once(conn, store_id, customer_id, cashier_id, purchase_date, items, transaction_type):
+    product_ids = [product_id for product_id, _, _ in items]
+    placeholders = ','.join(['%s'] * len(product_ids))
+    carried_query = (f"SELECT ProductID, QuantityInStock FROM StoreInventory "
+                     f"WHERE StoreID = %s AND ProductID IN ({placeholders}) ORDER BY ProductID")
+
+    with conn.cursor() as cursor:
+        # Refuse products the store does not carry before writing anything; no lock is taken yet
+        cursor.execute(carried_query, [store_id] + product_ids)
+        carried = {product_id for product_id, _ in cursor.fetchall()}
+        unknown = [product_id for product_id in product_ids if product_id not in carried]
+        if unknown:
+            raise UnknownProductError(unknown, store_id)
+
+        cursor.execute(
+            "INSERT INTO Transaction (StoreID, CustomerID, CashierID, PurchaseDate, TotalPrice, TransactionType) "
+            "VALUES (%s, %s, %s, %s, 0, %s)",
+            (store_id, customer_id, cashier_id, purchase_date, transaction_type)
+        )
+        transaction_id = cursor.lastrowid
+
+    insert_transaction_items(conn, transaction_id, items)
+
+    with conn.cursor() as cursor:
+        # Price the basket on the server with the same rounding as pricing.py
+        cursor.execute(
+            f"""
+            UPDATE Transaction
+            SET TotalPrice = (SELECT COALESCE(SUM(line.Gross - line.Discount), 0)
+                              FROM (SELECT {LINE_COLUMNS}
+                                    FROM TransactionItem ti
+                                    JOIN Product p ON p.ProductID = ti.ProductID
+                                    WHERE ti.TransactionID = %s) AS line)
+            WHERE TransactionID = %s
+            """,
+            (transaction_id, transaction_id)
+        )
+        cursor.execute("SELECT TotalPrice FROM Transaction WHERE TransactionID = %s", (transaction_id,))
+        total = cursor.fetchone()[0]
+
+        # Rows other registers write to are only touched from here on, so they stay locked just until commit
+        if transaction_type == "Buy":
+            # Lock the store's inventory rows in ascending ProductID order (items are already sorted),
+            # then read the tail; in READ COMMITTED it includes every sale committed before the locks
+            cursor.execute(carried_query + " FOR UPDATE", [store_id] + product_ids)
+            stock = dict(cursor.fetchall())
+            unknown = [product_id for product_id in product_ids if product_id not in stock]
+            if unknown:
+                raise UnknownProductError(unknown, store_id)
+            pending = pending_stock(cursor, store_id, product_ids)
+            shortages = [(product_id, quantity, stock[product_id] + pending.get(product_id, 0))
+                         for product_id, quantity, _ in items
+                         if quantity > stock[product_id] + pending.get(product_id, 0)]
+            if shortages:
+                raise InsufficientStockError(shortages)
+
+        # Journal the stock change: sales take stock out, returns put it back
+        sign, movement_type = (-1, "Sale") if transaction_type == "Buy" else (1, "Return")
+        append_movements(cursor, [(store_id, product_id, movement_type, sign * quantity, transaction_id, None)
+                                  for product_id, quantity, _ in items])
+
+        # Keep the daily sales rollup in step with the sale; every sale of the store that day
+        # updates this row, so it is the last statement
+        units = sum(quantity for _, quantity, _ in items)
+        record_transaction(cursor, store_id, purchase_date, total, transaction_type, units)
+
+    return {
+        "transaction_id": transaction_id,
+        "total": total,
+        "items": len(items),
+        "units": units,
+    }
+
+
+def checkout(conn, store_id, customer_id, cashier_id, purchase_date, product_entries,
+             transaction_type="Buy", retries=3):
+    """
+    Records a complete sale or return in a single database transaction.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        store_id (int): The ID of the store where the transaction takes place.
+        customer_id (int): The ID of the customer.
+        cashier_id (int): The ID of the cashier processing the transaction.
+        purchase_date (str/date): The date of the transaction.
+        product_entries (list): Dictionaries with product_id, quantity and discount,
+                                as collected by transactions.py.
+        transaction_type (str): 'Buy' removes stock, 'Return' puts it back.
+        retries (int): Attempts made when MySQL reports a deadlock or lock wait timeout.
+
+    Returns:
+        dict: transaction_id, total, items (number of lines) and units.
+
+    Raises:
+        ValueError: If the basket entries are invalid.
+        UnknownProductError: If a product does not exist or the store does not carry it.
+        InsufficientStockError: If a Buy needs more stock than is available.
+        CheckoutError: If the basket is empty or the transaction type is unknown.
+    """
+    if transaction_type not in ("Buy", "Return"):
+        raise CheckoutError(f"Unknown transaction type: {transaction_type}")
+    items = coerce_line_items(product_entries)
+    if not items:
+        raise CheckoutError("A checkout needs at least one product")
+    store_id = int(store_id)
+
+    for attempt in range(1, retries + 1):
+        try:
+            begin_read_committed(conn)
+            result = _checkout_once(conn, store_id, customer_id, cashier_id, purchase_date, items, transaction_type)
+            conn.commit()
+            # Cached reports for this store's sales on that day and its stock are now out of date
+            invalidate_sales(store_id, purchase_date)
+            invalidate_stock(store_id)
+            return result
+        except pymysql.err.OperationalError as e:
+            conn.rollback()
+            if e.args[0] in RETRYABLE_ERRORS and attempt < retries:
+                continue
+            raise
+        except Exception:
+            conn.rollback()
+            raise
@@ -0,0 +1,211 @@
+"""
+concurrency.py - Optimistic concurrency for product, customer and staff updates
+
+Product, Customer and Staff rows carry a RowVersion column that every update
+increments. An update states the version it was based on and only succeeds if
+the row still has that version (compare-and-set), so two registers editing the
+same row can no longer silently overwrite each other. Only the columns that
+actually changed are written.
+
+Menu edits go through update_fields_with_retry(). A field edit sets columns
+to the values that were typed, so it does not depend on the rest of the row:
+when another writer got there first, the row is read again and, if that
+writer left the edited columns alone, the edit is re-applied on the new
+version (a few times at most). Only an edit of the same column is refused.
+
+Stock is not updated here: it lives in StoreInventory and only changes
+through the movement journal in stock.py. Writers that lock rows and then
+need to see every change committed before the lock was granted (checkout,
+stock compaction) start their transaction with begin_read_committed().
+
+Jobs that fold an append-only table into totals (stock compaction, reward
+point accrual) keep their position in a single-row watermark table and
+process the rows after it with run_watermark_batches().
+"""
+# Key column and the other columns in row order, per versioned table
+VERSIONED_TABLES = {
+    "Product": ("ProductID", ("ProductName", "BuyPrice", "SellPrice")),
+    "Customer": ("CustomerID", ("FirstName", "LastName", "Email", "PhoneNumber", "HomeAddress",
+                                "IsActive", "SignUpDate", "RewardPoints")),
+    "Staff": ("StaffID", ("StoreID", "Name", "Age", "HomeAddress", "PhoneNumber", "Email", "StartDate")),
+}
+
+
+# Attempts made by update_fields_with_retry() before giving up
+UPDATE_ATTEMPTS = 3
+
+
+class ConcurrentUpdateError(Exception):
+    """Raised when a row keeps changing underneath an update."""
+
+
+def begin_read_committed(conn):
+    """
+    Starts a READ COMMITTED transaction on the connection.
+
+    Every read in it sees the latest committed data, not a snapshot taken at
+    the transaction's first read, and locking reads take no gap locks. MySQL
+    refuses SET TRANSACTION inside an open transaction, so any transaction
+    left open on the connection is committed first.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+    """
+    conn.commit()
+    with conn.cursor() as cursor:
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL READ COMMITTED")
+    conn.begin()
+
+
+def run_watermark_batches(conn, lock_query, batch_query, advance_query, apply_batch, batch_size):
+    """
+    Processes the rows after a watermark in batches, moving the watermark with each batch.
+
+    Each batch is one short READ COMMITTED transaction: the watermark row is
+    locked (so copies of the job take turns), the next batch_size rows after
+    it are read with a locking read, apply_batch() writes their effect and the
+    watermark moves to the batch's last ID, all committed together. A row is
+    therefore processed exactly once, even if the job stops part way. The
+    locking read waits for rows that were inserted but not yet committed
+    (their IDs may be below ones already committed), so none is passed over;
+    without gap locks, new rows can still be appended meanwhile.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        lock_query (str): Selects the watermark, locking its row (FOR UPDATE).
+        batch_query (str): Selects up to %s rows with an ID above %s, ID first, in ID order,
+                           with a locking read (FOR SHARE); parameters are (watermark, limit).
+        advance_query (str): Moves the watermark; parameters are (new watermark, rows in the batch).
+        apply_batch (callable): Takes a cursor and the batch's rows and writes their effect;
+                                returns how many target rows it changed.
+        batch_size (int): Maximum rows per transaction.
+
+    Returns:
+        dict: rows (processed), changed (sum of apply_batch results), batches and watermark.
+
+    Raises:
+        Exception: Database errors are passed on after the current batch is rolled back.
+    """
+    summary = {"rows": 0, "changed": 0, "batches": 0, "watermark": None}
+    while True:
+        try:
+            begin_read_committed(conn)
+            with conn.cursor() as cursor:
+                cursor.execute(lock_query)
+                watermark = cursor.fetchone()[0]
+                cursor.execute(batch_query, (watermark, batch_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    conn.commit()
+                    summary["watermark"] = watermark
+                    return summary
+                changed = apply_batch(cursor, rows)
+                watermark = rows[-1][0]
+                cursor.execute(advance_query, (watermark, len(rows)))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        summary["rows"] += len(rows)
+        summary["changed"] += changed
+        summary["batches"] += 1
+        summary["watermark"] = watermark
+
+
+def _table(table):
+    if table not in VERSIONED_TABLES:
+        raise ValueError(f"{table} does not support versioned updates")
+    return VERSIONED_TABLES[table]
+
+
+def compare_and_set(conn, table, key, changes, expected_version):
+    """
+    Writes only the changed columns if the row still has the expected version.
+
+    The caller commits.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        table (str): 'Product', 'Customer' or 'Staff'.
+        key: The primary key value.
+        changes (dict): Column name -> new value, only for columns that changed.
+        expected_version (int): The RowVersion the changes were based on.
+
+    Returns:
+        bool: True if the row was updated, False if it changed or was deleted in the meantime.
+
+    Raises:
+        ValueError: If a column cannot be updated through this function.
+    """
+    key_column, columns = _table(table)
+    unknown = [column for column in changes if column not in columns]
+    if unknown:
+        raise ValueError(f"Cannot update {table} columns: {', '.join(unknown)}")
+    assignments = "".join(f"{column} = %s, " for column in changes)
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET {assignments}RowVersion = RowVersion + 1 "
+            f"WHERE {key_column} = %s AND RowVersion = %s",
+            list(changes.values()) + [key, expected_version]
+        )
+        # RowVersion always changes, so a matched row always counts as affected
+        return cursor.rowcount == 1
+
+
+def update_fields_with_retry(conn, table, key, changes, original, attempts=UPDATE_ATTEMPTS):
+    """
+    Writes field edits with compare-and-set, retrying when only other columns changed.
+
+    When the row is no longer at the version it was read at, it is read again.
+    If none of the edited columns changed since, the edit is applied on the new
+    version; if one did, the other writer's value is kept and the edit refused.
+    The caller commits after True and rolls back otherwise.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        table (str): 'Product', 'Customer' or 'Staff'.
+        key: The primary key value.
+        changes (dict): Column name -> new value, only for columns that changed.
+        original (tuple): The row the edits were made to, as returned by SELECT *
+                          (key first, RowVersion last).
+        attempts (int): Compare-and-set attempts before giving up.
+
+    Returns:
+        bool: True if the row was updated, False if an edited column was changed by
+              someone else or the row was deleted.
+
+    Raises:
+        ConcurrentUpdateError: If the row changed again before every attempt.
+    """
+    key_column, columns = _table(table)
+    seen = {column: original[index] for index, column in enumerate(columns, start=1) if column in changes}
+    expected_version = original[len(columns) + 1]
+    for _ in range(attempts):
+        if compare_and_set(conn, table, key, changes, expected_version):
+            return True
+        # End the transaction first so the re-read sees the other writer's commit
+        conn.rollback()
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT {', '.join(seen)}, RowVersion FROM {table} WHERE {key_column} = %s", (key,))
+            row = cursor.fetchone()
+        if row is None or any(current != seen[column] for column, current in zip(seen, row)):
+            return False
+        expected_version = row[-1]
+    raise ConcurrentUpdateError(f"{table} {key} kept changing; gave up after {attempts} attempts")
+
+
+def changed_columns(table, original, edited):
+    """
+    Compares a row as read with an edited copy and returns only the differences.
+
+    Args:
+        table (str): 'Product', 'Customer' or 'Staff'.
+        original (tuple): The row as returned by SELECT * (key first, RowVersion last).
+        edited (list): The same row after editing.
+
+    Returns:
+        dict: Column name -> new value for every updatable column that changed.
+    """
+    _, columns = _table(table)
+    return {column: edited[index] for index, column in enumerate(columns, start=1)
+            if edited[index] != original[index]}
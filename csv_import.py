@@ -0,0 +1,105 @@
+"""
+csv_import.py - Chunked CSV import for the MuskieCo management system
+
+import_csv() is the driver shared by the product and customer imports. The
+file is read row by row; each row is checked by the caller's validate
+function, and the rows that pass are handed to the caller's write function in
+chunks, each chunk in its own database transaction. A chunk the database
+rejects is rolled back and counted as failed without stopping the import, so
+one bad chunk costs at most chunk_size rows.
+
+Only the current chunk and the first MAX_REPORTED_ERRORS rejections are kept,
+so the driver's memory use does not grow with the file; state a validate
+function keeps across rows is the caller's own.
+"""
+import csv
+import time
+
+# Rows sent and committed per chunk
+IMPORT_CHUNK_SIZE = 1000
+
+# Rejected rows whose line number and reason are kept for the import summary
+MAX_REPORTED_ERRORS = 100
+
+# Rejected rows printed at the end of an import
+PRINTED_ERRORS = 20
+
+
+def import_csv(conn, path, columns, validate, write, chunk_size=IMPORT_CHUNK_SIZE, label="rows"):
+    """
+    Streams a CSV file into the database in chunks.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        path (str): The CSV file to import.
+        columns (tuple): Columns the header must contain.
+        validate (callable): Takes one row from csv.DictReader and returns the record to write;
+                             raises ValueError to reject the row.
+        write (callable): Takes a cursor, the chunk as (line number, record) tuples and a
+                          reject(line_num, message) function for rows that clash with the
+                          database; writes the other rows. Runs inside a transaction that
+                          is committed afterwards, or rolled back if it raises.
+        chunk_size (int): Rows per write call and commit.
+        label (str): What the rows are, for the progress lines.
+
+    Returns:
+        dict: imported, rejected and failed (rows in rolled back chunks) counts,
+              errors ((line number, message) tuples for the first rejected rows),
+              seconds and rows_per_sec. None if the file cannot be read.
+    """
+    summary = {"imported": 0, "rejected": 0, "failed": 0, "errors": []}
+    started = time.perf_counter()
+
+    def reject(line_num, message):
+        summary["rejected"] += 1
+        # Keep only the first errors so a bad file cannot fill memory
+        if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+            summary["errors"].append((line_num, message))
+
+    def flush(chunk):
+        rejected_before = summary["rejected"]
+        try:
+            conn.begin()
+            with conn.cursor() as cursor:
+                write(cursor, chunk, reject)
+            conn.commit()
+            summary["imported"] += len(chunk) - (summary["rejected"] - rejected_before)
+        except Exception as e:
+            conn.rollback()
+            failed = len(chunk) - (summary["rejected"] - rejected_before)
+            summary["failed"] += failed
+            print(f"Chunk of {failed} rows failed and was rolled back: {e}")
+        elapsed = time.perf_counter() - started
+        print(f"{summary['imported']} {label} imported ({summary['imported'] / elapsed:,.0f} rows/sec)")
+
+    try:
+        chunk = []
+        with open(path, newline="", encoding="utf-8") as file:
+            reader = csv.DictReader(file)
+            missing = [column for column in columns if column not in (reader.fieldnames or [])]
+            if missing:
+                print(f"Import file is missing columns: {', '.join(missing)}")
+                return None
+            for row in reader:
+                try:
+                    record = validate(row)
+                except ValueError as e:
+                    reject(reader.line_num, str(e))
+                    continue
+                chunk.append((reader.line_num, record))
+                if len(chunk) >= chunk_size:
+                    flush(chunk)
+                    chunk = []
+        if chunk:
+            flush(chunk)
+    except OSError as e:
+        print(f"Error reading import file: {e}")
+        return None
+
+    summary["seconds"] = time.perf_counter() - started
+    summary["rows_per_sec"] = summary["imported"] / summary["seconds"] if summary["seconds"] else 0.0
+    for line_num, message in summary["errors"][:PRINTED_ERRORS]:
+        print(f"Line {line_num} rejected: {message}")
+    print(f"Import finished: {summary['imported']} imported, {summary['rejected']} rejected, "
+          f"{summary['failed']} in failed chunks, {summary['rows_per_sec']:,.0f} rows/sec")
+    return summary
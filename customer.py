@@ -6,7 +6,35 @@ Customer management module for MuskieCo retail management system.
 This module provides functions to perform CRUD operations on customer data,
 including adding new customers, updating existing customer information,
 deleting customers, and searching for customer records in the database.
+
+Updates are optimistic: only the fields that changed are written, and only if
+no one else updated the customer since it was read (see concurrency.py).
+
+Large customer lists are loaded with import_customers_csv() and written out
+with export_customers(); both stream, so memory use does not grow with the
+number of customers.
+
+Emails are stored lower-cased and phone numbers as digits only, so a customer
+can be found at the till by either, however it is typed, through the UNIQUE
+indexes on those columns. Names are found approximately through the
+in-process index in customer_search.py, which the functions here keep current.
 """
+import re
+import time
+from datetime import date
+
+from concurrency import ConcurrentUpdateError, changed_columns, update_fields_with_retry
+from csv_import import IMPORT_CHUNK_SIZE, import_csv
+from customer_search import name_index, search_names
+from export import DEFAULT_BATCH_SIZE, export_query
+
+# Columns of an import or export file, in Customer table order
+CUSTOMER_COLUMNS = ("CustomerID", "FirstName", "LastName", "Email", "PhoneNumber", "HomeAddress",
+                    "IsActive", "SignUpDate", "RewardPoints")
+
+# Accepted spellings of IsActive in an import file
+TRUE_VALUES = {"1", "true", "yes", "y"}
+FALSE_VALUES = {"0", "false", "no", "n"}
 
 def customer(conn):
     """
@@ -20,13 +48,17 @@ def customer(conn):
     1. Add a new customer with all required information
     2. Update an existing customer's information
     3. Delete a customer from the database
-    4. Find and display customer information
+    4. Find and display customer information by ID, email, phone number or name
+    5. Import customers from a CSV file
+    6. Export customers to a CSV or JSON Lines file
     """
     # Display customer management menu options
     print("1. Add Customer")
     print("2. Update Customer")
     print("3. Delete Customer")
     print("4. Find Customer")
+    print("5. Import Customers from CSV")
+    print("6. Export Customers")
     choice = input("Enter the number corresponding to your choice: ")
     
     # Process user choice using Python 3.10+ pattern matching
@@ -96,9 +128,9 @@ def customer(conn):
                 case "8":
                     customer[8] = int(input("Enter new reward points: "))
             
-            # Call update_customer with all customer data (modified and unmodified)
-            update_customer(conn, customer[0], customer[1], customer[2], customer[3], 
-                           customer[4], customer[5], customer[6], customer[7], customer[8])
+            # Write only the changed field, and only if no one else changed that field since we read it
+            update_customer_fields(conn, customer[0], changed_columns("Customer", customer_data, customer),
+                                   customer_data)
             
         # Option 3: Delete a customer from the database
         case "3":
@@ -107,8 +139,37 @@ def customer(conn):
             
         # Option 4: Find and display customer information
         case "4":
-            # Get customer ID and call search function
-            search_customer(conn, int(input("Enter Customer ID: ")))
+            print("Find by:")
+            print("1. Customer ID")
+            print("2. Email")
+            print("3. Phone Number")
+            print("4. Name")
+            match input("Enter choice: "):
+                case "1":
+                    search_customer(conn, int(input("Enter Customer ID: ")))
+                case "2":
+                    search_customer_by_email(conn, input("Enter email: "))
+                case "3":
+                    search_customer_by_phone(conn, input("Enter phone number: "))
+                case "4":
+                    search_customers_by_name(conn, input("Enter name: "))
+
+        # Option 5: Load a customer list from a CSV file
+        # The file needs a header row with every column in CUSTOMER_COLUMNS
+        case "5":
+            path = input("Enter CSV file path: ")
+            upsert = input("Update customers that already exist? (y/n): ").lower() == "y"
+            import_customers_csv(conn, path, upsert=upsert)
+
+        # Option 6: Write every customer to a file, e.g. for a mailing
+        case "6":
+            path = input("Enter output file path: ")
+            fmt = input("Format (csv/jsonl): ").lower() or "csv"
+            active_only = input("Active customers only? (y/n): ").lower() == "y"
+            try:
+                export_customers(conn, path, fmt, active_only)
+            except Exception as e:
+                print(f"Error exporting customers: {e}")
 
 def update_customer(conn, CustomerID, first_name, last_name, email, phonenumber, homeaddress, isActive, signupdate, rewardspoints):
     """
@@ -130,18 +191,72 @@ def update_customer(conn, CustomerID, first_name, last_name, email, phonenumber,
         None: Displays success or error message
     """
     try:
+        # Store contact details in the form the lookups search for
+        email, phonenumber = normalize_email(email), normalize_phone(phonenumber)
         # Use a cursor to execute the SQL UPDATE statement
         with conn.cursor() as cursor:
             # Prepare SQL statement with placeholders for safe parameter insertion
-            cursor.execute("UPDATE Customer SET FirstName = %s, LastName = %s, Email = %s, PhoneNumber = %s, HomeAddress = %s, IsActive = %s, SignUpdate = %s, RewardPoints = %s WHERE CustomerID = %s",
+            # RowVersion is bumped so versioned updates based on the old row are rejected
+            cursor.execute("UPDATE Customer SET FirstName = %s, LastName = %s, Email = %s, PhoneNumber = %s, HomeAddress = %s, IsActive = %s, SignUpdate = %s, RewardPoints = %s, RowVersion = RowVersion + 1 WHERE CustomerID = %s",
                            (first_name, last_name, email, phonenumber, homeaddress, isActive, signupdate, rewardspoints, CustomerID))
             # Commit the transaction to save changes to the database
             conn.commit()
+            name_index.add(CustomerID, first_name, last_name)
             print("Customer updated successfully.")
     except Exception as e:
         # Catch and display any errors that occur during the update
         print(f"Error updating customer: {e}")
 
+def update_customer_fields(conn, CustomerID, changes, original):
+    """
+    Updates only the given customer fields, if no one else changed them since the customer was read.
+    
+    If another update changed only other fields, it is kept and this update is
+    retried on top of it (see concurrency.py).
+    
+    Args:
+        conn: Database connection object
+        CustomerID: Unique identifier for the customer (primary key)
+        changes: Dictionary of column name -> new value, e.g. {"Email": "new@example.com"}
+        original: The customer row the changes were based on, as read (RowVersion last)
+        
+    Returns:
+        bool: True if the customer was updated (or nothing changed), False otherwise
+    """
+    if not changes:
+        print("Nothing to update.")
+        return True
+    # Store contact details in the form the lookups search for
+    changes = dict(changes)
+    if "Email" in changes:
+        changes["Email"] = normalize_email(changes["Email"])
+    if "PhoneNumber" in changes:
+        changes["PhoneNumber"] = normalize_phone(changes["PhoneNumber"])
+    try:
+        if update_fields_with_retry(conn, "Customer", CustomerID, changes, original):
+            conn.commit()
+            if "FirstName" in changes or "LastName" in changes:
+                # Re-index with both halves of the name as now stored
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT FirstName, LastName FROM Customer WHERE CustomerID = %s", (CustomerID,))
+                    row = cursor.fetchone()
+                if row:
+                    name_index.add(CustomerID, row[0], row[1])
+            print("Customer updated successfully.")
+            return True
+        # Someone else updated (or deleted) the customer after we read it
+        conn.rollback()
+        print("Customer was changed by someone else. Please reload it and try again.")
+        return False
+    except ConcurrentUpdateError as e:
+        conn.rollback()
+        print(f"{e}. Please try again.")
+        return False
+    except Exception as e:
+        conn.rollback()
+        print(f"Error updating customer: {e}")
+        return False
+
 def delete_customer(conn, CustomerID):
     """
     Deletes a customer from the database based on CustomerID.
@@ -160,6 +275,7 @@ def delete_customer(conn, CustomerID):
             cursor.execute("DELETE FROM Customer WHERE CustomerID = %s", (CustomerID,))
             # Commit the transaction to save changes to the database
             conn.commit()
+            name_index.remove(CustomerID)
             print("Customer deleted successfully.")
     except Exception as e:
         # Catch and display any errors that occur during the deletion
@@ -199,6 +315,112 @@ def search_customer(conn, CustomerID):
         print(f"Error searching for customer: {e}")
         return None
 
+def normalize_email(email):
+    """
+    Brings an email address into its stored form: trimmed and lower-cased.
+    
+    Args:
+        email: Email address as typed, or None
+        
+    Returns:
+        str: The normalized address, None if it is blank
+    """
+    email = (email or "").strip().lower()
+    return email or None
+
+def normalize_phone(phonenumber):
+    """
+    Brings a phone number into its stored form: digits only.
+    
+    Args:
+        phonenumber: Phone number as typed (spaces, dashes, brackets and '+' are dropped), or None
+        
+    Returns:
+        str: The digits, None if there are none
+    """
+    digits = re.sub(r"\D", "", phonenumber or "")
+    return digits or None
+
+def _find_customer(conn, column, value, label):
+    # One lookup on a UNIQUE column; prints and returns the customer like search_customer()
+    if value is None:
+        print(f"Please enter a {label}.")
+        return None
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT * FROM Customer WHERE {column} = %s", (value,))
+            customer = cursor.fetchone()
+            if customer:
+                print(customer)
+                return customer
+            print("Customer not found.")
+            return None
+    except Exception as e:
+        print(f"Error searching for customer: {e}")
+        return None
+
+def search_customer_by_email(conn, email):
+    """
+    Finds a customer by email address, however it is capitalised or padded.
+    
+    Args:
+        conn: Database connection object
+        email: Email address as given by the customer
+        
+    Returns:
+        tuple: Customer data if found
+        None: If no customer has that email address
+    """
+    return _find_customer(conn, "Email", normalize_email(email), "email address")
+
+def search_customer_by_phone(conn, phonenumber):
+    """
+    Finds a customer by phone number, ignoring spaces, dashes and other punctuation.
+    
+    Args:
+        conn: Database connection object
+        phonenumber: Phone number as given by the customer
+        
+    Returns:
+        tuple: Customer data if found
+        None: If no customer has that phone number
+    """
+    return _find_customer(conn, "PhoneNumber", normalize_phone(phonenumber), "phone number")
+
+def search_customers_by_name(conn, name, limit=10):
+    """
+    Finds customers whose name is close to the given one, best matches first.
+    
+    The in-memory name index (see customer_search.py) picks the matches; their
+    rows are then read with one primary-key lookup.
+    
+    Args:
+        conn: Database connection object
+        name: Full name or part of it, possibly misspelled
+        limit: Maximum number of customers returned
+        
+    Returns:
+        list: Customer data tuples, best match first (empty if none match)
+        None: If an error occurs
+    """
+    try:
+        matches = search_names(conn, name, limit)
+        if not matches:
+            print("No matching customers found.")
+            return []
+        ids = [customer_id for customer_id, _, _ in matches]
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT * FROM Customer WHERE CustomerID IN ({','.join(['%s'] * len(ids))})", ids)
+            rows = {row[0]: row for row in cursor.fetchall()}
+        # Customers deleted by another register since the index was built are skipped
+        customers = [rows[customer_id] for customer_id in ids if customer_id in rows]
+        for customer in customers:
+            print(customer)
+        return customers
+    except Exception as e:
+        print(f"Error searching for customer: {e}")
+        return None
+
 def create_customer(conn, CustomerID, first_name, last_name, email, phonenumber, homeaddress, isActive, signupdate, rewardspoints):
     """
     Creates a new customer record in the database.
@@ -219,6 +441,8 @@ def create_customer(conn, CustomerID, first_name, last_name, email, phonenumber,
         None: Displays success or error message
     """
     try:
+        # Store contact details in the form the lookups search for
+        email, phonenumber = normalize_email(email), normalize_phone(phonenumber)
         # Use a cursor to execute the SQL INSERT statement
         with conn.cursor() as cursor:
             # Prepare SQL statement with placeholders for safe parameter insertion
@@ -226,8 +450,175 @@ def create_customer(conn, CustomerID, first_name, last_name, email, phonenumber,
                            , (CustomerID, first_name, last_name, email, phonenumber, homeaddress, isActive, signupdate, rewardspoints))
             # Commit the transaction to save changes to the database
             conn.commit()
+            name_index.add(CustomerID, first_name, last_name)
             print("Customer created successfully.")
     except Exception as e:
         # Catch and display any errors that occur during creation
         # Common errors might include duplicate CustomerID or constraint violations
-        print(f"Error creating customer: {e}")
\ No newline at end of file
+        print(f"Error creating customer: {e}")
+
+def _optional(value, max_length, column):
+    # Blank values are stored as NULL, which the UNIQUE indexes allow any number of times
+    value = (value or "").strip()
+    if len(value) > max_length:
+        raise ValueError(f"{column} must be at most {max_length} characters")
+    return value or None
+
+def validate_customer_row(row):
+    """
+    Converts and checks one CSV row against the Customer table's constraints.
+    
+    Uniqueness of Email and PhoneNumber is checked per chunk by import_customers_csv().
+    
+    Args:
+        row: One row from csv.DictReader
+        
+    Returns:
+        tuple: Values in CUSTOMER_COLUMNS order
+        
+    Raises:
+        ValueError: If a value is missing, has the wrong type or breaks a constraint
+    """
+    try:
+        customer_id = int(row["CustomerID"])
+        reward_points = int(row["RewardPoints"] or 0)
+    except (TypeError, ValueError):
+        raise ValueError("CustomerID and RewardPoints must be whole numbers")
+    first_name = (row["FirstName"] or "").strip()
+    last_name = (row["LastName"] or "").strip()
+    if not 1 <= len(first_name) <= 50 or not 1 <= len(last_name) <= 50:
+        raise ValueError("FirstName and LastName must be 1 to 50 characters")
+    email = normalize_email(_optional(row["Email"], 100, "Email"))
+    if email and "@" not in email:
+        raise ValueError(f"Email {email} is not an email address")
+    phone_number = normalize_phone(row["PhoneNumber"])
+    if phone_number and len(phone_number) > 15:
+        raise ValueError("PhoneNumber must be at most 15 digits")
+    home_address = _optional(row["HomeAddress"], 255, "HomeAddress")
+    is_active = (row["IsActive"] or "").strip().lower()
+    if is_active and is_active not in TRUE_VALUES | FALSE_VALUES:
+        raise ValueError("IsActive must be true or false")
+    signup_date = (row["SignUpDate"] or "").strip() or None
+    if signup_date:
+        try:
+            date.fromisoformat(signup_date)
+        except ValueError:
+            raise ValueError("SignUpDate must be a date (YYYY-MM-DD)")
+    if reward_points < 0:
+        raise ValueError("RewardPoints must be 0 or more")
+    # New customers are active unless the file says otherwise
+    return (customer_id, first_name, last_name, email, phone_number, home_address,
+            is_active not in FALSE_VALUES, signup_date, reward_points)
+
+def _owners(cursor, column, values):
+    # Which customers already hold these Email or PhoneNumber values, via the column's UNIQUE index
+    if not values:
+        return {}
+    cursor.execute(f"SELECT {column}, CustomerID FROM Customer WHERE {column} IN ({','.join(['%s'] * len(values))})",
+                   values)
+    # Emails compare case-insensitively, as the column's collation does, even if stored before normalizing
+    return {value.lower(): customer_id for value, customer_id in cursor.fetchall()}
+
+def import_customers_csv(conn, path, chunk_size=IMPORT_CHUNK_SIZE, upsert=False):
+    """
+    Streams customers from a CSV file into the Customer table.
+    
+    The file is read row by row and validated client-side; valid rows are sent
+    as multi-row INSERT statements of chunk_size rows, each chunk committed on
+    its own. Before a chunk is sent, its Emails and PhoneNumbers are checked
+    against each other and, through the UNIQUE indexes, against every customer
+    already in the table, including those from earlier chunks. Rows that clash
+    are rejected one by one, so memory use stays the same however long the file
+    is. A chunk the database still rejects is rolled back and reported without
+    stopping the import.
+    
+    Args:
+        conn: Database connection object
+        path: The CSV file to import; the header must contain CUSTOMER_COLUMNS
+        chunk_size: Rows per INSERT statement and commit
+        upsert: Update customers whose CustomerID already exists instead of rejecting them
+        
+    Returns:
+        dict: imported, rejected and failed (rows in rolled back chunks) counts,
+              errors ((line number, message) tuples for the first rejected rows),
+              seconds and rows_per_sec. None if the file cannot be read.
+    """
+    query = ("INSERT INTO Customer (CustomerID, FirstName, LastName, Email, PhoneNumber, HomeAddress, "
+             "IsActive, SignUpDate, RewardPoints) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)")
+    if upsert:
+        # RowVersion is bumped so versioned updates based on the old row are rejected
+        query += (" ON DUPLICATE KEY UPDATE FirstName = VALUES(FirstName), LastName = VALUES(LastName), "
+                  "Email = VALUES(Email), PhoneNumber = VALUES(PhoneNumber), HomeAddress = VALUES(HomeAddress), "
+                  "IsActive = VALUES(IsActive), SignUpDate = VALUES(SignUpDate), "
+                  "RewardPoints = VALUES(RewardPoints), RowVersion = RowVersion + 1")
+
+    def write(cursor, chunk, reject):
+        # Check uniqueness against the table and the rest of the chunk, then send the rows that pass
+        ids = [customer[0] for _, customer in chunk]
+        cursor.execute(f"SELECT CustomerID FROM Customer WHERE CustomerID IN ({','.join(['%s'] * len(ids))})",
+                       ids)
+        existing = {row[0] for row in cursor.fetchall()}
+        email_owners = _owners(cursor, "Email", [customer[3] for _, customer in chunk if customer[3]])
+        phone_owners = _owners(cursor, "PhoneNumber", [customer[4] for _, customer in chunk if customer[4]])
+
+        accepted = []
+        chunk_ids, chunk_emails, chunk_phones = set(), set(), set()
+        for line_num, customer in chunk:
+            customer_id, email, phone_number = customer[0], customer[3], customer[4]
+            email_key = email.lower() if email else None
+            if customer_id in chunk_ids:
+                reject(line_num, f"CustomerID {customer_id} appears more than once in the file")
+            elif customer_id in existing and not upsert:
+                reject(line_num, f"CustomerID {customer_id} already exists")
+            elif email_key and (email_key in chunk_emails
+                                or email_owners.get(email_key, customer_id) != customer_id):
+                reject(line_num, f"Email {email} belongs to another customer")
+            elif phone_number and (phone_number in chunk_phones
+                                   or phone_owners.get(phone_number.lower(), customer_id) != customer_id):
+                reject(line_num, f"PhoneNumber {phone_number} belongs to another customer")
+            else:
+                chunk_ids.add(customer_id)
+                if email_key:
+                    chunk_emails.add(email_key)
+                if phone_number:
+                    chunk_phones.add(phone_number)
+                accepted.append(customer)
+
+        if accepted:
+            cursor.executemany(query, accepted)
+
+    try:
+        return import_csv(conn, path, CUSTOMER_COLUMNS, validate_customer_row, write, chunk_size, "customers")
+    finally:
+        # Names may have changed for any customer; the index is rebuilt on the next name search
+        name_index.clear()
+
+def export_customers(conn, path, fmt="csv", active_only=False, batch_size=DEFAULT_BATCH_SIZE,
+                     progress_every=100000):
+    """
+    Streams customers to a CSV or JSON Lines file in CustomerID order.
+    
+    Rows are read through a server-side cursor (see export.py), so memory use
+    does not grow with the number of customers. A CSV export can be imported
+    again with import_customers_csv().
+    
+    Args:
+        conn: Database connection object
+        path: The file to write
+        fmt: 'csv' or 'jsonl'
+        active_only: Leave out customers whose IsActive is false
+        batch_size: Rows fetched per round-trip
+        progress_every: Print a progress line every this many rows
+        
+    Returns:
+        int: The number of customers written
+    """
+    query = f"SELECT {', '.join(CUSTOMER_COLUMNS)} FROM Customer"
+    if active_only:
+        query += " WHERE IsActive"
+    query += " ORDER BY CustomerID"
+    started = time.perf_counter()
+    count = export_query(conn, query, (), path, fmt, batch_size, progress_every)
+    elapsed = time.perf_counter() - started
+    print(f"{count} customers exported to {path} ({count / elapsed if elapsed else 0:,.0f} rows/sec)")
+    return count
@@ -0,0 +1,293 @@
+"""
+customer_search.py - Fuzzy customer name search for the MuskieCo management system
+
+Customers often give only their name at the till, and not always spelled the
+way it was typed in at sign-up. Names are matched word by word with trigram
+similarity: each word is padded and cut into overlapping three-letter pieces
+("smith" -> "  s", " sm", "smi", "mit", "ith", "th "), and two words are
+similar when they share a large part of their trigrams, so "jon smyth" still
+finds "John Smith".
+
+The index is kept in this process and has two levels:
+
+- the vocabulary: every distinct word of every name, with a trigram index
+  over it. There are far fewer distinct words than customers, so finding the
+  spellings close to a typed word is cheap.
+- for every word, the set of customers whose name contains it.
+
+A search looks up the close spellings of each typed word, then walks the
+combinations of spellings from the most to the least similar, intersecting
+their customer sets, and stops as soon as it has enough matches. A common
+name therefore costs one set intersection, not a pass over everyone called
+John.
+
+The index is built in bulk by streaming the Customer table once, and
+customer.py keeps it current as customers are created, updated and deleted
+here. Changes made by other processes are picked up when the index is
+rebuilt: search_names() rebuilds it when it is older than MAX_INDEX_AGE
+seconds, so another till's new customers show up within a few minutes.
+"""
+import heapq
+import re
+import threading
+import time
+from collections import Counter
+
+from export import iter_rows, streaming_cursor
+
+# Minimum similarity (shared trigrams over all trigrams) for a whole name to match
+DEFAULT_THRESHOLD = 0.3
+
+# Minimum similarity for a word to count towards a name; a little lower, so a short
+# misspelled word ("jon" for "john") still helps a name that matches overall
+WORD_THRESHOLD = 0.25
+
+DEFAULT_LIMIT = 10
+
+# Closest spellings considered per typed word
+MAX_VARIANTS = 20
+
+# Typed words beyond this many are ignored
+MAX_QUERY_WORDS = 4
+
+# Combinations of spellings tried per search before settling for the matches found so far
+MAX_COMBINATIONS = 500
+
+# Rows fetched per round-trip while building
+BUILD_BATCH_SIZE = 10000
+
+# Seconds before search_names() rebuilds the index to pick up other processes' changes
+MAX_INDEX_AGE = 300
+
+
+def name_words(text):
+    """Splits a name into lower-cased words of letters and digits."""
+    return re.findall(r"[^\W_]+", text.lower())
+
+
+def trigrams(word):
+    """
+    Cuts one word into its set of trigrams.
+
+    Args:
+        word (str): A lower-cased word.
+
+    Returns:
+        set: Three-character strings, including the padded start and end of the word.
+    """
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    A thread-safe in-memory index of customer names for fuzzy search.
+    """
+
+    def __init__(self):
+        self._names = {}
+        # word -> set of CustomerIDs whose name contains it
+        self._customers = {}
+        # trigram -> set of vocabulary words containing it, and each word's trigram count
+        self._vocabulary = {}
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self.built = False
+        # time.monotonic() of the last load
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._names)
+
+    def _add(self, customer_id, name):
+        self._names[customer_id] = name
+        for word in set(name_words(name)):
+            customers = self._customers.get(word)
+            if customers is None:
+                customers = self._customers[word] = set()
+                grams = trigrams(word)
+                self._sizes[word] = len(grams)
+                for gram in grams:
+                    self._vocabulary.setdefault(gram, set()).add(word)
+            customers.add(customer_id)
+
+    def _remove(self, customer_id):
+        name = self._names.pop(customer_id, None)
+        if name is None:
+            return
+        for word in set(name_words(name)):
+            customers = self._customers.get(word)
+            if customers is None:
+                continue
+            customers.discard(customer_id)
+            if not customers:
+                # Nobody is called this any more: drop the word from the vocabulary
+                del self._customers[word]
+                del self._sizes[word]
+                for gram in trigrams(word):
+                    words = self._vocabulary.get(gram)
+                    if words is not None:
+                        words.discard(word)
+                        if not words:
+                            del self._vocabulary[gram]
+
+    def add(self, customer_id, first_name, last_name):
+        """Indexes a customer's name, replacing the name indexed before."""
+        with self._lock:
+            self._remove(customer_id)
+            self._add(customer_id, f"{first_name} {last_name}")
+
+    def remove(self, customer_id):
+        """Drops a customer from the index; unknown IDs are ignored."""
+        with self._lock:
+            self._remove(customer_id)
+
+    def clear(self):
+        """Empties the index; the next search rebuilds it."""
+        with self._lock:
+            self._names, self._customers, self._vocabulary, self._sizes = {}, {}, {}, {}
+            self.built = False
+            self.built_at = None
+
+    def load(self, rows):
+        """
+        Replaces the whole index with the given customers.
+
+        The new index is built aside and swapped in, so searches keep using the
+        old one meanwhile.
+
+        Args:
+            rows (iterable): (CustomerID, FirstName, LastName) tuples.
+
+        Returns:
+            int: The number of customers indexed.
+        """
+        fresh = TrigramIndex()
+        for customer_id, first_name, last_name in rows:
+            fresh._add(customer_id, f"{first_name} {last_name}")
+        with self._lock:
+            self._names, self._customers = fresh._names, fresh._customers
+            self._vocabulary, self._sizes = fresh._vocabulary, fresh._sizes
+            self.built = True
+            self.built_at = time.monotonic()
+        return len(fresh._names)
+
+    def _variants(self, word):
+        # Vocabulary words similar to word, most similar first, as (similarity, word) pairs
+        grams = trigrams(word)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._vocabulary.get(gram, ()))
+        variants = []
+        for candidate, count in shared.items():
+            similarity = count / (len(grams) + self._sizes[candidate] - count)
+            if similarity >= WORD_THRESHOLD:
+                variants.append((similarity, candidate))
+        return heapq.nlargest(MAX_VARIANTS, variants)
+
+    def search(self, text, limit=DEFAULT_LIMIT, threshold=DEFAULT_THRESHOLD):
+        """
+        Finds the names most similar to text.
+
+        A name's score is the average, over the typed words, of the similarity
+        of the closest word in the name (0 if none is close enough).
+
+        Args:
+            text (str): The name as the customer gave it.
+            limit (int): Maximum number of matches.
+            threshold (float): Minimum score of a name.
+
+        Returns:
+            list: (CustomerID, name, score) tuples, best first; equal scores in CustomerID order.
+        """
+        words = list(dict.fromkeys(name_words(text)))[:MAX_QUERY_WORDS]
+        if not words:
+            return []
+        with self._lock:
+            # Each typed word's spellings, plus "no match" (None) at the end
+            options = [self._variants(word) + [(0.0, None)] for word in words]
+
+            def score(combination):
+                return sum(options[i][j][0] for i, j in enumerate(combination)) / len(words)
+
+            # Best-first walk over the combinations, one spelling per typed word
+            start = (0,) * len(words)
+            heap = [(-score(start), start)]
+            queued = {start}
+            matches = []
+            found = set()
+            tried = 0
+            while heap and len(matches) < limit and tried < MAX_COMBINATIONS:
+                tried += 1
+                negative, combination = heapq.heappop(heap)
+                if -negative < threshold:
+                    break
+                chosen = [options[i][j][1] for i, j in enumerate(combination) if options[i][j][1] is not None]
+                if chosen:
+                    sets = sorted((self._customers[word] for word in chosen), key=len)
+                    customers = sets[0].intersection(*sets[1:])
+                    # Customers found in a better combination already have a higher score; at most
+                    # limit of the smallest IDs are needed even after skipping those
+                    for customer_id in heapq.nsmallest(limit, customers):
+                        if customer_id not in found and len(matches) < limit:
+                            found.add(customer_id)
+                            matches.append((customer_id, self._names[customer_id], -negative))
+                for i in range(len(words)):
+                    if combination[i] + 1 < len(options[i]):
+                        successor = combination[:i] + (combination[i] + 1,) + combination[i + 1:]
+                        if successor not in queued:
+                            queued.add(successor)
+                            heapq.heappush(heap, (-score(successor), successor))
+        return matches
+
+    def age(self):
+        """Returns the seconds since the index was last loaded, or None if it was never built."""
+        if self.built_at is None:
+            return None
+        return time.monotonic() - self.built_at
+
+    def stats(self):
+        """Returns the number of customers and distinct words indexed."""
+        with self._lock:
+            return {"customers": len(self._names), "words": len(self._customers), "built": self.built}
+
+
+# Shared by customer.py and the menus
+name_index = TrigramIndex()
+
+
+def rebuild_name_index(conn, batch_size=BUILD_BATCH_SIZE):
+    """
+    Builds the name index from the Customer table, streaming it once.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        batch_size (int): Rows fetched per round-trip.
+
+    Returns:
+        int: The number of customers indexed.
+    """
+    with streaming_cursor(conn) as cursor:
+        cursor.execute("SELECT CustomerID, FirstName, LastName FROM Customer")
+        return name_index.load(iter_rows(cursor, batch_size))
+
+
+def search_names(conn, text, limit=DEFAULT_LIMIT, threshold=DEFAULT_THRESHOLD, max_age=MAX_INDEX_AGE):
+    """
+    Finds customers by approximate name, building the index on first use and
+    rebuilding it once it is older than max_age seconds.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        text (str): The name as the customer gave it.
+        limit (int): Maximum number of matches.
+        threshold (float): Minimum similarity.
+        max_age (float): Seconds after which the index is rebuilt from the Customer table.
+
+    Returns:
+        list: (CustomerID, name, score) tuples, best first.
+    """
+    age = name_index.age()
+    if not name_index.built or age is None or age > max_age:
+        rebuild_name_index(conn)
+    return name_index.search(text, limit, threshold)
@@ -1,5 +1,43 @@
 # database.py - Contains all database operations for the MuskieCo management system
+import base64
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
+
 import pymysql
+from concurrency import ConcurrentUpdateError, update_fields_with_retry
+from pool import ConnectionPool
+from pricing import price_transaction
+from product_cache import get_catalog_entry, invalidate_product
+from report_cache import cached_report, invalidate_sales, invalidate_stock
+from rollup import record_items, record_transaction, summarize
+from schema import migrate
+from stock import STOCK_LEVEL, record_movement, set_stock_level, store_tail
+
+# Connection settings shared by single connections and the connection pool
+# The database is configured in docker-compose.yml with the same credentials
+DB_CONFIG = {
+    "host": "127.0.0.1",  # localhost or container name
+    "user": "root",  # default MySQL username
+    "password": "Triforce3!",  # Replace with your actual password
+    "database": "MuskieCo",  # database name
+    "port": 3307  # standard MySQL port
+}
+
+# Maximum number of line items sent in one multi-row INSERT
+ITEM_CHUNK_SIZE = 1000
+
+# Maximum number of product IDs sent in one stock lookup IN (...) list
+STOCK_LOOKUP_CHUNK_SIZE = 1000
+
+def open_connection():
+    """
+    Opens a new connection to the MuskieCo database without touching the schema.
+
+    Returns:
+        pymysql.connections.Connection: A new connection to the database.
+    """
+    # Connect to MySQL database using pymysql driver
+    return pymysql.connect(**DB_CONFIG)
 
 def connect_to_database():
     """
@@ -12,15 +50,7 @@ def connect_to_database():
         Exception: If connection fails, the program will exit with error code 1.
     """
     try:
-        # Connect to MySQL database using pymysql driver
-        # The database is configured in docker-compose.yml with the same credentials
-        conn = pymysql.connect(
-            host="127.0.0.1",  # localhost or container name
-            user="root",  # default MySQL username
-            password="Triforce3!",  # Replace with your actual password
-            database="MuskieCo",  # database name
-            port=3307  # standard MySQL port
-        )
+        conn = open_connection()
         # Set up database schema if not already done
         set_up_database(conn)
         return conn
@@ -29,30 +59,45 @@ def connect_to_database():
         print(f"Error connecting to database: {e}")
         exit(1)
 
+def create_connection_pool(min_size=1, max_size=8, borrow_timeout=30.0, idle_timeout=300.0):
+    """
+    Creates a pool of connections to the MuskieCo database.
+
+    The schema is set up once on the first connection, which is then handed to
+    the pool, so pooled connections never repeat the setup work.
+
+    Args:
+        min_size (int): Number of connections kept open even when idle.
+        max_size (int): Maximum number of connections open at the same time.
+        borrow_timeout (float): Seconds to wait for a free connection.
+        idle_timeout (float): Seconds before an extra idle connection is closed.
+
+    Returns:
+        ConnectionPool: The connection pool.
+
+    Raises:
+        Exception: If connection fails, the program will exit with error code 1.
+    """
+    conn = connect_to_database()
+    try:
+        return ConnectionPool(open_connection, min_size=min_size, max_size=max_size,
+                              borrow_timeout=borrow_timeout, idle_timeout=idle_timeout, initial=[conn])
+    except Exception as e:
+        print(f"Error creating connection pool: {e}")
+        exit(1)
+
 def set_up_database(conn):
     """
-    Sets up the database schema by executing SQL statements from the Database.sql file.
+    Brings the database schema up to date by applying any pending migrations.
+
+    Migrations are the numbered SQL files in the migrations folder (see schema.py).
+    When the schema is already current this costs a single version check, and
+    existing data is never dropped.
     
     Args:
         conn (pymysql.connections.Connection): The database connection.
     """
-    # Read SQL commands from external file
-    with open("Database.sql", "r") as file:
-        sql_script = file.read()
-    # Split SQL script into individual statements
-    statements = [stmt.strip() for stmt in sql_script.split(';') if stmt.strip()]
-
-    # Execute each statement separately
-    with conn.cursor() as cursor:
-        for stmt in statements:
-            try:
-                cursor.execute(stmt)
-            except Exception as e:
-                # Continue even if some statements fail (might be because tables already exist)
-                print(f"Error executing statement: {stmt}\n{e}")
-
-    # Commit changes to the database
-    conn.commit()
+    migrate(conn)
 
 def get_input(prompt):
     """
@@ -171,56 +216,87 @@ def search_store(conn, store_id):
 
 def add_product(conn, product_id, product_name, QuantityInStock, BuyPrice, SellPrice, StoreID):
     """
-    Adds a new product to the database.
+    Adds a new product to the catalog and, optionally, to a store's inventory.
+
+    Other stores start carrying the product with a stock count or a delivery
+    (see count_product_stock() and adjust_product_stock()).
     
     Args:
         conn (pymysql.connections.Connection): The database connection.
         product_id (str): The ID of the product.
         product_name (str): The name of the product.
-        QuantityInStock (int): The quantity of the product in stock.
+        QuantityInStock (int): The quantity of the product in stock at the store.
         BuyPrice (float): The buy price of the product.
         SellPrice (float): The sell price of the product.
-        StoreID (int): The ID of the store where the product is located.
+        StoreID (int): The ID of the store that stocks the product; None adds it to the catalog only.
     """
     try:
         with conn.cursor() as cursor:
-            # Insert new product with all required fields
+            # Insert the catalog row, then the store's inventory row, in one transaction
             cursor.execute(
-                "INSERT INTO Product (ProductID, ProductName, QuantityInStock, BuyPrice, SellPrice, StoreID) VALUES (%s, %s, %s, %s, %s, %s)",
-                (product_id, product_name, QuantityInStock, BuyPrice, SellPrice, StoreID))
+                "INSERT INTO Product (ProductID, ProductName, BuyPrice, SellPrice) VALUES (%s, %s, %s, %s)",
+                (product_id, product_name, BuyPrice, SellPrice))
+            if StoreID is not None:
+                cursor.execute(
+                    "INSERT INTO StoreInventory (StoreID, ProductID, QuantityInStock) VALUES (%s, %s, %s)",
+                    (StoreID, product_id, QuantityInStock))
             # Save changes to the database
             conn.commit()
+            # The store's cached stock reports no longer match, and the ID may be cached as unknown
+            invalidate_stock(StoreID)
+            invalidate_product(product_id)
             print("Product added successfully.")
             # Display the newly added product
             print(get_product(conn, product_id))
     except Exception as e:
         # Handle errors during product addition
+        conn.rollback()
         print(f"Error adding product: {e}")
 
 
-def get_product(conn, product_id):
+def get_product(conn, product_id, use_cache=False):
     """
-    Retrieves a product by its ID.
+    Retrieves a product by its ID and shows its stock in every store that carries it.
     
     Args:
         conn (pymysql.connections.Connection): The database connection.
         product_id (str): The ID of the product to retrieve.
+        use_cache (bool): Answer from the product catalog cache without reading stock.
         
     Returns:
-        tuple: The product information if found, None otherwise.
+        tuple: The catalog row (ProductID, ProductName, BuyPrice, SellPrice, RowVersion)
+               if found, None otherwise.
     """
     try:
+        if use_cache:
+            product = get_catalog_entry(conn, product_id)
+            if product is None:
+                print("Product not found.")
+                return None
+            print(f"ProductID: {product[0]}, Product Name: {product[1]}, Buy Price: {product[2]}, "
+                  f"Sell Price: {product[3]}")
+            return product
+
         with conn.cursor() as cursor:
             # Search for product with the given ID
-            cursor.execute("SELECT * FROM Product WHERE ProductID = %s", (product_id,))
+            cursor.execute(
+                "SELECT ProductID, ProductName, BuyPrice, SellPrice, RowVersion FROM Product WHERE ProductID = %s",
+                (product_id,))
             # Fetch the first matching record
             product = cursor.fetchone()
             if product:
+                # Current stock per store (snapshot plus journal tail, see stock.py)
+                cursor.execute(
+                    f"SELECT si.StoreID, {STOCK_LEVEL} FROM StoreInventory si "
+                    f"WHERE si.ProductID = %s ORDER BY si.StoreID",
+                    (product_id,))
+                stock = dict(cursor.fetchall())
                 # Display product information if found
-                # product[0] = ProductID, product[1] = ProductName, product[2] = QuantityInStock,
-                # product[3] = BuyPrice, product[4] = SellPrice, product[5] = StoreID
+                # product[0] = ProductID, product[1] = ProductName, product[2] = BuyPrice,
+                # product[3] = SellPrice, product[4] = RowVersion
                 print(
-                    f"ProductID: {product[0]}, Product Name: {product[1]}, Quantity In Stock: {product[2]}, Buy Price: {product[3]}, Sell Price: {product[4]}, StoreID: {product[5]}")
+                    f"ProductID: {product[0]}, Product Name: {product[1]}, Buy Price: {product[2]}, Sell Price: {product[3]}, "
+                    f"Stock by StoreID: {stock or 'not stocked'}")
                 return product
             else:
                 # If no product is found with the given ID
@@ -241,19 +317,27 @@ def update_product(conn, product_id, product_name, QuantityInStock, BuyPrice, Se
         conn (pymysql.connections.Connection): The database connection.
         product_id (str): The ID of the product to update.
         product_name (str): The new name of the product.
-        QuantityInStock (int): The new quantity of the product in stock.
+        QuantityInStock (int): The counted quantity in stock at StoreID; the difference is
+                               journalled as an adjustment.
         BuyPrice (float): The new buy price of the product.
         SellPrice (float): The new sell price of the product.
-        StoreID (int): The new ID of the store where the product is located.
+        StoreID (int): The ID of the store where the stock was counted.
     """
     try:
         with conn.cursor() as cursor:
-            # Update all product fields with new values
+            # Update all catalog fields with new values
+            # RowVersion is bumped so versioned updates based on the old row are rejected
             cursor.execute(
-                "UPDATE Product SET ProductName = %s, QuantityInStock = %s, BuyPrice = %s, SellPrice = %s, StoreID = %s WHERE ProductID = %s",
-                (product_name, QuantityInStock, BuyPrice, SellPrice, StoreID, product_id))
+                "UPDATE Product SET ProductName = %s, BuyPrice = %s, SellPrice = %s, "
+                "RowVersion = RowVersion + 1 WHERE ProductID = %s",
+                (product_name, BuyPrice, SellPrice, product_id))
             # Save changes to the database
             conn.commit()
+            invalidate_product(product_id)
+            # Stock is never overwritten; the count is recorded in the movement journal
+            set_stock_level(conn, StoreID, product_id, QuantityInStock)
+            # Every store's cached stock report shows the product name
+            invalidate_stock()
             print("Product updated successfully.")
             # Display the updated product information
             print(get_product(conn, product_id))
@@ -262,6 +346,108 @@ def update_product(conn, product_id, product_name, QuantityInStock, BuyPrice, Se
         print(f"Error updating product: {e}")
 
 
+def update_product_fields(conn, product_id, changes, original):
+    """
+    Updates only the given product columns, if no one else changed them since the product was read.
+
+    Changes by others to the other columns are kept and the update is retried
+    on top of them (see concurrency.update_fields_with_retry()).
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        product_id (str): The ID of the product to update.
+        changes (dict): Column name -> new value, e.g. {"SellPrice": 4.99}.
+        original (tuple): The product row the changes were based on, as returned by get_product().
+
+    Returns:
+        bool: True if the product was updated (or nothing changed), False if another
+              update changed the same columns first or an error occurs.
+    """
+    if not changes:
+        print("Nothing to update.")
+        return True
+    try:
+        if not update_fields_with_retry(conn, "Product", product_id, changes, original):
+            conn.rollback()
+            # The cached row (if that is what the caller saw) is out of date
+            invalidate_product(product_id)
+            print("Product was changed by someone else. Please reload it and try again.")
+            return False
+        conn.commit()
+        invalidate_product(product_id)
+        # Every store's cached stock report shows the product name
+        invalidate_stock()
+        print("Product updated successfully.")
+        return True
+    except ConcurrentUpdateError as e:
+        conn.rollback()
+        invalidate_product(product_id)
+        print(f"{e}. Please try again.")
+        return False
+    except Exception as e:
+        conn.rollback()
+        print(f"Error updating product: {e}")
+        return False
+
+
+def adjust_product_stock(conn, store_id, product_id, delta, movement_type="Adjustment", note=None):
+    """
+    Records a change in a product's stock at a store in the movement journal.
+
+    Removals lock the inventory row while checking the current stock; additions
+    are appended without a lock. Either way concurrent changes are never lost,
+    because nothing is overwritten.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        store_id (int): The ID of the store.
+        product_id (str): The ID of the product.
+        delta (int): The change in stock (negative to remove).
+        movement_type (str): 'Adjustment' for corrections and write-offs, 'Receipt' for deliveries.
+        note (str): Optional reason stored with the movement.
+
+    Returns:
+        int: The new quantity in stock, None if the change is rejected or an error occurs.
+    """
+    try:
+        quantity = record_movement(conn, store_id, product_id, movement_type, delta, note)
+        print(f"Quantity in stock is now {quantity}.")
+        return quantity
+    except ValueError as e:
+        print(f"Stock not adjusted: {e}")
+        return None
+    except Exception as e:
+        print(f"Error adjusting stock: {e}")
+        return None
+
+
+def count_product_stock(conn, store_id, product_id, quantity):
+    """
+    Records a stock count: the difference from the current stock is journalled as an adjustment.
+
+    Counting a product at a store that does not carry it yet adds it to that store.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        store_id (int): The ID of the store where the stock was counted.
+        product_id (str): The ID of the product.
+        quantity (int): The counted quantity.
+
+    Returns:
+        int: The adjustment recorded, None if an error occurs.
+    """
+    try:
+        difference = set_stock_level(conn, store_id, product_id, quantity)
+        print(f"Stock set to {quantity} (adjustment of {difference:+d}).")
+        return difference
+    except ValueError as e:
+        print(f"Stock not updated: {e}")
+        return None
+    except Exception as e:
+        print(f"Error updating stock: {e}")
+        return None
+
+
 def delete_product(conn, product_id):
     """
     Deletes a product from the database.
@@ -276,6 +462,8 @@ def delete_product(conn, product_id):
             cursor.execute("DELETE FROM Product WHERE ProductID = %s", (product_id,))
             # Save changes to the database
             conn.commit()
+            invalidate_product(product_id)
+            invalidate_stock()
             print("Product deleted successfully.")
     except Exception as e:
         # Handle errors during product deletion
@@ -304,8 +492,12 @@ def add_transaction(conn, storeid, customerid, cashierid, purchasedate, totalpri
                           (storeid, customerid, cashierid, purchasedate, totalprice, transactiontype))
             # Get the ID of the newly inserted transaction
             transaction_id = cursor.lastrowid
+            # Keep the daily sales rollup in step with the new transaction
+            record_transaction(cursor, storeid, purchasedate, totalprice, transactiontype)
             # Save changes to the database
             conn.commit()
+            # Cached sales reports covering this store and day are now out of date
+            invalidate_sales(storeid, purchasedate)
             print("Transaction added successfully.")
             return transaction_id
     except Exception as e:
@@ -349,92 +541,138 @@ def get_transaction(conn, transaction_id):
         print(f"Error getting transaction: {e}")
         return None
 
-def add_products_to_transaction(conn, transaction_id, product_entries):
+def coerce_line_items(product_entries):
+    """
+    Converts line item entries into typed rows ready for insertion.
+
+    Entries collected by transactions.py hold strings, so product IDs and
+    quantities are converted to int and discounts to Decimal (a blank discount
+    means no discount). Repeated products are merged into one line because
+    TransactionItem allows each product only once per transaction.
+    
+    Args:
+        product_entries (list): A list of dictionaries with product_id, quantity and discount.
+
+    Returns:
+        list: (product_id, quantity, discount) tuples ordered by product ID.
+
+    Raises:
+        ValueError: If a value cannot be converted, a quantity is not positive,
+                    a discount is outside 0-100, or a repeated product has different discounts.
+    """
+    lines = {}
+    for entry in product_entries:
+        product_id = int(entry['product_id'])
+        quantity = int(entry['quantity'])
+        discount = str(entry.get('discount') or 0).strip() or "0"
+        try:
+            discount = Decimal(discount).quantize(Decimal("0.01"))
+            # NaN survives quantize but cannot be compared with the 0-100 range
+            if not discount.is_finite():
+                raise ValueError(f"Invalid discount for product {product_id}: {entry.get('discount')!r}")
+        except InvalidOperation:
+            raise ValueError(f"Invalid discount for product {product_id}: {entry.get('discount')!r}")
+        if quantity <= 0:
+            raise ValueError(f"Quantity for product {product_id} must be greater than 0")
+        if not 0 <= discount <= 100:
+            raise ValueError(f"Discount for product {product_id} must be between 0 and 100")
+        if product_id in lines:
+            if lines[product_id][1] != discount:
+                raise ValueError(f"Product {product_id} is listed twice with different discounts")
+            quantity += lines[product_id][0]
+        lines[product_id] = (quantity, discount)
+    return [(product_id, quantity, discount) for product_id, (quantity, discount) in sorted(lines.items())]
+
+def insert_transaction_items(conn, transaction_id, items, chunk_size=ITEM_CHUNK_SIZE):
+    """
+    Inserts line items for a transaction using multi-row INSERT statements.
+
+    Items are sent in chunks of chunk_size rows, one round-trip per chunk.
+    The caller is responsible for committing or rolling back.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        transaction_id (int): The ID of the transaction the items belong to.
+        items (list): (product_id, quantity, discount) tuples from coerce_line_items().
+        chunk_size (int): Maximum number of rows per INSERT statement.
+
+    Returns:
+        int: The number of rows inserted.
+    """
+    inserted = 0
+    with conn.cursor() as cursor:
+        for start in range(0, len(items), chunk_size):
+            rows = [(transaction_id, product_id, quantity, discount)
+                    for product_id, quantity, discount in items[start:start + chunk_size]]
+            # executemany turns an INSERT ... VALUES into a single multi-row statement
+            inserted += cursor.executemany(
+                "INSERT INTO TransactionItem (TransactionID, ProductID, Quantity, DiscountPercentageApplied) "
+                "VALUES (%s, %s, %s, %s)",
+                rows
+            )
+    return inserted
+
+def add_products_to_transaction(conn, transaction_id, product_entries, show=False):
     """
     Adds multiple products to an existing transaction.
+
+    All items are inserted with multi-row INSERT statements inside one database
+    transaction, so either every product is added or none are.
     
     Args:
         conn (pymysql.connections.Connection): The database connection.
         transaction_id (int): The ID of the transaction to add products to.
         product_entries (list): A list of dictionaries, where each dictionary contains:
             - product_id (str/int): The ID of the product.
-            - quantity (int): The quantity of the product.
-            - discount (float): The discount percentage applied to the product.
+            - quantity (str/int): The quantity of the product.
+            - discount (str/float): The discount percentage applied to the product.
+        show (bool): Display the transaction after the products are added.
     
     Returns:
-        None
+        int: The number of line items added, None if an error occurs.
     """
     try:
+        items = coerce_line_items(product_entries)
+        # Begin transaction manually to ensure atomicity
+        conn.begin()
+        inserted = insert_transaction_items(conn, int(transaction_id), items)
+        # Add the new units to the daily sales rollup in the same transaction
         with conn.cursor() as cursor:
-            # Begin transaction manually to ensure atomicity
-            conn.begin()
-
-            # Display existing transaction details before changes
-            get_transaction(conn, transaction_id)
-
-            # Insert each product into the ProductTransaction table
-            for product in product_entries:
-                # Extract product details from the dictionary
-                product_id = product['product_id']
-                quantity = product['quantity']
-                discount = product['discount']
-                
-                # Insert the product into the transaction with parameterized query
-                cursor.execute(
-                    """
-                    INSERT INTO ProductTransaction (TransactionID, ProductID, Quantity, DiscountPercentageApplied)
-                    VALUES (%s, %s, %s, %s)
-                    """,
-                    (transaction_id, product_id, quantity, discount)
-                )
-
-            # Commit the transaction after all inserts are successful
-            conn.commit()
-            print("All products added successfully.")
-            
+            transaction = record_items(cursor, int(transaction_id), sum(quantity for _, quantity, _ in items))
+        # Commit the transaction after all inserts are successful
+        conn.commit()
+        # Drop cached sales reports covering the transaction's store and day
+        if transaction:
+            invalidate_sales(transaction[0], transaction[1])
+        print(f"{inserted} products added successfully.")
+        if show:
             # Display updated transaction details
             get_transaction(conn, transaction_id)
-
+        return inserted
     except Exception as e:
         # Rollback all changes if any error occurs to maintain data integrity
         conn.rollback()  # Rollback on error
         print(f"Error adding products to transaction: {e}")
+        return None
 
 
 def get_transaction_price(conn, transaction_id):
     """
     Calculates the total price of a transaction based on its product items.
+
+    Every line is priced as sell price × quantity less its discount percentage,
+    all in one joined query (see pricing.py).
     
     Args:
         conn (pymysql.connections.Connection): The database connection.
         transaction_id (int): The ID of the transaction to calculate price for.
         
     Returns:
-        float: The total price of the transaction if calculation is successful,
-               None otherwise.
+        dict: The price dictionary described in pricing.price_transactions(), with
+              the priced lines and the transaction total; None if an error occurs.
     """
     try:
-        with conn.cursor() as cursor:
-            # Get all products in the transaction and their quantities
-            cursor.execute("Select ProductID, Quantity from TransactionItem where TransactionID = %s", (transaction_id,))
-            products = cursor.fetchall()
-            
-            # Initialize total price counter
-            total_price = 0
-            
-            # Calculate total price by summing (product price × quantity) for each product
-            for product in products:
-                product_id = product[0]
-                quantity = product[1]
-                
-                # Get product details to access the sell price
-                product_info = get_product(conn, product_id)
-                sell_price = product_info[4]  # Index 4 contains the SellPrice
-                
-                # Add this product's contribution to the total price
-                total_price += sell_price * quantity
-                
-            return total_price
+        return price_transaction(conn, transaction_id)
     except Exception as e:
         # Handle errors during price calculation
         print(f"Error getting transaction price: {e}")
@@ -473,7 +711,53 @@ def get_customer(conn, customer_id):
         print(f"Error getting customer: {e}")
         return None
 
-def get_transactions_month(conn, customer_id, month):
+def month_range(year, month):
+    """
+    Returns the half-open date range covering one month.
+
+    Filtering with PurchaseDate >= start AND PurchaseDate < end lets MySQL use
+    the (StoreID, PurchaseDate) and (CustomerID, PurchaseDate) indexes, which
+    Year(PurchaseDate) and Month(PurchaseDate) cannot.
+
+    Args:
+        year (str/int): The year (YYYY).
+        month (str/int): The month (1-12).
+
+    Returns:
+        tuple: (first day of the month, first day of the next month)
+    """
+    year, month = int(year), int(month)
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+def year_range(year):
+    """
+    Returns the half-open date range covering one year.
+
+    Args:
+        year (str/int): The year (YYYY).
+
+    Returns:
+        tuple: (January 1st of the year, January 1st of the next year)
+    """
+    year = int(year)
+    return date(year, 1, 1), date(year + 1, 1, 1)
+
+def day_range(day):
+    """
+    Returns the half-open date range covering one day.
+
+    Args:
+        day (str/date): The day (YYYY-MM-DD).
+
+    Returns:
+        tuple: (the day, the following day)
+    """
+    day = date.fromisoformat(str(day))
+    return day, day + timedelta(days=1)
+
+def get_transactions_month(conn, customer_id, month, year=None):
     """
     Retrieves all transactions for a specific customer during a specific month.
     
@@ -481,16 +765,24 @@ def get_transactions_month(conn, customer_id, month):
         conn (pymysql.connections.Connection): The database connection.
         customer_id (int): The ID of the customer to retrieve transactions for.
         month (int): The month number (1-12) to filter transactions by.
+        year (int): The year to filter transactions by. When omitted the month
+                    is matched in every year of the customer's history.
         
     Returns:
         list: A list of transactions if found, None otherwise.
     """
     try:
         with conn.cursor() as cursor:
-            # Search for transactions with the given customer ID and month
-            # using MySQL's MONTH() function and parameterized query
-            cursor.execute("Select * from Transaction where CustomerID = %s and Month(PurchaseDate) = %s", 
-                          (customer_id, month))
+            if year is not None:
+                # Search a half-open date range so the (CustomerID, PurchaseDate) index is used
+                start, end = month_range(year, month)
+                cursor.execute(
+                    "Select * from Transaction where CustomerID = %s and PurchaseDate >= %s and PurchaseDate < %s",
+                    (customer_id, start, end))
+            else:
+                # Without a year the month has to be matched across every year
+                cursor.execute("Select * from Transaction where CustomerID = %s and Month(PurchaseDate) = %s",
+                               (customer_id, month))
             
             # Fetch all matching transactions
             transactions = cursor.fetchall()
@@ -509,7 +801,125 @@ def get_transactions_month(conn, customer_id, month):
         return None
 
 
-def get_monthly_sales_report(conn, store_id, year, month):
+def encode_page_token(purchase_date, transaction_id):
+    """
+    Builds the opaque token that points just after a transaction in activity order.
+
+    Args:
+        purchase_date (date): The PurchaseDate of the last transaction on a page.
+        transaction_id (int): The TransactionID of the last transaction on a page.
+
+    Returns:
+        str: A URL-safe token.
+    """
+    return base64.urlsafe_b64encode(f"{purchase_date.isoformat()}|{transaction_id}".encode()).decode()
+
+def decode_page_token(token):
+    """
+    Reads a token built by encode_page_token().
+
+    Returns:
+        tuple: (PurchaseDate, TransactionID)
+
+    Raises:
+        ValueError: If the token is malformed.
+    """
+    try:
+        purchase_date, transaction_id = base64.urlsafe_b64decode(token.encode()).decode().split("|")
+        return date.fromisoformat(purchase_date), int(transaction_id)
+    except Exception:
+        raise ValueError(f"Invalid page token: {token!r}")
+
+def get_customer_activity(conn, customer_id, start=None, end=None, year=None, month=None,
+                          page_size=20, page_token=None, include_items=False):
+    """
+    Retrieves one page of a customer's transactions in date order.
+
+    The period is either a year (and optionally a month) or a half-open
+    [start, end) date range. Pages are read with keyset pagination on
+    (PurchaseDate, TransactionID), so every page costs the same no matter how
+    deep into the history it is, and each page is a single round-trip, even
+    with line items included.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        customer_id (int): The ID of the customer.
+        start (str/date): First day of the range (used when year is not given).
+        end (str/date): Day after the last day of the range (used when year is not given).
+        year (int): The year to report on.
+        month (int): The month within the year to report on.
+        page_size (int): Maximum number of transactions per page.
+        page_token (str): The next_page_token of the previous page; None for the first page.
+        include_items (bool): Also return the TransactionItem rows of every transaction on the page.
+
+    Returns:
+        dict: transactions (list of Transaction tuples), items (TransactionID ->
+              list of (ProductID, Quantity, DiscountPercentageApplied) tuples, only
+              with include_items) and next_page_token (None on the last page).
+              None if an error occurs.
+    """
+    try:
+        if year is not None:
+            start, end = month_range(year, month) if month is not None else year_range(year)
+        if start is None or end is None:
+            raise ValueError("Give a year (and month) or both start and end dates")
+
+        conditions = "CustomerID = %s AND PurchaseDate >= %s AND PurchaseDate < %s"
+        params = [customer_id, start, end]
+        if page_token:
+            # Continue strictly after the last transaction of the previous page
+            last_date, last_id = decode_page_token(page_token)
+            conditions += " AND (PurchaseDate > %s OR (PurchaseDate = %s AND TransactionID > %s))"
+            params += [last_date, last_date, last_id]
+        # One extra row tells us whether another page follows
+        page_query = f"""
+            SELECT TransactionID, StoreID, CustomerID, CashierID, PurchaseDate, TotalPrice, TransactionType
+            FROM Transaction
+            WHERE {conditions}
+            ORDER BY PurchaseDate, TransactionID
+            LIMIT %s
+        """
+        params.append(page_size + 1)
+
+        with conn.cursor() as cursor:
+            if include_items:
+                cursor.execute(
+                    f"""
+                    SELECT page.*, ti.ProductID, ti.Quantity, ti.DiscountPercentageApplied
+                    FROM ({page_query}) AS page
+                    LEFT JOIN TransactionItem ti ON ti.TransactionID = page.TransactionID
+                    ORDER BY page.PurchaseDate, page.TransactionID, ti.ProductID
+                    """,
+                    params
+                )
+            else:
+                cursor.execute(page_query, params)
+            rows = cursor.fetchall()
+
+        transactions = []
+        items = {}
+        for row in rows:
+            transaction = row[:7]
+            if not transactions or transactions[-1][0] != transaction[0]:
+                transactions.append(transaction)
+                if include_items:
+                    items[transaction[0]] = []
+            if include_items and row[7] is not None:
+                items[transaction[0]].append(row[7:])
+
+        next_page_token = None
+        if len(transactions) > page_size:
+            dropped = transactions.pop()
+            items.pop(dropped[0], None)
+            last = transactions[-1]
+            next_page_token = encode_page_token(last[4], last[0])
+        return {"transactions": transactions, "items": items, "next_page_token": next_page_token}
+    except Exception as e:
+        print(f"Error getting customer activity: {e}")
+        return None
+
+
+def get_monthly_sales_report(conn, store_id, year, month, use_rollup=False, verbose=True):
     """
     Generates a monthly sales report for a specific store and time period.
     
@@ -522,6 +932,9 @@ def get_monthly_sales_report(conn, store_id, year, month):
         store_id (int): The ID of the store to generate the report for.
         year (str/int): The year (YYYY format) to filter transactions by.
         month (str/int): The month (MM format) to filter transactions by.
+        use_rollup (bool): Answer from the SalesDailySummary rollup instead of
+                           aggregating the raw Transaction rows.
+        verbose (bool): Print the results; batch jobs turn this off.
         
     Returns:
         list: A list of tuples containing transaction summary data if found:
@@ -532,62 +945,103 @@ def get_monthly_sales_report(conn, store_id, year, month):
     Note:
         The function prints the results to the console in addition to returning them.
         If no sales data is found, it prints a notification message.
+        Results are cached (see report_cache.py) until a write touches the month.
     """
     try:
-        with conn.cursor() as cursor:
-            # Get total sales and transaction count
-            cursor.execute(
-                """
-                SELECT COUNT(*)        as TotalTransactions,
-                       SUM(TotalPrice) as TotalSales
-                FROM Transaction
-                WHERE StoreID = %s and Year(PurchaseDate) = %s and Month(PurchaseDate) = %s
-                """,
-                (store_id, year, month)
-            )
+        start, end = month_range(year, month)
 
-            transactions = cursor.fetchall()
-            if transactions:
+        def load():
+            with conn.cursor() as cursor:
+                if use_rollup:
+                    # At most 31 summary rows per store and month, regardless of history size
+                    cursor.execute(
+                        """
+                        SELECT COALESCE(SUM(TransactionCount), 0)        as TotalTransactions,
+                               SUM(GrossSales) + SUM(ReturnsTotal)       as TotalSales
+                        FROM SalesDailySummary
+                        WHERE StoreID = %s and SalesDate >= %s and SalesDate < %s
+                        """,
+                        (store_id, start, end)
+                    )
+                else:
+                    # Get total sales and transaction count
+                    # The half-open date range lets the (StoreID, PurchaseDate) index narrow the scan
+                    cursor.execute(
+                        """
+                        SELECT COUNT(*)        as TotalTransactions,
+                               SUM(TotalPrice) as TotalSales
+                        FROM Transaction
+                        WHERE StoreID = %s and PurchaseDate >= %s and PurchaseDate < %s
+                        """,
+                        (store_id, start, end)
+                    )
+                return cursor.fetchall()
+
+        transactions = cached_report("monthly", store_id, start, end, use_rollup, load)
+        if transactions:
+            if verbose:
                 print(transactions)
-                return transactions
-            else:
+            return transactions
+        else:
+            if verbose:
                 print(f"No sales data found for store {store_id} in {year}:{month}")
-                return None
+            return None
 
     except Exception as e:
         print(f"Error generating monthly sales report: {e}")
         return None
 
 
-def get_day_sales_report(conn, store_id, date):
+def get_day_sales_report(conn, store_id, date, use_rollup=False):
+    """
+    Generates a sales report for a specific store and day.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        store_id (int): The ID of the store to generate the report for.
+        date (str): The day (YYYY-MM-DD) to report on.
+        use_rollup (bool): Return the day's SalesDailySummary row instead of
+                           every transaction and its items.
+
+    Returns:
+        list: The transactions and their items, or with use_rollup a single
+              (SalesDate, TransactionCount, GrossSales, ReturnsTotal, UnitsSold,
+              UnitsReturned) tuple; None if nothing is found.
+    """
     try:
-        with conn.cursor() as cursor:
-            cursor.execute(
-                """
-                Select *
-                FROM Transaction
-                         JOIN TransactionItem On Transaction.TransactionID = TransactionItem.TransactionID
-                WHERE Transaction.StoreID = %s and Transaction.PurchaseDate = %s
-                """,
-                (store_id, date)
-            )
-            # Fetch all matching sales records
-            transactions = cursor.fetchall()
+        start, end = day_range(date)
 
-            if transactions:
-                # Display sales report information if found
-                print(transactions)
-                return transactions
-            else:
-                # If no transactions are found for the store in the specified year
-                print("No transactions not found.")
-                return None
+        def load():
+            with conn.cursor() as cursor:
+                if use_rollup:
+                    return summarize(cursor, store_id, start, end)
+                cursor.execute(
+                    """
+                    Select *
+                    FROM Transaction
+                             JOIN TransactionItem On Transaction.TransactionID = TransactionItem.TransactionID
+                    WHERE Transaction.StoreID = %s and Transaction.PurchaseDate = %s
+                    """,
+                    (store_id, start)
+                )
+                # Fetch all matching sales records
+                return cursor.fetchall()
+
+        transactions = cached_report("day", store_id, start, end, use_rollup, load)
+        if transactions:
+            # Display sales report information if found
+            print(transactions)
+            return transactions
+        else:
+            # If no transactions are found for the store on the specified day
+            print("No transactions not found.")
+            return None
     except Exception as e:
         # Handle errors during sales report generation
         print(f"Error getting sales report: {e}")
         return None
 
-def get_sales_report_year(conn, store_id, year):
+def get_sales_report_year(conn, store_id, year, use_rollup=False, verbose=True):
     """
     Generates a sales report for a specific store and year.
     
@@ -595,50 +1049,210 @@ def get_sales_report_year(conn, store_id, year):
         conn (pymysql.connections.Connection): The database connection.
         store_id (int): The ID of the store to generate the report for.
         year (int): The year to filter transactions by.
+        use_rollup (bool): Return one SalesDailySummary total per month instead
+                           of every transaction and its items.
+        verbose (bool): Print the results; batch jobs turn this off.
         
     Returns:
         list: A list of transactions and their items if found, None otherwise.
+              With use_rollup, tuples of (Month, TransactionCount, GrossSales,
+              ReturnsTotal, UnitsSold, UnitsReturned).
     """
     try:
-        with conn.cursor() as cursor:
-            # Join Transaction and TransactionItem tables to get complete sales information
-            # Filter by store ID and year using MySQL's YEAR() function
-            cursor.execute(
-                """
-                Select * FROM Transaction 
-                JOIN TransactionItem On Transaction.TransactionID = TransactionItem.TransactionID 
-                WHERE Transaction.StoreID = %s and Year(Transaction.PurchaseDate) = %s
-                """, 
-                (store_id, year)
-            )
-            
-            # Fetch all matching sales records
-            transactions = cursor.fetchall()
-            
-            if transactions:
-                # Display sales report information if found
+        start, end = year_range(year)
+
+        def load():
+            with conn.cursor() as cursor:
+                if use_rollup:
+                    # Twelve monthly totals built from at most 366 summary rows
+                    return summarize(cursor, store_id, start, end, by_month=True)
+                # Join Transaction and TransactionItem tables to get complete sales information
+                # Filter by store ID and a half-open date range covering the year
+                cursor.execute(
+                    """
+                    Select * FROM Transaction 
+                    JOIN TransactionItem On Transaction.TransactionID = TransactionItem.TransactionID 
+                    WHERE Transaction.StoreID = %s and Transaction.PurchaseDate >= %s
+                      and Transaction.PurchaseDate < %s
+                    """, 
+                    (store_id, start, end)
+                )
+                # Fetch all matching sales records
+                return cursor.fetchall()
+
+        transactions = cached_report("annual", store_id, start, end, use_rollup, load)
+        if transactions:
+            # Display sales report information if found
+            if verbose:
                 print(transactions)
-                return transactions
-            else:
-                # If no transactions are found for the store in the specified year
+            return transactions
+        else:
+            # If no transactions are found for the store in the specified year
+            if verbose:
                 print("No transactions not found.")
-                return None
+            return None
     except Exception as e:
         # Handle errors during sales report generation
         print(f"Error getting sales report: {e}")
         return None
 
-def get_all_products_quantity(conn, store_id):
+def get_all_products_quantity(conn, store_id, verbose=True):
+    """
+    Retrieves the name and stock quantity of every product in a store.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        store_id (int): The ID of the store.
+        verbose (bool): Print the results; batch jobs turn this off.
+
+    Returns:
+        list: (ProductName, QuantityInStock) tuples, None if an error occurs.
+    """
     try:
-        with conn.cursor() as cursor:
-            cursor.execute("SELECT ProductName, QuantityInStock FROM Product WHERE StoreID = %s", (store_id,))
-            products = cursor.fetchall()
+        def load():
+            with conn.cursor() as cursor:
+                # One primary-key range of StoreInventory
+                cursor.execute(f"SELECT p.ProductName, {STOCK_LEVEL} FROM StoreInventory si "
+                               f"JOIN Product p ON p.ProductID = si.ProductID "
+                               f"WHERE si.StoreID = %s ORDER BY si.ProductID",
+                               (store_id,))
+                return cursor.fetchall()
+
+        products = cached_report("stock", store_id, None, None, None, load)
+        if verbose:
             print(products)
-            return products
+        return products
     except Exception as e:
         print(f"Error getting all products quantity: {e}")
         return None
 
+def get_stock_report(conn, store_id, max_quantity=None, page_size=50, after=None):
+    """
+    Retrieves one page of a store's products ordered from lowest to highest stock.
+
+    Current stock is the snapshot in StoreInventory plus the journal tail.
+    Most products have no tail, so their stock is the snapshot itself and the
+    threshold and keyset position are range seeks on the (StoreID,
+    QuantityInStock) index, reading only the rows shown. The few products with
+    a tail (kept short by stock.compact_stock()) are read from the tail,
+    checked against the threshold and position with their current stock, and
+    merged into the page.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        store_id (int): The ID of the store.
+        max_quantity (int): Only include products with at most this many in stock.
+        page_size (int): Maximum number of products per page.
+        after (tuple): The next_page value of the previous page; None for the first page.
+
+    Returns:
+        dict: products (list of (ProductID, ProductName, QuantityInStock) tuples)
+              and next_page ((QuantityInStock, ProductID) to pass as after, or None
+              on the last page). None if an error occurs.
+    """
+    def wanted(quantity, product_id):
+        if max_quantity is not None and quantity > max_quantity:
+            return False
+        return after is None or (quantity, product_id) > tuple(after)
+
+    try:
+        with conn.cursor() as cursor:
+            # Both reads share the transaction's snapshot, so the tail matches the snapshot read
+            tail = store_tail(cursor, store_id)
+
+            conditions = "si.StoreID = %s"
+            params = [store_id]
+            if max_quantity is not None:
+                conditions += " AND si.QuantityInStock <= %s"
+                params.append(max_quantity)
+            if after is not None:
+                # Continue strictly after the last product of the previous page
+                conditions += (" AND (si.QuantityInStock > %s"
+                               " OR (si.QuantityInStock = %s AND si.ProductID > %s))")
+                params += [after[0], after[0], after[1]]
+            if tail:
+                # Their snapshot is not their stock; they are merged in below
+                conditions += f" AND si.ProductID NOT IN ({','.join(['%s'] * len(tail))})"
+                params += list(tail)
+            params.append(page_size + 1)
+            cursor.execute(
+                f"""
+                SELECT si.ProductID, p.ProductName, si.QuantityInStock
+                FROM StoreInventory si FORCE INDEX (idx_store_inventory_quantity)
+                JOIN Product p ON p.ProductID = si.ProductID
+                WHERE {conditions}
+                ORDER BY si.QuantityInStock, si.ProductID
+                LIMIT %s
+                """,
+                params
+            )
+            products = list(cursor.fetchall())
+
+            if tail:
+                cursor.execute(
+                    f"SELECT si.ProductID, p.ProductName, si.QuantityInStock FROM StoreInventory si "
+                    f"JOIN Product p ON p.ProductID = si.ProductID "
+                    f"WHERE si.StoreID = %s AND si.ProductID IN ({','.join(['%s'] * len(tail))})",
+                    [store_id] + list(tail)
+                )
+                for product_id, name, quantity in cursor.fetchall():
+                    quantity += tail[product_id]
+                    if wanted(quantity, product_id):
+                        products.append((product_id, name, quantity))
+                products.sort(key=lambda product: (product[2], product[0]))
+                del products[page_size + 1:]
+
+        next_page = None
+        if len(products) > page_size:
+            products.pop()
+            next_page = (products[-1][2], products[-1][0])
+        return {"products": products, "next_page": next_page}
+    except Exception as e:
+        print(f"Error getting stock report: {e}")
+        return None
+
+def get_stock_levels(conn, pairs, chunk_size=STOCK_LOOKUP_CHUNK_SIZE):
+    """
+    Looks up stock for many (store, product) pairs with a few bounded queries.
+
+    Pairs are grouped by store; each store's product IDs are converted to int,
+    de-duplicated and sent in IN lists of at most chunk_size IDs, so every
+    round-trip reads primary-key entries of one store's StoreInventory range.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        pairs (iterable): (store_id, product_id) pairs; ids may be strings.
+        chunk_size (int): Maximum number of product IDs per query.
+
+    Returns:
+        tuple: (levels, round_trips) where levels maps ProductID to a dictionary
+               with 'name' and 'stores' (StoreID -> QuantityInStock) for the
+               requested stores that stock the product, and round_trips is the
+               number of queries sent. Pairs that do not exist are left out.
+    """
+    requested = {}
+    for store_id, product_id in pairs:
+        requested.setdefault(int(store_id), set()).add(int(product_id))
+
+    levels = {}
+    round_trips = 0
+    with conn.cursor() as cursor:
+        for store_id in sorted(requested):
+            product_ids = sorted(requested[store_id])
+            for start in range(0, len(product_ids), chunk_size):
+                chunk = product_ids[start:start + chunk_size]
+                format_strings = ','.join(['%s'] * len(chunk))
+                cursor.execute(
+                    f"SELECT si.ProductID, p.ProductName, {STOCK_LEVEL} FROM StoreInventory si "
+                    f"JOIN Product p ON p.ProductID = si.ProductID "
+                    f"WHERE si.StoreID = %s AND si.ProductID IN ({format_strings})",
+                    [store_id] + chunk
+                )
+                round_trips += 1
+                for product_id, name, quantity in cursor.fetchall():
+                    levels.setdefault(product_id, {"name": name, "stores": {}})["stores"][store_id] = quantity
+    return levels, round_trips
+
 def get_products_quantity(conn, store_id, product_ids):
     """
     Retrieves the quantity information for specific products in a store.
@@ -653,34 +1267,23 @@ def get_products_quantity(conn, store_id, product_ids):
               Each tuple contains (ProductID, ProductName, QuantityInStock).
     """
     try:
-        with conn.cursor() as cursor:
-            # Dynamically create a parameterized query with the correct number of placeholders
-            # for the variable number of product IDs
-            format_strings = ','.join(['%s'] * len(product_ids))
-            
-            # Build the query to get product information for specific products in a store
-            query = f"""
-                SELECT ProductID, ProductName, QuantityInStock
-                FROM Product
-                WHERE StoreID = %s AND ProductID IN ({format_strings})
-            """
-            
-            # Execute the query with store_id as the first parameter followed by all product_ids
-            cursor.execute(query, [store_id] + product_ids)
+        # Look the products up in bounded chunks (see get_stock_levels)
+        store_id = int(store_id)
+        levels, _ = get_stock_levels(conn, ((store_id, product_id) for product_id in product_ids))
+        products = [(product_id, level["name"], level["stores"][store_id])
+                    for product_id, level in sorted(levels.items())]
             
-            # Fetch all matching products
-            products = cursor.fetchall()
-            
-            if products:
-                # Display product information if found
-                for prod in products:
-                    print(f"ProductID: {prod[0]}, Name: {prod[1]}, QuantityInStock: {prod[2]}")
-                return products
-            else:
-                # If no matching products are found
-                print("No matching products found.")
-                return None
+        if products:
+            # Display product information if found
+            for prod in products:
+                print(f"ProductID: {prod[0]}, Name: {prod[1]}, QuantityInStock: {prod[2]}")
+            return products
+        else:
+            # If no matching products are found
+            print("No matching products found.")
+            return None
     except Exception as e:
         # Handle errors during product retrieval
         print(f"Error retrieving products: {e}")
-        return None
\ No newline at end of file
+        return None
+
@@ -8,6 +8,8 @@ in the database.
 
 Each discount is uniquely identified by a DiscountID and associates a ProductID with
 a StoreID, indicating that the specified product has a discount at the specified store.
+A discount can only be given at a store that carries the product, which is checked
+against that store's StoreInventory row.
 """
 
 def discount(conn):
@@ -63,6 +65,24 @@ def discount(conn):
             print("Invalid choice. Please try again.")
 
 
+def store_carries_product(cursor, product_id, store_id):
+    """
+    Check whether a store carries a product.
+
+    This function is a single primary-key lookup in StoreInventory.
+
+    Parameters:
+        cursor: Cursor on the database connection
+        product_id: ID of the product
+        store_id: ID of the store
+
+    Returns:
+        bool: True if the store has an inventory row for the product
+    """
+    cursor.execute("SELECT 1 FROM StoreInventory WHERE StoreID = %s AND ProductID = %s",
+                   (store_id, product_id))
+    return cursor.fetchone() is not None
+
 def delete_discount(conn, discount_id):
     """
     Delete a discount record from the database.
@@ -108,6 +128,9 @@ def update_discount(conn, discount_id, product_id, store_id):
     """
     try:
         with conn.cursor() as cursor:
+            if not store_carries_product(cursor, product_id, store_id):
+                print(f"Store {store_id} does not carry product {product_id}.")
+                return
             cursor.execute("UPDATE Discount SET ProductID = %s, StoreID = %s WHERE DiscountID = %s",
                            (product_id, store_id, discount_id))
             conn.commit()
@@ -165,11 +188,14 @@ def add_discount(conn, discount_id, product_id, store_id):
     
     Raises:
         Exception: Prints error message if insertion operation fails
-                  Common failures include duplicate discount_id or referential
-                  integrity violations if product_id or store_id don't exist
+                  Common failures include duplicate discount_id; a store that does
+                  not carry the product is reported without inserting anything
     """
     try:
         with conn.cursor() as cursor:
+            if not store_carries_product(cursor, product_id, store_id):
+                print(f"Store {store_id} does not carry product {product_id}.")
+                return
             cursor.execute("INSERT INTO Discount (DiscountID, ProductID, StoreID) VALUES (%s, %s, %s)",
                            (discount_id, product_id, store_id))
             conn.commit()
@@ -0,0 +1,175 @@
+"""
+export.py - Streaming report export for the MuskieCo management system
+
+Large reports are written straight to a CSV or JSON Lines file instead of being
+fetched into a Python list and printed. Rows are read through an unbuffered
+server-side cursor (pymysql SSCursor) in batches, so memory use stays the same
+whether a report has a hundred rows or a hundred million.
+
+While a streaming cursor is open the connection cannot run other queries;
+the helpers below always close it before returning.
+
+A report is written to a temporary file next to its destination and moved
+into place only once every row is written, so a query that fails leaves an
+earlier report at the same path untouched.
+"""
+import csv
+import json
+import os
+from contextlib import contextmanager
+
+import pymysql
+
+from database import day_range, year_range
+
+# Rows fetched from the server per round-trip
+DEFAULT_BATCH_SIZE = 1000
+
+# Line-level sales rows; explicit columns so JSON keys are not duplicated by the join
+SALES_EXPORT_QUERY = """
+    SELECT t.TransactionID, t.StoreID, t.CustomerID, t.CashierID, t.PurchaseDate,
+           t.TotalPrice, t.TransactionType, ti.ProductID, ti.Quantity, ti.DiscountPercentageApplied
+    FROM Transaction t
+    JOIN TransactionItem ti ON ti.TransactionID = t.TransactionID
+    WHERE t.StoreID = %s AND t.PurchaseDate >= %s AND t.PurchaseDate < %s
+    ORDER BY t.PurchaseDate, t.TransactionID, ti.ProductID
+"""
+
+
+@contextmanager
+def streaming_cursor(conn):
+    """
+    Opens an unbuffered server-side cursor and closes it when the block ends.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+    """
+    cursor = conn.cursor(pymysql.cursors.SSCursor)
+    try:
+        yield cursor
+    finally:
+        # Closing an SSCursor discards any rows that were not read
+        cursor.close()
+
+
+def iter_rows(cursor, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Yields the rows of an executed cursor, fetching batch_size rows at a time.
+
+    Args:
+        cursor (pymysql.cursors.SSCursor): A cursor that has executed a query.
+        batch_size (int): Rows fetched per round-trip.
+    """
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def csv_writer(file, columns):
+    """Writes a CSV header and returns a function that writes one row."""
+    writer = csv.writer(file)
+    writer.writerow(columns)
+    return writer.writerow
+
+
+def jsonl_writer(file, columns):
+    """Returns a function that writes one row as a JSON object on its own line."""
+    def write(row):
+        # Dates and Decimals are written as strings
+        file.write(json.dumps(dict(zip(columns, row)), default=str))
+        file.write("\n")
+    return write
+
+
+WRITERS = {
+    "csv": csv_writer,
+    "jsonl": jsonl_writer,
+}
+
+
+def export_query(conn, query, params, path, fmt="csv", batch_size=DEFAULT_BATCH_SIZE, progress_every=None):
+    """
+    Streams the result of a query into a CSV or JSON Lines file.
+
+    The rows go to path + ".part", which replaces path when the export
+    succeeds and is removed when it fails.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        query (str): The SELECT statement to run.
+        params (tuple): Parameters for the query.
+        path (str): The file to write.
+        fmt (str): 'csv' or 'jsonl'.
+        batch_size (int): Rows fetched per round-trip.
+        progress_every (int): Print a progress line every this many rows.
+
+    Returns:
+        int: The number of rows written.
+
+    Raises:
+        ValueError: If the format is not supported.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    count = 0
+    partial_path = f"{path}.part"
+    try:
+        with open(partial_path, "w", newline="", encoding="utf-8") as file, streaming_cursor(conn) as cursor:
+            cursor.execute(query, params)
+            write = WRITERS[fmt](file, [column[0] for column in cursor.description])
+            for row in iter_rows(cursor, batch_size):
+                write(row)
+                count += 1
+                if progress_every and count % progress_every == 0:
+                    print(f"{count} rows written...")
+        os.replace(partial_path, path)
+    except BaseException:
+        # Leave whatever report was at path before in place
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    return count
+
+
+def export_sales_report_year(conn, store_id, year, path, fmt="csv", batch_size=DEFAULT_BATCH_SIZE,
+                             progress_every=None):
+    """
+    Streams the annual sales report for a store (every transaction and its items) to a file.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        store_id (int): The ID of the store.
+        year (int): The year to export.
+        path (str): The file to write.
+        fmt (str): 'csv' or 'jsonl'.
+        batch_size (int): Rows fetched per round-trip.
+        progress_every (int): Print a progress line every this many rows.
+
+    Returns:
+        int: The number of rows written.
+    """
+    start, end = year_range(year)
+    return export_query(conn, SALES_EXPORT_QUERY, (store_id, start, end), path, fmt, batch_size, progress_every)
+
+
+def export_day_sales_report(conn, store_id, day, path, fmt="csv", batch_size=DEFAULT_BATCH_SIZE,
+                            progress_every=None):
+    """
+    Streams the daily sales report for a store (every transaction and its items) to a file.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        store_id (int): The ID of the store.
+        day (str): The day to export (YYYY-MM-DD).
+        path (str): The file to write.
+        fmt (str): 'csv' or 'jsonl'.
+        batch_size (int): Rows fetched per round-trip.
+        progress_every (int): Print a progress line every this many rows.
+
+    Returns:
+        int: The number of rows written.
+    """
+    start, end = day_range(day)
+    return export_query(conn, SALES_EXPORT_QUERY, (store_id, start, end), path, fmt, batch_size, progress_every)
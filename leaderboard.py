@@ -0,0 +1,126 @@
+"""
+leaderboard.py - Top products and top stores for the MuskieCo management system
+
+This module ranks best-selling products (chain-wide or within every store) and
+best-performing stores for a period. Ranking happens inside MySQL with
+GROUP BY and the ROW_NUMBER() window function, so only the top rows are sent
+back and memory use does not depend on how much history there is.
+
+Returns count against the products and stores they were returned to.
+"""
+from pricing import LINE_COLUMNS
+
+# What the leaderboards can rank by
+METRICS = ("units", "revenue")
+
+# Every sold line in the period, with the pricing engine's rounding and a sign for returns
+LINES_QUERY = f"""
+    SELECT t.StoreID,
+           IF(t.TransactionType = 'Return', -1, 1) AS Sign,
+           {LINE_COLUMNS}
+    FROM Transaction t
+    JOIN TransactionItem ti ON ti.TransactionID = t.TransactionID
+    JOIN Product p ON p.ProductID = ti.ProductID
+    WHERE t.PurchaseDate >= %s AND t.PurchaseDate < %s AND t.StoreID IS NOT NULL
+"""
+
+
+def _check_metric(by):
+    if by not in METRICS:
+        raise ValueError(f"Leaderboards can rank by {' or '.join(METRICS)}, not {by!r}")
+
+
+def get_top_products(conn, start, end, n=10, by="units", store_id=None, per_store=False):
+    """
+    Ranks products by units sold or revenue over a half-open date range.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        start (str/date): First day of the period.
+        end (str/date): Day after the last day of the period.
+        n (int): Number of products to return (per store when per_store is set).
+        by (str): 'units' or 'revenue' (after discounts).
+        store_id (int): Only rank sales at this store.
+        per_store (bool): Return the top n products of every store instead of chain-wide.
+
+    Returns:
+        list: Tuples of (StoreID, Rank, ProductID, ProductName, Units, Revenue);
+              StoreID is None for chain-wide rankings. None if an error occurs.
+    """
+    try:
+        _check_metric(by)
+        params = [start, end]
+        query = LINES_QUERY
+        if store_id is not None:
+            query += " AND t.StoreID = %s"
+            params.append(store_id)
+        metric = "Units" if by == "units" else "Revenue"
+        group_store = "line.StoreID" if per_store else "NULL"
+        partition = "PARTITION BY StoreID" if per_store else ""
+
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT ranked.StoreID, ranked.ProductRank, ranked.ProductID, p.ProductName,
+                       ranked.Units, ranked.Revenue
+                FROM (SELECT totals.*,
+                             ROW_NUMBER() OVER ({partition} ORDER BY {metric} DESC, ProductID) AS ProductRank
+                      FROM (SELECT {group_store} AS StoreID,
+                                   line.ProductID,
+                                   SUM(line.Sign * line.Quantity) AS Units,
+                                   SUM(line.Sign * (line.Gross - line.Discount)) AS Revenue
+                            FROM ({query}) AS line
+                            GROUP BY {group_store}, line.ProductID) AS totals) AS ranked
+                JOIN Product p ON p.ProductID = ranked.ProductID
+                WHERE ranked.ProductRank <= %s
+                ORDER BY ranked.StoreID, ranked.ProductRank
+                """,
+                params + [n]
+            )
+            return cursor.fetchall()
+    except Exception as e:
+        print(f"Error getting top products: {e}")
+        return None
+
+
+def get_top_stores(conn, start, end, n=10, by="revenue"):
+    """
+    Ranks stores by net revenue or net units over a half-open date range.
+
+    Answered from the SalesDailySummary rollup, so the cost depends on the
+    number of store-days in the period, not on the number of transactions.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        start (str/date): First day of the period.
+        end (str/date): Day after the last day of the period.
+        n (int): Number of stores to return.
+        by (str): 'units' or 'revenue'.
+
+    Returns:
+        list: Tuples of (Rank, StoreID, StoreAddress, Units, Revenue), None if an error occurs.
+    """
+    try:
+        _check_metric(by)
+        metric = "Units" if by == "units" else "Revenue"
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT ROW_NUMBER() OVER (ORDER BY totals.{metric} DESC, totals.StoreID) AS StoreRank,
+                       totals.StoreID, s.StoreAddress, totals.Units, totals.Revenue
+                FROM (SELECT StoreID,
+                             SUM(UnitsSold) - SUM(UnitsReturned) AS Units,
+                             SUM(GrossSales) - SUM(ReturnsTotal) AS Revenue
+                      FROM SalesDailySummary
+                      WHERE SalesDate >= %s AND SalesDate < %s
+                      GROUP BY StoreID) AS totals
+                JOIN Store s ON s.StoreID = totals.StoreID
+                ORDER BY StoreRank
+                LIMIT %s
+                """,
+                (start, end, n)
+            )
+            return cursor.fetchall()
+    except Exception as e:
+        print(f"Error getting top stores: {e}")
+        return None
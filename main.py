@@ -1,13 +1,25 @@
 # main.py - Main entry point for the MuskieCo management system
 # This file implements a menu-driven interface for store, inventory, and transaction management
+import time
+
 import products
+import product_cache
+import report_cache
 import staff
 import store
 from discount import discount as discountFn
 from customer import customer as customerFn
+from customer_search import name_index
 from database import *  # Import all database functions from database.py
+from analytics import get_margin_report, print_margin_report
+from batch_reports import print_store_reports, run_store_reports
+from leaderboard import get_top_products, get_top_stores
+from export import export_day_sales_report, export_sales_report_year
 from transactions import transactions as transaction
-from rewards import customer_rewards, employee_rewards
+from rewards import customer_rewards, employee_rewards, post_reward_points
+from replenishment import export_replenishment_report, get_replenishment_suggestions
+from rollup import rebuild_daily_summary
+from stock import compact_stock
 
 def main():
     """
@@ -23,9 +35,17 @@ def main():
     The function handles user input and calls appropriate database functions
     based on user selections.
     """
-    # Establish database connection at program start
-    # This connection will be used throughout the program for all database operations
-    conn = connect_to_database()
+    # Create the connection pool at program start
+    # Each menu action borrows a connection from the pool and returns it when done,
+    # so several registers and reporting jobs can work against the database at once
+    pool = create_connection_pool()
+
+    # Load the product catalog into memory so the first scans at the registers are fast
+    with pool.connection() as conn:
+        try:
+            print(f"{product_cache.warm_catalog(conn)} products cached.")
+        except Exception as e:
+            print(f"Error warming product cache: {e}")
     
     # Main program loop - continues until the user chooses to exit
     while True:
@@ -41,155 +61,320 @@ def main():
         choice = input("Enter the number corresponding to your choice: ")  # Get user's menu selection
 
         # =====================================================================
-        # Information Processing menu (Store management)
-        # Handles store operations including add, update, delete, and search
-        # =====================================================================
-        if choice == "1":
-            print("1. Stores")
-            print("2. Customers")
-            print("3. Staff")
-            print("4. Discount")
-            choice = input("Enter the number corresponding to your choice: ")
-            match choice:
-                case "1":
-                    store.store(conn)
-                case "2":
-                    customerFn(conn)
-                case "3":
-                    staff.staff(conn)
-                case "4":
-                    discountFn(conn)
-                case _:
-                    print("Invalid choice. Please try again.")
-        # =====================================================================
-        # Inventory Records menu (Product management)
-        # Handles product operations including add, update, and delete
-        # =====================================================================
-        elif choice == "2":
-            products.products(conn)
-        # =====================================================================
-        # Billing and Transaction Records menu
-        # Handles transactions including adding new transactions,
-        # adding products to transactions, and calculating totals
+        # Exit the program
+        # Breaks out of the main loop and closes the database connections
+        # This is the clean way to terminate the program
         # =====================================================================
-        elif choice == "3":
-            # Display the transaction management submenu
-            print("\n--- Billing and Transaction Records ---")
-            print("1. Manage Transactions")
-            print("2. Generate reward notices for members")
-            print("3. Generate rewards checks for employees")
-            choice = int(input("Enter choice: "))
-            match choice:
-                case 1:
-                    transaction(conn)
-                case 2:
-                    customer_rewards(conn)
-                case 3:
-                    employee_rewards(conn)
-        elif choice == "4":
-            # Display the reports menu
-            # Each option generates a different type of business report
-            print("\n--- Reports ---")
-            print("1. Monthly Customer Activity Report")
-            print("2. Annual Sales Report")
-            print("3. Product Stock Report")
-            print("4. Daily Sales Report")
-            print("5. Monthly Sales Report")
-            print("6. Store Stock Report")
-            sub_choice = input("Enter choice: ")
+        if choice == "0":
+            print("Exiting...")
+            break  # Exit the main program loop
 
-            # Using match-case to handle reports menu options
-            # Each case handles generating a different report
-            match sub_choice:
-                # Option 1: Generate monthly customer activity report
-                # Shows all transactions for a specific customer in a given month
-                case "1":
-                    # Get the customer ID for the report
-                    customerid = int(input("Enter Customer ID: "))
-                    
-                    # Retrieve and display customer information for verification
-                    # This confirms we have the right customer
-                    customer = get_customer(conn, customerid)
+        # Borrow a pooled connection for the duration of this menu action
+        with pool.connection() as conn:
+            # =====================================================================
+            # Information Processing menu (Store management)
+            # Handles store operations including add, update, delete, and search
+            # =====================================================================
+            if choice == "1":
+                print("1. Stores")
+                print("2. Customers")
+                print("3. Staff")
+                print("4. Discount")
+                choice = input("Enter the number corresponding to your choice: ")
+                match choice:
+                    case "1":
+                        store.store(conn)
+                    case "2":
+                        customerFn(conn)
+                    case "3":
+                        staff.staff(conn)
+                    case "4":
+                        discountFn(conn)
+                    case _:
+                        print("Invalid choice. Please try again.")
+            # =====================================================================
+            # Inventory Records menu (Product management)
+            # Handles product operations including add, update, and delete
+            # =====================================================================
+            elif choice == "2":
+                products.products(conn)
+            # =====================================================================
+            # Billing and Transaction Records menu
+            # Handles transactions including adding new transactions,
+            # adding products to transactions, and calculating totals
+            # =====================================================================
+            elif choice == "3":
+                # Display the transaction management submenu
+                print("\n--- Billing and Transaction Records ---")
+                print("1. Manage Transactions")
+                print("2. Generate reward notices for members")
+                print("3. Generate rewards checks for employees")
+                print("4. Post reward points from new transactions")
+                choice = int(input("Enter choice: "))
+                match choice:
+                    case 1:
+                        transaction(conn)
+                    case 2:
+                        customer_rewards(conn)
+                    case 3:
+                        employee_rewards(conn)
+                    # Meant to run every few minutes; each transaction is posted once
+                    case 4:
+                        try:
+                            result = post_reward_points(conn)
+                            print(f"Posted {result['transactions']} transactions to {result['customers']} customers "
+                                  f"in {result['batches']} batches (watermark {result['watermark']}).")
+                        except Exception as e:
+                            print(f"Error posting reward points: {e}")
+            elif choice == "4":
+                # Display the reports menu
+                # Each option generates a different type of business report
+                print("\n--- Reports ---")
+                print("1. Monthly Customer Activity Report")
+                print("2. Annual Sales Report")
+                print("3. Product Stock Report")
+                print("4. Daily Sales Report")
+                print("5. Monthly Sales Report")
+                print("6. Store Stock Report")
+                print("7. Rebuild Daily Sales Summary")
+                print("8. Export Sales Report to File")
+                print("9. Month-End Reports for All Stores")
+                print("10. Report, Product Cache and Customer Name Index Statistics")
+                print("11. Margin Analysis Report")
+                print("12. Top Products and Stores")
+                print("13. Compact Stock Movement Journal")
+                print("14. Replenishment Suggestions")
+                sub_choice = input("Enter choice: ")
+
+                # Using match-case to handle reports menu options
+                # Each case handles generating a different report
+                match sub_choice:
+                    # Option 1: Generate monthly customer activity report
+                    # Shows all transactions for a specific customer in a given month
+                    case "1":
+                        # Get the customer ID for the report
+                        customerid = int(input("Enter Customer ID: "))
                     
-                    # Get the month in YYYY-MM format to filter transactions
-                    month = int(input("Enter Month (MM): "))
+                        # Retrieve and display customer information for verification
+                        # This confirms we have the right customer
+                        customer = get_customer(conn, customerid)
                     
-                    # Generate and display the report of transactions for this customer and month
-                    # The function handles retrieving and formatting the transaction data
-                    transactions = get_transactions_month(conn, customerid, month)
-                                    
-                # Option 2: Generate annual sales report
-                # Shows all sales for a specific store in a given year
-                case "2":
-                    # Get the store ID for the report
-                    store_id = int(input("Enter Store ID: "))
+                        # Get the year and month to filter transactions
+                        year = int(input("Enter Year (YYYY): "))
+                        month = int(input("Enter Month (MM): "))
                     
-                    # Retrieve and display store information for verification
-                    # This confirms we have the right store
-                    search_store(conn, store_id)
+                        include_items = input("Include items? (y/n): ").lower() == "y"
                     
-                    # Get the year to filter transactions
-                    year = int(input("Enter year (YYYY):"))
-                    
-                    # Generate and display the annual sales report for this store and year
-                    # The function handles retrieving and formatting the sales data
-                    sales = get_sales_report_year(conn, store_id, year)
+                        # Display the customer's transactions for this month one page at a time
+                        # Each page is fetched with a single query, continuing after the previous page
+                        page_token = None
+                        while True:
+                            page = get_customer_activity(conn, customerid, year=year, month=month,
+                                                         page_token=page_token, include_items=include_items)
+                            if page is None:
+                                break
+                            if not page["transactions"] and page_token is None:
+                                print("No transactions found.")
+                            for transaction in page["transactions"]:
+                                print(transaction)
+                                for item in page["items"].get(transaction[0], []):
+                                    print(f"    ProductID: {item[0]}, Quantity: {item[1]}, Discount: {item[2]}%")
+                            page_token = page["next_page_token"]
+                            if page_token is None or input("Show next page? (y/n): ").lower() != "y":
+                                break
                                     
-                # Option 3: Generate product stock report
-                # Shows current inventory levels for specified products at a store
-                case "3":
-                    # Get the store ID for the report
-                    store_id = int(input("Enter Store ID: "))
+                    # Option 2: Generate annual sales report
+                    # Shows all sales for a specific store in a given year
+                    case "2":
+                        # Get the store ID for the report
+                        store_id = int(input("Enter Store ID: "))
                     
-                    # Retrieve and display store information for verification
-                    # This confirms we have the right store
-                    search_store(conn, store_id)
+                        # Retrieve and display store information for verification
+                        # This confirms we have the right store
+                        search_store(conn, store_id)
                     
-                    # Collect multiple product IDs to include in the report
-                    # Using a loop to allow adding any number of products
-                    product_ids = []
-                    while True:
-                        # Get product ID or exit the loop if user is done
-                        product_id = input("Enter Product ID (or 'done' to finish): ")
-                        if product_id.lower() == "done":
-                            break
-                        # Add this product ID to our collection
-                        product_ids.append(product_id)
+                        # Get the year to filter transactions
+                        year = int(input("Enter year (YYYY):"))
                     
-                    # Generate and display the stock report for these products at this store
-                    # The function handles retrieving and formatting the inventory data
-                    get_products_quantity(conn, store_id, product_ids)
-                case "4":
-                    store_id = int(input("Enter Store ID: "))
-                    search_store(conn, store_id)
-                    get_day_sales_report(conn,store_id,input("Enter day (YYYY-MM-DD): "))
-                case "5":
-                    store_id = int(input("Enter Store ID: "))
-                    search_store(conn, store_id)
-                    get_monthly_sales_report(conn,store_id,input("Enter year (YYYY)"), input("Enter month (MM): "))
-                case "6":
-                    store_id = int(input("Enter Store ID: "))
-                    get_all_products_quantity(conn, store_id)
-                case _:
-                    print("Invalid choice. Please try again.")
+                        # Monthly totals come from the daily rollup; otherwise every transaction is listed
+                        use_rollup = input("Monthly totals only? (y/n): ").lower() == "y"
+                        
+                        # Generate and display the annual sales report for this store and year
+                        # The function handles retrieving and formatting the sales data
+                        sales = get_sales_report_year(conn, store_id, year, use_rollup)
+                                    
+                    # Option 3: Generate product stock report
+                    # Shows current inventory levels for specified products at a store
+                    case "3":
+                        # Get the store ID for the report
+                        store_id = int(input("Enter Store ID: "))
                     
-        # =====================================================================
-        # Exit the program
-        # Breaks out of the main loop and closes the database connection
-        # This is the clean way to terminate the program
-        # =====================================================================
-        elif choice == "0":
-            print("Exiting...")
-            break  # Exit the main program loop
+                        # Retrieve and display store information for verification
+                        # This confirms we have the right store
+                        search_store(conn, store_id)
                     
-        # =====================================================================
-        # Handle invalid main menu choice
-        # Catches any input that doesn't match valid menu options
-        # Provides feedback if user enters an unrecognized option
-        # =====================================================================
-        else:
-            print("Invalid choice. Please try again.")
+                        # Collect multiple product IDs to include in the report
+                        # Using a loop to allow adding any number of products
+                        product_ids = []
+                        while True:
+                            # Get product ID or exit the loop if user is done
+                            product_id = input("Enter Product ID (or 'done' to finish): ")
+                            if product_id.lower() == "done":
+                                break
+                            # Add this product ID to our collection
+                            product_ids.append(product_id)
                     
+                        # Generate and display the stock report for these products at this store
+                        # The function handles retrieving and formatting the inventory data
+                        get_products_quantity(conn, store_id, product_ids)
+                    case "4":
+                        store_id = int(input("Enter Store ID: "))
+                        search_store(conn, store_id)
+                        day = input("Enter day (YYYY-MM-DD): ")
+                        get_day_sales_report(conn, store_id, day, input("Day totals only? (y/n): ").lower() == "y")
+                    case "5":
+                        store_id = int(input("Enter Store ID: "))
+                        search_store(conn, store_id)
+                        # The monthly totals are read from the daily sales rollup
+                        get_monthly_sales_report(conn,store_id,input("Enter year (YYYY)"), input("Enter month (MM): "),
+                                                 use_rollup=True)
+                    # Option 6: Store stock report, lowest stock first
+                    # An optional threshold limits the report to products that are running out
+                    case "6":
+                        store_id = int(input("Enter Store ID: "))
+                        threshold = input("Show products with at most this many in stock (blank for all): ")
+                        max_quantity = int(threshold) if threshold else None
+                        after = None
+                        while True:
+                            page = get_stock_report(conn, store_id, max_quantity, after=after)
+                            if page is None:
+                                break
+                            if not page["products"] and after is None:
+                                print("No matching products found.")
+                            for prod in page["products"]:
+                                print(f"ProductID: {prod[0]}, Name: {prod[1]}, QuantityInStock: {prod[2]}")
+                            after = page["next_page"]
+                            if after is None or input("Show next page? (y/n): ").lower() != "y":
+                                break
+                    # Option 7: Recompute the daily sales rollup from the raw transactions
+                    # Leave both dates blank to rebuild the whole history
+                    case "7":
+                        start = input("Enter first day (YYYY-MM-DD, blank for all): ") or None
+                        end = input("Enter day after the last day (YYYY-MM-DD, blank for all): ") or None
+                        try:
+                            print(f"Rebuilt {rebuild_daily_summary(conn, start, end)} daily summary rows.")
+                        except Exception as e:
+                            print(f"Error rebuilding daily sales summary: {e}")
+                    # Option 8: Stream a daily or annual sales report to a CSV or JSON Lines file
+                    # Rows are written as they arrive, so large reports do not fill memory or the terminal
+                    case "8":
+                        store_id = int(input("Enter Store ID: "))
+                        period = input("Export a day or a year? (day/year): ").lower()
+                        fmt = input("Format (csv/jsonl): ").lower() or "csv"
+                        path = input("Output file: ")
+                        batch_size = int(input("Rows per batch (blank for 1000): ") or 1000)
+                        try:
+                            if period == "day":
+                                rows = export_day_sales_report(conn, store_id, input("Enter day (YYYY-MM-DD): "),
+                                                               path, fmt, batch_size, progress_every=100000)
+                            else:
+                                rows = export_sales_report_year(conn, store_id, int(input("Enter year (YYYY): ")),
+                                                                path, fmt, batch_size, progress_every=100000)
+                            print(f"Exported {rows} rows to {path}.")
+                        except Exception as e:
+                            print(f"Error exporting sales report: {e}")
+                    # Option 9: Monthly, annual and stock reports for every store at once
+                    # Stores are processed in parallel, each worker on its own pooled connection
+                    case "9":
+                        # This menu action already holds one pooled connection, so the store list
+                        # and the workers need at least one more or they wait for it forever
+                        if pool.max_size < 2:
+                            print("Reports for all stores need a connection pool of at least 2 connections "
+                                  f"(it has {pool.max_size}). Raise the pool size or report stores one at a time.")
+                        else:
+                            year = int(input("Enter year (YYYY): "))
+                            month = int(input("Enter month (MM): "))
+                            started = time.perf_counter()
+                            results = run_store_reports(pool, year, month, max_workers=pool.max_size - 1)
+                            print_store_reports(results)
+                            print(f"{len(results)} stores reported in {time.perf_counter() - started:.3f}s")
+                    # Option 10: Show how often report results and product lookups were served from memory
+                    case "10":
+                        print(f"Reports: {report_cache.reports.stats()}")
+                        print(f"Products: {product_cache.catalog_stats()}")
+                        print(f"Customer names: {name_index.stats()}")
+                    # Option 11: Revenue, cost, margin and discount leakage per store and product
+                    # Leave the store or year blank to analyse every store or the whole history
+                    case "11":
+                        store_id = input("Enter Store ID (blank for all): ")
+                        year = input("Enter year (YYYY, blank for all): ")
+                        start, end = year_range(year) if year else (None, None)
+                        report = get_margin_report(conn, int(store_id) if store_id else None, start, end)
+                        if report is not None:
+                            print_margin_report(report)
+                    # Option 12: Leaderboards of the best-selling products and stores for a year or month
+                    case "12":
+                        year = int(input("Enter year (YYYY): "))
+                        month = input("Enter month (MM, blank for the whole year): ")
+                        start, end = month_range(year, month) if month else year_range(year)
+                        by = input("Rank by units or revenue? (units/revenue): ").lower() or "units"
+                        n = int(input("How many to show? (blank for 10): ") or 10)
+                        per_store = input("Top products within every store? (y/n): ").lower() == "y"
+                        print("--- Top Products ---")
+                        for row in get_top_products(conn, start, end, n, by, per_store=per_store) or []:
+                            store_label = f"Store {row[0]} " if row[0] is not None else ""
+                            print(f"{store_label}#{row[1]}: ProductID {row[2]} ({row[3]}), Units: {row[4]}, Revenue: {row[5]}")
+                        print("--- Top Stores ---")
+                        for row in get_top_stores(conn, start, end, n, by) or []:
+                            print(f"#{row[0]}: Store {row[1]} ({row[2]}), Units: {row[3]}, Revenue: {row[4]}")
+                    # Option 13: Fold stock movements into StoreInventory.QuantityInStock
+                    # Meant to run periodically; stock levels read the same before and after
+                    case "13":
+                        try:
+                            result = compact_stock(conn)
+                            print(f"Folded {result['movements']} movements into {result['products']} inventory rows "
+                                  f"in {result['batches']} batches (watermark {result['watermark']}).")
+                        except Exception as e:
+                            print(f"Error compacting stock journal: {e}")
+                    # Option 14: What to reorder, from each product's sales over the last weeks
+                    # One store is listed on screen; the whole chain is streamed to a file
+                    case "14":
+                        store_id = input("Enter Store ID (blank for all stores): ")
+                        window_days = int(input("Days of sales to use (blank for 28): ") or 28)
+                        lead_time_days = int(input("Delivery lead time in days (blank for 7): ") or 7)
+                        path = input("Output file (blank to show on screen): ")
+                        try:
+                            if path:
+                                fmt = input("Format (csv/jsonl): ").lower() or "csv"
+                                rows = export_replenishment_report(conn, path, fmt, int(store_id) if store_id else None,
+                                                                   window_days=window_days,
+                                                                   lead_time_days=lead_time_days,
+                                                                   progress_every=100000)
+                                print(f"Wrote {rows} purchase suggestions to {path}.")
+                            else:
+                                rows = get_replenishment_suggestions(conn, int(store_id) if store_id else None,
+                                                                     window_days=window_days,
+                                                                     lead_time_days=lead_time_days) or []
+                                if not rows:
+                                    print("Nothing needs reordering.")
+                                for row in rows:
+                                    print(f"Store {row[0]}, ProductID {row[1]} ({row[2]}): in stock {row[3]}, "
+                                          f"sold {row[4]} ({row[5]}/day), reorder point {row[6]}, order {row[7]}")
+                        except Exception as e:
+                            print(f"Error computing replenishment: {e}")
+                    case _:
+                        print("Invalid choice. Please try again.")
+            # =====================================================================
+            # Handle invalid main menu choice
+            # Catches any input that doesn't match valid menu options
+            # Provides feedback if user enters an unrecognized option
+            # =====================================================================
+            else:
+                print("Invalid choice. Please try again.")
+
+    # Close every pooled connection before exiting
+    pool.close()
+
 # Standard Python idiom to ensure main() is only called when the script is run directly
 # This allows the script to be imported without running the main function
 # Useful for testing or when incorporating this code into larger systems
@@ -0,0 +1,103 @@
+-- Migration 0001: initial MuskieCo schema
+-- The MuskieCo database itself is created by docker-compose.yml
+
+-- Store Table
+CREATE TABLE Store (
+    StoreID INT AUTO_INCREMENT PRIMARY KEY,
+    ManagerID INT UNIQUE,
+    StoreAddress VARCHAR(255) NOT NULL UNIQUE,
+    PhoneNumber VARCHAR(15) UNIQUE
+);
+
+-- Staff Table
+CREATE TABLE Staff (
+    StaffID INT PRIMARY KEY,
+    StoreID INT,
+    Name VARCHAR(100) NOT NULL,
+    Age INT CHECK (Age >= 18),
+    HomeAddress VARCHAR(255) NOT NULL,
+    PhoneNumber VARCHAR(15) UNIQUE,
+    Email VARCHAR(100) UNIQUE,
+    StartDate DATE,
+    FOREIGN KEY (StoreID) REFERENCES Store(StoreID) ON DELETE SET NULL
+);
+
+-- Customer Table
+CREATE TABLE Customer (
+    CustomerID INT PRIMARY KEY,
+    FirstName VARCHAR(50) NOT NULL,
+    LastName VARCHAR(50) NOT NULL,
+    Email VARCHAR(100) UNIQUE,
+    PhoneNumber VARCHAR(15) UNIQUE,
+    HomeAddress VARCHAR(255),
+    IsActive BOOLEAN DEFAULT TRUE,
+    SignUpDate DATE,
+    RewardPoints INT CHECK (RewardPoints >= 0)
+);
+
+-- CustomerSignUp Table
+CREATE TABLE CustomerSignUp (
+    SignUpStaffID INT,
+    CustomerID INT,
+    SignUpDate DATE,
+    PRIMARY KEY (SignUpStaffID, CustomerID),
+    FOREIGN KEY (SignUpStaffID) REFERENCES Staff(StaffID) ON DELETE CASCADE,
+    FOREIGN KEY (CustomerID) REFERENCES Customer(CustomerID) ON DELETE CASCADE
+);
+
+-- Product Table
+CREATE TABLE Product (
+    ProductID INT PRIMARY KEY,
+    ProductName VARCHAR(100) NOT NULL,
+    QuantityInStock INT CHECK (QuantityInStock >= 0),
+    BuyPrice DECIMAL(10,2) CHECK (BuyPrice >= 0),
+    SellPrice DECIMAL(10,2) CHECK (SellPrice >= 0),
+    StoreID INT,
+    FOREIGN KEY (StoreID) REFERENCES Store(StoreID) ON DELETE CASCADE
+);
+
+-- Transaction Table
+CREATE TABLE Transaction (
+    TransactionID INT AUTO_INCREMENT PRIMARY KEY,
+    StoreID INT,
+    CustomerID INT,
+    CashierID INT,
+    PurchaseDate DATE NOT NULL,
+    TotalPrice DECIMAL(10,2) CHECK (TotalPrice >= 0),
+    TransactionType ENUM('Buy', 'Return') NOT NULL,
+    FOREIGN KEY (StoreID) REFERENCES Store(StoreID) ON DELETE SET NULL,
+    FOREIGN KEY (CustomerID) REFERENCES Customer(CustomerID) ON DELETE SET NULL,
+    FOREIGN KEY (CashierID) REFERENCES Staff(StaffID) ON DELETE SET NULL
+);
+
+-- Discount Table
+CREATE TABLE Discount (
+    DiscountID INT PRIMARY KEY,
+    ProductID INT,
+    StoreID INT,
+    FOREIGN KEY (ProductID) REFERENCES Product(ProductID) ON DELETE CASCADE,
+    FOREIGN KEY (StoreID) REFERENCES Store(StoreID) ON DELETE CASCADE
+);
+
+-- DiscountDetails Table
+CREATE TABLE DiscountDetails (
+    ProductID INT,
+    StoreID INT,
+    DiscountPercentage DECIMAL(5,2) CHECK (DiscountPercentage >= 0 AND DiscountPercentage <= 100),
+    ValidFrom DATE NOT NULL,
+    ValidTo DATE NOT NULL,
+    PRIMARY KEY (ProductID, StoreID),
+    FOREIGN KEY (ProductID) REFERENCES Product(ProductID) ON DELETE CASCADE,
+    FOREIGN KEY (StoreID) REFERENCES Store(StoreID) ON DELETE CASCADE
+);
+
+-- TransactionItem Table
+CREATE TABLE TransactionItem (
+    TransactionID INT,
+    ProductID INT,
+    Quantity INT CHECK (Quantity > 0) NOT NULL,
+    DiscountPercentageApplied DECIMAL(5,2) CHECK (DiscountPercentageApplied >= 0 AND DiscountPercentageApplied <= 100),
+    PRIMARY KEY (TransactionID, ProductID),
+    FOREIGN KEY (TransactionID) REFERENCES Transaction(TransactionID) ON DELETE CASCADE,
+    FOREIGN KEY (ProductID) REFERENCES Product(ProductID) ON DELETE CASCADE
+);
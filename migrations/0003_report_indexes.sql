@@ -0,0 +1,6 @@
+-- Migration 0003: composite indexes for the date-range reports
+-- Sales reports filter Transaction by store and date range
+CREATE INDEX idx_transaction_store_date ON Transaction (StoreID, PurchaseDate);
+
+-- Customer activity reports filter Transaction by customer and date range
+CREATE INDEX idx_transaction_customer_date ON Transaction (CustomerID, PurchaseDate);
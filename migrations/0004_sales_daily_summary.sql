@@ -0,0 +1,29 @@
+-- Migration 0004: daily sales rollup used by the day, month and year sales reports
+-- One row per store and day, kept up to date by rollup.py whenever transactions are written
+CREATE TABLE SalesDailySummary (
+    StoreID INT NOT NULL,
+    SalesDate DATE NOT NULL,
+    TransactionCount INT NOT NULL DEFAULT 0,
+    GrossSales DECIMAL(14,2) NOT NULL DEFAULT 0,
+    ReturnsTotal DECIMAL(14,2) NOT NULL DEFAULT 0,
+    UnitsSold INT NOT NULL DEFAULT 0,
+    UnitsReturned INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (StoreID, SalesDate),
+    FOREIGN KEY (StoreID) REFERENCES Store(StoreID) ON DELETE CASCADE
+);
+
+-- Backfill the rollup from the transactions that already exist
+INSERT INTO SalesDailySummary (StoreID, SalesDate, TransactionCount, GrossSales, ReturnsTotal, UnitsSold, UnitsReturned)
+SELECT t.StoreID,
+       t.PurchaseDate,
+       COUNT(*),
+       SUM(IF(t.TransactionType = 'Buy', COALESCE(t.TotalPrice, 0), 0)),
+       SUM(IF(t.TransactionType = 'Return', COALESCE(t.TotalPrice, 0), 0)),
+       SUM(IF(t.TransactionType = 'Buy', COALESCE(u.Units, 0), 0)),
+       SUM(IF(t.TransactionType = 'Return', COALESCE(u.Units, 0), 0))
+FROM Transaction t
+LEFT JOIN (SELECT TransactionID, SUM(Quantity) AS Units
+           FROM TransactionItem
+           GROUP BY TransactionID) u ON u.TransactionID = t.TransactionID
+WHERE t.StoreID IS NOT NULL
+GROUP BY t.StoreID, t.PurchaseDate;
@@ -0,0 +1,6 @@
+-- Migration 0005: index for keyset-paginated customer activity
+-- Pages are read in (PurchaseDate, TransactionID) order within one customer,
+-- so this index replaces the (CustomerID, PurchaseDate) index from migration 0003
+CREATE INDEX idx_transaction_customer_date_id ON Transaction (CustomerID, PurchaseDate, TransactionID);
+
+DROP INDEX idx_transaction_customer_date ON Transaction;
@@ -0,0 +1,4 @@
+-- Migration 0006: index for the low-stock store report
+-- Rows for one store are kept in QuantityInStock order, so a threshold filter
+-- and keyset paging on (QuantityInStock, ProductID) read only the rows shown
+CREATE INDEX idx_product_store_quantity ON Product (StoreID, QuantityInStock);
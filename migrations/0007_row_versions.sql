@@ -0,0 +1,6 @@
+-- Migration 0007: row versions for optimistic concurrency
+-- Every update of a product, customer or staff row increments RowVersion, and
+-- versioned updates only apply when the row still has the version they read
+ALTER TABLE Product ADD COLUMN RowVersion INT NOT NULL DEFAULT 0;
+ALTER TABLE Customer ADD COLUMN RowVersion INT NOT NULL DEFAULT 0;
+ALTER TABLE Staff ADD COLUMN RowVersion INT NOT NULL DEFAULT 0;
@@ -0,0 +1,29 @@
+-- Migration 0008: append-only stock movement journal
+-- Product.QuantityInStock becomes a snapshot that includes every movement up to
+-- StockSnapshot.LastMovementID; current stock is the snapshot plus later movements
+CREATE TABLE StockMovement (
+    MovementID BIGINT AUTO_INCREMENT PRIMARY KEY,
+    ProductID INT NOT NULL,
+    MovementType ENUM('Sale', 'Return', 'Receipt', 'Adjustment') NOT NULL,
+    Quantity INT NOT NULL,
+    MovedAt DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    TransactionID INT NULL,
+    Note VARCHAR(255) NULL,
+    -- Tail reads: one product's movements after the watermark
+    INDEX idx_stock_movement_product (ProductID, MovementID),
+    -- As-of reads: one product's movements after a moment
+    INDEX idx_stock_movement_product_time (ProductID, MovedAt),
+    FOREIGN KEY (ProductID) REFERENCES Product(ProductID) ON DELETE CASCADE,
+    FOREIGN KEY (TransactionID) REFERENCES Transaction(TransactionID) ON DELETE SET NULL
+);
+
+-- Single-row watermark; compaction advances it together with the snapshot
+CREATE TABLE StockSnapshot (
+    SnapshotID INT PRIMARY KEY,
+    LastMovementID BIGINT NOT NULL DEFAULT 0,
+    TakenAt DATETIME NULL,
+    MovementsFolded BIGINT NOT NULL DEFAULT 0,
+    CHECK (SnapshotID = 1)
+);
+
+INSERT INTO StockSnapshot (SnapshotID, LastMovementID) VALUES (1, 0);
@@ -0,0 +1,5 @@
+-- Migration 0009: indexes for product name search
+-- Prefix search: LIKE 'abc%' and keyset paging in (ProductName, ProductID) order
+CREATE INDEX idx_product_name ON Product (ProductName);
+-- Full-text search: words anywhere in the name, ranked by relevance
+CREATE FULLTEXT INDEX ft_product_name ON Product (ProductName);
@@ -0,0 +1,4 @@
+-- Migration 0010: chain-wide date-range scans for the replenishment job
+-- Covers the Transaction columns the job reads, so a sales window across every
+-- store is read from the index without touching the table rows
+CREATE INDEX idx_transaction_date_store ON Transaction (PurchaseDate, StoreID, TransactionType);
@@ -0,0 +1,69 @@
+-- Migration 0011: per-store inventory
+-- Product becomes a chain-wide catalog (one row per product) and stock moves to
+-- StoreInventory, one row per product a store carries. The table is clustered on
+-- (StoreID, ProductID), so a store's stock is one primary-key range.
+CREATE TABLE StoreInventory (
+    StoreID INT NOT NULL,
+    ProductID INT NOT NULL,
+    -- Snapshot up to the StockSnapshot watermark, as Product.QuantityInStock was (see stock.py)
+    QuantityInStock INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (StoreID, ProductID),
+    -- Which stores carry a product
+    INDEX idx_store_inventory_product (ProductID, StoreID),
+    FOREIGN KEY (StoreID) REFERENCES Store(StoreID) ON DELETE CASCADE,
+    FOREIGN KEY (ProductID) REFERENCES Product(ProductID) ON DELETE CASCADE
+);
+
+INSERT INTO StoreInventory (StoreID, ProductID, QuantityInStock)
+SELECT StoreID, ProductID, COALESCE(QuantityInStock, 0) FROM Product WHERE StoreID IS NOT NULL;
+
+-- Movements are now kept per (store, product)
+ALTER TABLE StockMovement ADD COLUMN StoreID INT NULL AFTER MovementID;
+
+UPDATE StockMovement m JOIN Product p ON p.ProductID = m.ProductID SET m.StoreID = p.StoreID;
+
+-- Products that were not in any store had no stock to journal
+DELETE FROM StockMovement WHERE StoreID IS NULL;
+
+-- Foreign key names were generated by the server, so look them up before dropping
+SET @fk = (SELECT CONSTRAINT_NAME FROM information_schema.KEY_COLUMN_USAGE
+           WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'StockMovement'
+             AND COLUMN_NAME = 'ProductID' AND REFERENCED_TABLE_NAME = 'Product' LIMIT 1);
+SET @sql = COALESCE(CONCAT('ALTER TABLE StockMovement DROP FOREIGN KEY ', @fk), 'DO 0');
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+ALTER TABLE StockMovement
+    MODIFY StoreID INT NOT NULL,
+    DROP INDEX idx_stock_movement_product,
+    DROP INDEX idx_stock_movement_product_time,
+    -- Tail reads: one inventory row's movements after the watermark
+    ADD INDEX idx_stock_movement_inventory (StoreID, ProductID, MovementID),
+    -- As-of reads: one inventory row's movements after a moment
+    ADD INDEX idx_stock_movement_inventory_time (StoreID, ProductID, MovedAt),
+    ADD FOREIGN KEY (StoreID, ProductID) REFERENCES StoreInventory(StoreID, ProductID) ON DELETE CASCADE;
+
+-- Drop the store and stock columns from the catalog
+SET @fk = (SELECT CONSTRAINT_NAME FROM information_schema.KEY_COLUMN_USAGE
+           WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Product'
+             AND COLUMN_NAME = 'StoreID' AND REFERENCED_TABLE_NAME = 'Store' LIMIT 1);
+SET @sql = COALESCE(CONCAT('ALTER TABLE Product DROP FOREIGN KEY ', @fk), 'DO 0');
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @chk = (SELECT cc.CONSTRAINT_NAME FROM information_schema.CHECK_CONSTRAINTS cc
+            JOIN information_schema.TABLE_CONSTRAINTS tc
+              ON tc.CONSTRAINT_SCHEMA = cc.CONSTRAINT_SCHEMA AND tc.CONSTRAINT_NAME = cc.CONSTRAINT_NAME
+            WHERE tc.TABLE_SCHEMA = DATABASE() AND tc.TABLE_NAME = 'Product'
+              AND cc.CHECK_CLAUSE LIKE '%QuantityInStock%' LIMIT 1);
+SET @sql = COALESCE(CONCAT('ALTER TABLE Product DROP CHECK ', @chk), 'DO 0');
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+ALTER TABLE Product
+    DROP INDEX idx_product_store_quantity,
+    DROP COLUMN StoreID,
+    DROP COLUMN QuantityInStock;
@@ -0,0 +1,21 @@
+-- Migration 0012: store customer emails lower-cased and phone numbers as digits only
+-- Lookups normalize what is typed the same way and search the UNIQUE indexes for an exact match.
+-- A value whose normalized form is shared with another customer is left as entered
+-- rather than breaking the UNIQUE index; those customers need merging by hand.
+UPDATE Customer c
+JOIN (SELECT LOWER(TRIM(Email)) AS Normalized, COUNT(*) AS Holders
+      FROM Customer
+      WHERE Email IS NOT NULL
+      GROUP BY Normalized) AS emails
+  ON emails.Normalized = LOWER(TRIM(c.Email))
+SET c.Email = NULLIF(emails.Normalized, '')
+WHERE emails.Holders = 1;
+
+UPDATE Customer c
+JOIN (SELECT REGEXP_REPLACE(PhoneNumber, '[^0-9]', '') AS Normalized, COUNT(*) AS Holders
+      FROM Customer
+      WHERE PhoneNumber IS NOT NULL
+      GROUP BY Normalized) AS phones
+  ON phones.Normalized = REGEXP_REPLACE(c.PhoneNumber, '[^0-9]', '')
+SET c.PhoneNumber = NULLIF(phones.Normalized, '')
+WHERE phones.Holders = 1;
@@ -0,0 +1,14 @@
+-- Migration 0013: watermark for reward point accrual
+-- Transactions up to LastTransactionID have been posted to Customer.RewardPoints
+-- (see rewards.post_reward_points). Accrual starts after the transactions that
+-- already exist, so balances set by hand before this migration are not counted twice.
+CREATE TABLE RewardAccrual (
+    AccrualID INT PRIMARY KEY,
+    LastTransactionID INT NOT NULL DEFAULT 0,
+    PostedAt DATETIME NULL,
+    TransactionsPosted BIGINT NOT NULL DEFAULT 0,
+    CHECK (AccrualID = 1)
+);
+
+INSERT INTO RewardAccrual (AccrualID, LastTransactionID)
+SELECT 1, COALESCE(MAX(TransactionID), 0) FROM Transaction;
@@ -0,0 +1,5 @@
+-- Migration 0014: index for the low-stock store report on per-store inventory
+-- 0011 dropped idx_product_store_quantity along with Product.StoreID. This puts it back on
+-- StoreInventory: one store's rows in snapshot QuantityInStock order (then ProductID, from the
+-- primary key), so the threshold and keyset paging are range seeks (see database.get_stock_report)
+CREATE INDEX idx_store_inventory_quantity ON StoreInventory (StoreID, QuantityInStock);
@@ -0,0 +1,243 @@
+"""
+pool.py - Connection pool for the MuskieCo management system
+
+This module provides a bounded pool of database connections so that several
+registers and reporting jobs can share the MuskieCo database without queuing
+behind one socket. Connections are borrowed with the connection() context
+manager and handed back automatically when the block ends.
+
+The pool does not know how to open connections itself; it is given a factory
+function (see database.open_connection) so that the connection settings stay
+in database.py.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available within the borrow timeout."""
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of database connections.
+
+    Args:
+        factory (callable): Function that opens and returns a new connection.
+        min_size (int): Number of connections kept open even when idle.
+        max_size (int): Maximum number of connections open at the same time.
+        borrow_timeout (float): Seconds to wait for a free connection before giving up.
+        idle_timeout (float): Seconds an idle connection above min_size may live before it is closed.
+        initial (list): Already opened connections to place in the pool.
+    """
+
+    def __init__(self, factory, min_size=1, max_size=8, borrow_timeout=30.0, idle_timeout=300.0, initial=None):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+        self._factory = factory
+        self.min_size = min_size
+        self.max_size = max_size
+        self.borrow_timeout = borrow_timeout
+        self.idle_timeout = idle_timeout
+
+        # Idle connections are kept as (connection, time it was returned) pairs.
+        # The most recently returned connection is borrowed first so the others
+        # stay idle long enough to be evicted when load drops.
+        self._idle = []
+        self._size = 0
+        self._closed = False
+        self._lock = threading.Condition(threading.Lock())
+
+        # Counters reported by stats()
+        self._borrows = 0
+        self._waits = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._created = 0
+        self._evicted = 0
+        self._ping_failures = 0
+        self._timeouts = 0
+
+        for conn in initial or []:
+            self._idle.append((conn, time.monotonic()))
+            self._size += 1
+        while self._size < min_size:
+            self._idle.append((self._open(), time.monotonic()))
+            self._size += 1
+
+    def _open(self):
+        conn = self._factory()
+        self._created += 1
+        return conn
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _evict_idle(self, now):
+        """Closes idle connections above min_size that have been unused longer than idle_timeout."""
+        # Must be called with the lock held; returns the connections to close
+        # so the network round-trips happen outside the lock.
+        expired = []
+        keep = []
+        for conn, returned_at in self._idle:
+            if self._size - len(expired) > self.min_size and now - returned_at > self.idle_timeout:
+                expired.append(conn)
+            else:
+                keep.append((conn, returned_at))
+        self._idle = keep
+        self._size -= len(expired)
+        self._evicted += len(expired)
+        return expired
+
+    def acquire(self):
+        """
+        Borrows a connection from the pool, opening a new one if the pool is below max_size.
+
+        Every borrowed connection is pinged first; a connection that fails the
+        ping is discarded and replaced.
+
+        Returns:
+            pymysql.connections.Connection: A live connection.
+
+        Raises:
+            PoolTimeoutError: If no connection is free within borrow_timeout seconds.
+        """
+        started = time.monotonic()
+        deadline = started + self.borrow_timeout
+        waited = False
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                expired = self._evict_idle(time.monotonic())
+                conn = None
+                must_open = False
+                while conn is None and not must_open:
+                    if self._idle:
+                        conn = self._idle.pop()[0]
+                    elif self._size < self.max_size:
+                        # Reserve the slot before opening so other threads cannot overshoot max_size
+                        self._size += 1
+                        must_open = True
+                    else:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._timeouts += 1
+                            raise PoolTimeoutError(
+                                f"No database connection available after {self.borrow_timeout} seconds")
+                        waited = True
+                        self._lock.wait(remaining)
+
+            for stale in expired:
+                self._close_quietly(stale)
+
+            if must_open:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._lock.notify()
+                    raise
+            else:
+                # Liveness check on borrow: drop connections the server has closed
+                try:
+                    conn.ping(reconnect=False)
+                except Exception:
+                    self._close_quietly(conn)
+                    with self._lock:
+                        self._size -= 1
+                        self._ping_failures += 1
+                        self._lock.notify()
+                    continue
+
+            wait_time = time.monotonic() - started
+            with self._lock:
+                self._borrows += 1
+                if waited:
+                    self._waits += 1
+                self._total_wait += wait_time
+                self._max_wait = max(self._max_wait, wait_time)
+            return conn
+
+    def release(self, conn, discard=False):
+        """
+        Returns a borrowed connection to the pool.
+
+        Any transaction left open on the connection is rolled back so the next
+        borrower starts clean and no row locks are held while it sits idle.
+
+        Args:
+            conn (pymysql.connections.Connection): The connection to return.
+            discard (bool): Close the connection instead of keeping it.
+        """
+        if not discard:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+        with self._lock:
+            if discard or self._closed:
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+                conn = None
+            self._lock.notify()
+        if conn is not None:
+            self._close_quietly(conn)
+
+    @contextmanager
+    def connection(self):
+        """
+        Context manager that borrows a connection and always returns it.
+
+        Usage:
+            with pool.connection() as conn:
+                search_store(conn, 1)
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def stats(self):
+        """
+        Reports the current state of the pool.
+
+        Returns:
+            dict: size, idle and in_use connection counts, borrow and wait counters,
+                  average and maximum wait time in seconds, and eviction counters.
+        """
+        with self._lock:
+            idle = len(self._idle)
+            return {
+                "size": self._size,
+                "idle": idle,
+                "in_use": self._size - idle,
+                "max_size": self.max_size,
+                "borrows": self._borrows,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "avg_wait": self._total_wait / self._borrows if self._borrows else 0.0,
+                "max_wait": self._max_wait,
+                "created": self._created,
+                "evicted": self._evicted,
+                "ping_failures": self._ping_failures,
+            }
+
+    def close(self):
+        """Closes every idle connection; borrowed connections are closed when they are released."""
+        with self._lock:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle = []
+            self._size -= len(idle)
+            self._lock.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
@@ -0,0 +1,126 @@
+"""
+pricing.py - Transaction pricing engine for the MuskieCo management system
+
+This module prices transactions from their TransactionItem rows in a single
+joined query instead of looking up every product separately. Each line is
+priced as SellPrice x Quantity, less DiscountPercentageApplied, with every
+amount rounded to cents by the database.
+
+Results are returned as dictionaries rather than printed, so the same
+functions serve the interactive menus and end-of-day batch jobs.
+"""
+from decimal import Decimal
+
+# Largest number of TransactionIDs placed in one IN (...) list
+DEFAULT_CHUNK_SIZE = 1000
+
+# Per-line amounts, computed in SQL so every caller rounds the same way
+LINE_COLUMNS = """
+    ti.TransactionID,
+    ti.ProductID,
+    ti.Quantity,
+    p.SellPrice,
+    COALESCE(ti.DiscountPercentageApplied, 0) AS DiscountPercentage,
+    ROUND(p.SellPrice * ti.Quantity, 2) AS Gross,
+    ROUND(p.SellPrice * ti.Quantity * COALESCE(ti.DiscountPercentageApplied, 0) / 100, 2) AS Discount
+"""
+
+
+def _chunks(values, size):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _empty_price(transaction_id):
+    return {"transaction_id": transaction_id, "lines": [], "items": 0, "units": 0,
+            "gross": Decimal("0.00"), "discount": Decimal("0.00"), "total": Decimal("0.00")}
+
+
+def price_transactions(conn, transaction_ids, include_lines=True, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Prices many transactions at once.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        transaction_ids (iterable): The IDs of the transactions to price.
+        include_lines (bool): Return every priced line; when False only the
+                              per-transaction totals are fetched (GROUP BY in SQL).
+        chunk_size (int): Maximum number of IDs sent in one query.
+
+    Returns:
+        dict: TransactionID -> price dictionary with keys transaction_id, lines,
+              items, units, gross, discount and total. Each line is a dictionary
+              with product_id, quantity, unit_price, discount_percentage, gross,
+              discount and total. Transactions without items are priced at 0.
+    """
+    ids = sorted({int(transaction_id) for transaction_id in transaction_ids})
+    prices = {transaction_id: _empty_price(transaction_id) for transaction_id in ids}
+
+    with conn.cursor() as cursor:
+        for chunk in _chunks(ids, chunk_size):
+            placeholders = ','.join(['%s'] * len(chunk))
+            if include_lines:
+                cursor.execute(
+                    f"""
+                    SELECT {LINE_COLUMNS}
+                    FROM TransactionItem ti
+                    JOIN Product p ON p.ProductID = ti.ProductID
+                    WHERE ti.TransactionID IN ({placeholders})
+                    ORDER BY ti.TransactionID, ti.ProductID
+                    """,
+                    chunk
+                )
+                for transaction_id, product_id, quantity, unit_price, percentage, gross, discount in cursor.fetchall():
+                    price = prices[transaction_id]
+                    price["lines"].append({
+                        "product_id": product_id,
+                        "quantity": quantity,
+                        "unit_price": unit_price,
+                        "discount_percentage": percentage,
+                        "gross": gross,
+                        "discount": discount,
+                        "total": gross - discount,
+                    })
+                    price["items"] += 1
+                    price["units"] += quantity
+                    price["gross"] += gross
+                    price["discount"] += discount
+                    price["total"] += gross - discount
+            else:
+                cursor.execute(
+                    f"""
+                    SELECT line.TransactionID,
+                           COUNT(*),
+                           SUM(line.Quantity),
+                           SUM(line.Gross),
+                           SUM(line.Discount)
+                    FROM (SELECT {LINE_COLUMNS}
+                          FROM TransactionItem ti
+                          JOIN Product p ON p.ProductID = ti.ProductID
+                          WHERE ti.TransactionID IN ({placeholders})) AS line
+                    GROUP BY line.TransactionID
+                    """,
+                    chunk
+                )
+                for transaction_id, items, units, gross, discount in cursor.fetchall():
+                    price = prices[transaction_id]
+                    price["items"] = items
+                    price["units"] = int(units)
+                    price["gross"] = gross
+                    price["discount"] = discount
+                    price["total"] = gross - discount
+    return prices
+
+
+def price_transaction(conn, transaction_id):
+    """
+    Prices a single transaction with one query.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        transaction_id (int): The ID of the transaction to price.
+
+    Returns:
+        dict: The price dictionary described in price_transactions().
+    """
+    return price_transactions(conn, [transaction_id])[int(transaction_id)]
@@ -0,0 +1,130 @@
+"""
+product_cache.py - Read-through cache of the product catalog
+
+Product names and prices change rarely but are looked up for every item a
+register scans, so catalog rows are kept in an in-process LRU cache keyed by
+ProductID. Stock is deliberately not cached: it changes with every sale and
+is always read from StoreInventory and the movement journal (see stock.py).
+
+Product writes in this process invalidate the affected entries; changes made
+by other processes are picked up when the entry's TTL runs out.
+"""
+from cache import LRUCache, MISSING
+
+# Shared by get_product() and the registers
+catalog = LRUCache(max_entries=10000, ttl=600.0)
+
+# Columns of a cached catalog entry, in tuple order
+CATALOG_COLUMNS = "ProductID, ProductName, BuyPrice, SellPrice, RowVersion"
+
+# Maximum number of product IDs sent in one IN (...) list when loading misses
+LOAD_CHUNK_SIZE = 1000
+
+
+def get_catalog_entry(conn, product_id):
+    """
+    Returns one product's catalog row, from the cache when possible.
+
+    Unknown products are cached as None too, so repeatedly scanning a bad
+    code does not hit the database each time.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        product_id (int/str): The ID of the product.
+
+    Returns:
+        tuple: (ProductID, ProductName, BuyPrice, SellPrice, RowVersion), None if not found.
+    """
+    product_id = int(product_id)
+
+    def load():
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT {CATALOG_COLUMNS} FROM Product WHERE ProductID = %s", (product_id,))
+            return cursor.fetchone()
+
+    return catalog.get_or_load(product_id, load)
+
+
+def get_catalog_entries(conn, product_ids, chunk_size=LOAD_CHUNK_SIZE):
+    """
+    Returns catalog rows for many products, loading all misses with a few IN queries.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        product_ids (iterable): The products to look up.
+        chunk_size (int): Maximum number of product IDs per query.
+
+    Returns:
+        dict: ProductID -> catalog tuple, for the products that exist.
+    """
+    entries = {}
+    misses = []
+    for product_id in sorted({int(product_id) for product_id in product_ids}):
+        entry = catalog.get(product_id)
+        if entry is MISSING:
+            misses.append(product_id)
+        elif entry is not None:
+            entries[product_id] = entry
+
+    with conn.cursor() as cursor:
+        for start in range(0, len(misses), chunk_size):
+            chunk = misses[start:start + chunk_size]
+            cursor.execute(
+                f"SELECT {CATALOG_COLUMNS} FROM Product WHERE ProductID IN ({','.join(['%s'] * len(chunk))})",
+                chunk
+            )
+            found = {row[0]: row for row in cursor.fetchall()}
+            for product_id in chunk:
+                catalog.put(product_id, found.get(product_id))
+            entries.update(found)
+    return entries
+
+
+def warm_catalog(conn, store_id=None):
+    """
+    Bulk-loads catalog rows into the cache, up to its size limit.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        store_id (int): Only load the products this store carries; the whole catalog when omitted.
+
+    Returns:
+        int: The number of products loaded.
+    """
+    query = f"SELECT {CATALOG_COLUMNS} FROM Product"
+    params = []
+    if store_id is not None:
+        query += " WHERE ProductID IN (SELECT ProductID FROM StoreInventory WHERE StoreID = %s)"
+        params.append(store_id)
+    query += " ORDER BY ProductID LIMIT %s"
+    params.append(catalog.max_entries)
+
+    loaded = 0
+    with conn.cursor() as cursor:
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(LOAD_CHUNK_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                catalog.put(row[0], row)
+            loaded += len(rows)
+    return loaded
+
+
+def invalidate_product(product_id=None):
+    """
+    Drops cached catalog rows.
+
+    Args:
+        product_id (int/str): The product that was added, changed or deleted; None drops every product.
+    """
+    if product_id is None:
+        catalog.clear()
+    else:
+        catalog.invalidate(int(product_id))
+
+
+def catalog_stats():
+    """Returns the catalog cache's size and hit-rate counters (see LRUCache.stats())."""
+    return catalog.stats()
@@ -1,4 +1,19 @@
-from database import get_input, get_product, delete_product, update_product, add_product
+from decimal import Decimal, InvalidOperation
+
+from concurrency import changed_columns
+from csv_import import IMPORT_CHUNK_SIZE, import_csv
+from database import (get_input, get_product, delete_product, update_product_fields, adjust_product_stock,
+                      count_product_stock, add_product)
+from product_cache import invalidate_product
+from report_cache import invalidate_stock
+from search import fulltext_terms, search_products_by_prefix, search_products_fulltext
+from stock import append_movements, get_movements, get_stock_as_of, pending_stock
+
+# Columns expected in the header of a product import file
+IMPORT_COLUMNS = ("ProductID", "ProductName", "QuantityInStock", "BuyPrice", "SellPrice", "StoreID")
+
+# Largest value a DECIMAL(10,2) price column can hold
+MAX_PRICE = Decimal("99999999.99")
 
 
 def products(conn):
@@ -8,6 +23,9 @@ def products(conn):
     print("2. Update Product")
     print("3. Delete Product")
     print("4. View Product")
+    print("5. Import Products from CSV")
+    print("6. Stock History")
+    print("7. Search Products by Name")
     sub_choice = int(input("Enter choice: "))
 
     # Using Python 3.10's match-case statement for cleaner code structure
@@ -29,78 +47,87 @@ def products(conn):
             add_product(conn, product_id, product_name, QuantityInStock, BuyPrice, SellPrice, store_id)
 
         # Option 2: Update an existing product
-        # Allows modifying product details like name, quantity, prices, and store
+        # Allows modifying the catalog details (name and prices) and a store's stock
         case 2:
             product_id = get_input("Enter Product ID: ")  # Get ID of product to update
 
             # Retrieve product details to display and update
-            # get_product fetches the product record and returns it as a tuple
-            product = get_product(conn, product_id)
+            # The catalog cache is enough here: stock changes go through the journal, and a stale
+            # cached row is caught by the RowVersion check when the update is written
+            product = get_product(conn, product_id, use_cache=True)
 
             # Only proceed with the update if the product was found in the database
             if product:
                 # Show update options submenu
                 print("\n--- What would you like to update? ---")
                 print("1. Product Name")
-                print("2. Quantity In Stock")
-                print("3. Buy Price")
-                print("4. Sell Price")
-                print("5. Store ID")
+                print("2. Buy Price")
+                print("3. Sell Price")
+                print("4. Quantity In Stock at a Store (stock count)")
+                print("5. Add/Remove Stock at a Store (+/-)")
+                print("6. Receive Delivery at a Store")
                 update_choice = int(input("Enter choice: "))
 
+                # Edit a copy of the row; only the fields that differ from what was read are written
+                # product[0] = ProductID, product[1] = ProductName, product[2] = BuyPrice,
+                # product[3] = SellPrice, product[4] = RowVersion
+                edited = list(product)
+
+                # Stock is kept per store; counting or receiving at a new store starts stocking it there
+                if update_choice in (4, 5, 6):
+                    store_id = int(get_input("Enter Store ID: "))
+
                 # Using another match-case for update options
                 # This creates a nested menu structure for product updates
                 match update_choice:
                     # Update product name
                     case 1:
-                        product_name = get_input("Enter new Product Name: ")
-                        # Access product tuple elements by index:
-                        # product[0] = ProductID, product[1] = ProductName, product[2] = QuantityInStock,
-                        # product[3] = BuyPrice, product[4] = SellPrice, product[5] = StoreID
-                        # Keep other fields the same, only update the name
-                        update_product(conn, product[0], product_name, product[2], product[3], product[4],
-                                       product[5])
-
-                    # Update quantity in stock
-                    case 2:
-                        QuantityInStock = int(get_input("Enter new Quantity In Stock: "))
-                        # Keep other fields the same, only update the quantity
-                        update_product(conn, product[0], product[1], QuantityInStock, product[3], product[4],
-                                       product[5])
+                        edited[1] = get_input("Enter new Product Name: ")
 
                     # Update buy price
-                    case 3:
-                        BuyPrice = float(get_input("Enter new Buy Price: "))
-                        # Keep other fields the same, only update the buy price
-                        update_product(conn, product[0], product[1], product[2], BuyPrice, product[4],
-                                       product[5])
+                    case 2:
+                        edited[2] = float(get_input("Enter new Buy Price: "))
 
                     # Update sell price
+                    case 3:
+                        edited[3] = float(get_input("Enter new Sell Price: "))
+
+                    # Stock count: the difference from the current stock is journalled as an adjustment
                     case 4:
-                        SellPrice = float(get_input("Enter new Sell Price: "))
-                        # Keep other fields the same, only update the sell price
-                        update_product(conn, product[0], product[1], product[2], product[3], SellPrice,
-                                       product[5])
+                        count_product_stock(conn, store_id, product[0],
+                                            int(get_input("Enter counted Quantity In Stock: ")))
 
-                    # Update store ID
+                    # Relative stock change, appended to the movement journal so no concurrent change is lost
                     case 5:
-                        store_id = int(get_input("Enter new Store ID: "))
-                        # Keep other fields the same, only update the store ID
-                        update_product(conn, product[0], product[1], product[2], product[3], product[4],
-                                       store_id)
+                        delta = int(get_input("Enter change in stock (e.g. 5 or -2): "))
+                        adjust_product_stock(conn, store_id, product[0], delta,
+                                             note=get_input("Enter reason: ") or None)
+
+                    # Stock received from a supplier
+                    case 6:
+                        received = int(get_input("Enter quantity received: "))
+                        if received > 0:
+                            adjust_product_stock(conn, store_id, product[0], received, "Receipt",
+                                                 get_input("Enter delivery reference: ") or None)
+                        else:
+                            print("Quantity received must be positive.")
 
                     # Handle invalid update choice with wildcard pattern match
                     case _:
                         print("Invalid choice. Please try again.")
 
+                if update_choice in (1, 2, 3):
+                    # Rejected if anyone else changed the same field since the product was displayed
+                    update_product_fields(conn, product[0], changed_columns("Product", product, edited), product)
+
         # Option 3: Delete a product
         # Removes a product from the database by ID after confirmation
         case 3:
             product_id = get_input("Enter Product ID: ")  # Get ID of product to delete
 
             # Display product information before deletion for verification
-            # get_product retrieves and displays the product details
-            get_product(conn, product_id)
+            # get_product retrieves and displays the product details from the catalog cache
+            get_product(conn, product_id, use_cache=True)
 
             # Ask for confirmation before deleting the product
             print("\n--- Are you sure you want to delete this product? ---")
@@ -120,6 +147,192 @@ def products(conn):
                     print("Invalid choice. Please try again.")
         case 4:
             get_product(conn, get_input("Enter Product ID: "))
+        # Option 5: Load a whole catalog from a CSV file
+        # The file needs a header row: ProductID,ProductName,QuantityInStock,BuyPrice,SellPrice,StoreID
+        # One row per product per store that carries it
+        case 5:
+            path = get_input("Enter CSV file path")
+            upsert = get_input("Update products that already exist? (y/n)").lower() == "y"
+            import_products_csv(conn, path, upsert=upsert)
+        # Option 6: Recent stock movements at a store, and optionally the stock level on an earlier date
+        case 6:
+            product_id = int(get_input("Enter Product ID: "))
+            store_id = int(get_input("Enter Store ID: "))
+            for movement in get_movements(conn, store_id, product_id):
+                # movement = (MovementID, MovedAt, MovementType, Quantity, TransactionID, Note)
+                reference = f", Transaction {movement[4]}" if movement[4] else ""
+                note = f" ({movement[5]})" if movement[5] else ""
+                print(f"{movement[1]}: {movement[2]} {movement[3]:+d}{reference}{note}")
+            as_of = get_input("Show stock as of (YYYY-MM-DD HH:MM, blank to skip): ")
+            if as_of:
+                levels = get_stock_as_of(conn, store_id, [product_id], as_of)
+                print(f"In stock as of {as_of}: {levels.get(product_id, 'not stocked at this store')}")
+        # Option 7: Find products by name instead of ID
+        # Prefix mode lists names starting with the text; word mode ranks names containing every word
+        case 7:
+            text = get_input("Enter product name or words: ")
+            store = get_input("Enter Store ID (blank for all stores): ")
+            store_id = int(store) if store else None
+            by_words = get_input("Match words anywhere in the name? (y/n): ").lower() == "y"
+            if by_words and not fulltext_terms(text):
+                # The full-text index skips very short words, so search those as a prefix
+                print("Words are too short for a word search; searching by prefix instead.")
+                by_words = False
+            next_page = None
+            while True:
+                if by_words:
+                    page = search_products_fulltext(conn, text, store_id, page=next_page or 0)
+                else:
+                    page = search_products_by_prefix(conn, text, store_id, after=next_page)
+                if page is None:
+                    break
+                if not page["products"] and next_page is None:
+                    print("No matching products found.")
+                for prod in page["products"]:
+                    print(f"ProductID: {prod[0]}, Name: {prod[1]}, Sell Price: {prod[2]}")
+                next_page = page["next_page"]
+                if next_page is None or get_input("Show next page? (y/n): ").lower() != "y":
+                    break
         # Handle invalid product menu choice with wildcard pattern match
         case _:
             print("Invalid choice. Please try again.")
+
+
+def validate_product_row(row, store_ids):
+    """
+    Converts and checks one CSV row against the Product and StoreInventory constraints.
+
+    Args:
+        row (dict): One row from csv.DictReader.
+        store_ids (set): Existing StoreIDs, used to check the foreign key.
+
+    Returns:
+        tuple: (ProductID, ProductName, QuantityInStock, BuyPrice, SellPrice, StoreID)
+
+    Raises:
+        ValueError: If a value is missing, has the wrong type or breaks a constraint.
+    """
+    try:
+        product_id = int(row["ProductID"])
+        quantity = int(row["QuantityInStock"])
+        store_id = int(row["StoreID"])
+        buy_price = Decimal(row["BuyPrice"]).quantize(Decimal("0.01"))
+        sell_price = Decimal(row["SellPrice"]).quantize(Decimal("0.01"))
+        # quantize() keeps NaN, which cannot be compared with the price range below
+        if not buy_price.is_finite() or not sell_price.is_finite():
+            raise ValueError("Prices must be finite")
+    except (TypeError, ValueError, InvalidOperation):
+        raise ValueError("ProductID, QuantityInStock and StoreID must be whole numbers and prices must be numbers")
+    name = (row["ProductName"] or "").strip()
+    if not name or len(name) > 100:
+        raise ValueError("ProductName must be 1 to 100 characters")
+    if quantity < 0:
+        raise ValueError("QuantityInStock must be 0 or more")
+    if not (0 <= buy_price <= MAX_PRICE and 0 <= sell_price <= MAX_PRICE):
+        raise ValueError(f"Prices must be between 0 and {MAX_PRICE}")
+    if store_id not in store_ids:
+        raise ValueError(f"StoreID {store_id} does not exist")
+    return product_id, name, quantity, buy_price, sell_price, store_id
+
+
+def import_products_csv(conn, path, chunk_size=IMPORT_CHUNK_SIZE, upsert=False):
+    """
+    Streams products from a CSV file into the catalog and the stores' inventory.
+
+    Each row is one product at one store; a product carried by several stores
+    has a row per store, with the same name and prices. The file is read row
+    by row and validated client-side; valid rows are sent as multi-row INSERT
+    statements of chunk_size rows, each chunk committed on its own. A chunk
+    the database rejects is rolled back and reported without stopping the
+    import. Products already in the catalog are added to the stores listed.
+    In upsert mode their name and prices are updated, and the QuantityInStock
+    of stores that already carry them is treated as a stock count: the
+    difference from the current stock is journalled as an adjustment (see
+    stock.py). Without upsert, a store that already carries the product fails
+    the chunk.
+
+    Rows are streamed, but duplicates are checked across the whole file: the
+    (ProductID, StoreID) pairs read and each product's name and prices are kept
+    until the import ends, so memory grows with the number of distinct
+    products in the file (a few hundred bytes each).
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        path (str): The CSV file to import; the header must contain IMPORT_COLUMNS.
+        chunk_size (int): Rows per INSERT statement and commit.
+        upsert (bool): Update products and store stock that already exist instead of rejecting them.
+
+    Returns:
+        dict: imported, rejected and failed (rows in rolled back chunks) counts,
+              errors ((line number, message) tuples for the first rejected rows),
+              seconds and rows_per_sec. None if the file cannot be read.
+    """
+    catalog_query = "INSERT INTO Product (ProductID, ProductName, BuyPrice, SellPrice) VALUES (%s, %s, %s, %s)"
+    inventory_query = "INSERT INTO StoreInventory (StoreID, ProductID, QuantityInStock) VALUES (%s, %s, %s)"
+    if upsert:
+        catalog_query += (" ON DUPLICATE KEY UPDATE ProductName = VALUES(ProductName), "
+                          "BuyPrice = VALUES(BuyPrice), SellPrice = VALUES(SellPrice), RowVersion = RowVersion + 1")
+        # Stock of existing inventory rows is left alone here and adjusted through the journal in write()
+        inventory_query += " ON DUPLICATE KEY UPDATE QuantityInStock = QuantityInStock"
+    else:
+        # A product already in the catalog keeps its details and is only added to the listed stores
+        catalog_query += " ON DUPLICATE KEY UPDATE ProductID = ProductID"
+
+    def write(cursor, chunk, reject):
+        products = [product for _, product in chunk]
+        adjustments = []
+        if upsert:
+            # Lock the inventory rows that already exist, in primary-key order, and turn the
+            # file's quantity into an adjustment from their current stock
+            keys = sorted((product[5], product[0]) for product in products)
+            cursor.execute(
+                f"SELECT StoreID, ProductID, QuantityInStock FROM StoreInventory "
+                f"WHERE (StoreID, ProductID) IN ({','.join(['(%s, %s)'] * len(keys))}) "
+                f"ORDER BY StoreID, ProductID FOR UPDATE",
+                [value for key in keys for value in key]
+            )
+            existing = {(store_id, product_id): quantity for store_id, product_id, quantity in cursor.fetchall()}
+            by_store = {}
+            for store_id, product_id in existing:
+                by_store.setdefault(store_id, []).append(product_id)
+            pending = {(store_id, product_id): quantity
+                       for store_id, product_ids in by_store.items()
+                       for product_id, quantity in pending_stock(cursor, store_id, product_ids).items()}
+            for product in products:
+                key = (product[5], product[0])
+                if key in existing:
+                    current = existing[key] + pending.get(key, 0)
+                    if product[2] != current:
+                        adjustments.append((product[5], product[0], "Adjustment", product[2] - current,
+                                            None, "CSV import"))
+        # One catalog row per product, then one inventory row per product and store
+        catalog = {product[0]: (product[0], product[1], product[3], product[4]) for product in products}
+        cursor.executemany(catalog_query, list(catalog.values()))
+        cursor.executemany(inventory_query, [(product[5], product[0], product[2]) for product in products])
+        if adjustments:
+            append_movements(cursor, adjustments)
+
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT StoreID FROM Store")
+        store_ids = {row[0] for row in cursor.fetchall()}
+
+    # (ProductID, StoreID) pairs already read, and each product's catalog details
+    seen = set()
+    details = {}
+
+    def validate(row):
+        product = validate_product_row(row, store_ids)
+        if (product[0], product[5]) in seen:
+            raise ValueError(f"ProductID {product[0]} appears more than once for StoreID {product[5]}")
+        catalog_details = (product[1], product[3], product[4])
+        if details.setdefault(product[0], catalog_details) != catalog_details:
+            raise ValueError(f"ProductID {product[0]} has a different name or prices on an earlier line")
+        seen.add((product[0], product[5]))
+        return product
+
+    try:
+        return import_csv(conn, path, IMPORT_COLUMNS, validate, write, chunk_size, "products")
+    finally:
+        # Stock reports and cached catalog rows may now be out of date for any product
+        invalidate_stock()
+        invalidate_product()
@@ -0,0 +1,165 @@
+"""
+replenishment.py - Reorder points and purchase suggestions for the MuskieCo management system
+
+For every product in every store the job works out how fast it sells (units
+sold less units returned over a sliding window of days), how much stock is
+needed to last until a new delivery arrives, and how much to order.
+
+    velocity       = net units sold in the window / window days
+    reorder point  = velocity x (lead time + safety days)
+    order up to    = velocity x (lead time + safety days + cover days)
+    suggested qty  = order up to - current stock, when stock is at or below the reorder point
+
+The whole calculation is one aggregated query: sales in the window are summed
+per (store, product) in a single pass over Transaction and TransactionItem,
+joined to every store's inventory rows and their current stock, and the rows are streamed
+straight into the report file. Nothing is looped over in Python, so the full
+chain is handled in one scan.
+"""
+from datetime import date, timedelta
+
+from export import DEFAULT_BATCH_SIZE, export_query
+from stock import STOCK_LEVEL
+
+# Days of sales history used to measure velocity
+WINDOW_DAYS = 28
+# Days between placing an order and the stock arriving
+LEAD_TIME_DAYS = 7
+# Extra days of stock kept against demand spikes and late deliveries
+SAFETY_DAYS = 3
+# Days of sales an order should cover once it has arrived
+COVER_DAYS = 14
+
+REPORT_COLUMNS = ("StoreID", "ProductID", "ProductName", "InStock", "UnitsSold", "DailyVelocity",
+                  "ReorderPoint", "SuggestedQuantity")
+
+
+def build_replenishment_query(end=None, window_days=WINDOW_DAYS, lead_time_days=LEAD_TIME_DAYS,
+                              safety_days=SAFETY_DAYS, cover_days=COVER_DAYS, store_id=None,
+                              include_all=False):
+    """
+    Builds the replenishment query and its parameters.
+
+    Args:
+        end (str/date): Day after the last day of the sales window; defaults to tomorrow,
+                        so the window ends with today.
+        window_days (int): Length of the sales window in days.
+        lead_time_days (int): Days for an order to arrive.
+        safety_days (int): Days of safety stock.
+        cover_days (int): Days of sales an order should cover.
+        store_id (int): Only plan this store; every store when omitted.
+        include_all (bool): Return every product, not only those that need ordering.
+
+    Returns:
+        tuple: (query, params); the query's columns are REPORT_COLUMNS.
+
+    Raises:
+        ValueError: If the window is not at least one day.
+    """
+    if window_days < 1:
+        raise ValueError("The sales window must be at least one day")
+    if end is None:
+        end = date.today() + timedelta(days=1)
+    elif not isinstance(end, date):
+        end = date.fromisoformat(str(end))
+    start = end - timedelta(days=window_days)
+
+    reorder_days = lead_time_days + safety_days
+    # Parameters in the order their placeholders appear in the statement
+    params = [window_days, reorder_days, window_days, reorder_days + cover_days, window_days, start, end]
+    store_filter = ""
+    inventory_filter = ""
+    if store_id is not None:
+        store_filter = "AND t.StoreID = %s"
+        # One primary-key range of StoreInventory
+        inventory_filter = "WHERE si.StoreID = %s"
+        params += [store_id, store_id]
+    plan_filter = "" if include_all else "WHERE plan.InStock <= plan.ReorderPoint AND plan.SuggestedQuantity > 0"
+
+    # Rounding up is done on units x days / window so no precision is lost to the division
+    query = f"""
+        SELECT plan.StoreID, plan.ProductID, plan.ProductName, plan.InStock, plan.UnitsSold,
+               plan.DailyVelocity, plan.ReorderPoint, plan.SuggestedQuantity
+        FROM (SELECT levels.StoreID, levels.ProductID, levels.ProductName, levels.InStock, levels.UnitsSold,
+                     ROUND(levels.Demand / %s, 3) AS DailyVelocity,
+                     CEIL(levels.Demand * %s / %s) AS ReorderPoint,
+                     GREATEST(CEIL(levels.Demand * %s / %s) - levels.InStock, 0) AS SuggestedQuantity
+              FROM (SELECT si.StoreID, si.ProductID, p.ProductName,
+                           {STOCK_LEVEL} AS InStock,
+                           COALESCE(sales.Units, 0) AS UnitsSold,
+                           GREATEST(COALESCE(sales.Units, 0), 0) AS Demand
+                    FROM StoreInventory si
+                    JOIN Product p ON p.ProductID = si.ProductID
+                    LEFT JOIN (SELECT t.StoreID, ti.ProductID,
+                                      SUM(IF(t.TransactionType = 'Return', -ti.Quantity, ti.Quantity)) AS Units
+                               FROM Transaction t
+                               JOIN TransactionItem ti ON ti.TransactionID = t.TransactionID
+                               WHERE t.PurchaseDate >= %s AND t.PurchaseDate < %s {store_filter}
+                               GROUP BY t.StoreID, ti.ProductID) AS sales
+                           ON sales.StoreID = si.StoreID AND sales.ProductID = si.ProductID
+                    {inventory_filter}) AS levels) AS plan
+        {plan_filter}
+        ORDER BY plan.StoreID, plan.SuggestedQuantity DESC, plan.ProductID
+    """
+    return query, params
+
+
+def get_replenishment_suggestions(conn, store_id=None, end=None, window_days=WINDOW_DAYS,
+                                  lead_time_days=LEAD_TIME_DAYS, safety_days=SAFETY_DAYS,
+                                  cover_days=COVER_DAYS, include_all=False):
+    """
+    Computes purchase suggestions and returns them as a list.
+
+    Meant for one store or a quick look; use export_replenishment_report() for the chain.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        store_id (int): Only plan this store; every store when omitted.
+        end (str/date): Day after the last day of the sales window; defaults to tomorrow.
+        window_days (int): Length of the sales window in days.
+        lead_time_days (int): Days for an order to arrive.
+        safety_days (int): Days of safety stock.
+        cover_days (int): Days of sales an order should cover.
+        include_all (bool): Return every product, not only those that need ordering.
+
+    Returns:
+        list: Tuples in REPORT_COLUMNS order, None if an error occurs.
+    """
+    try:
+        query, params = build_replenishment_query(end, window_days, lead_time_days, safety_days, cover_days,
+                                                  store_id, include_all)
+        with conn.cursor() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+    except Exception as e:
+        print(f"Error computing replenishment suggestions: {e}")
+        return None
+
+
+def export_replenishment_report(conn, path, fmt="csv", store_id=None, end=None, window_days=WINDOW_DAYS,
+                                lead_time_days=LEAD_TIME_DAYS, safety_days=SAFETY_DAYS, cover_days=COVER_DAYS,
+                                include_all=False, batch_size=DEFAULT_BATCH_SIZE, progress_every=None):
+    """
+    Streams the purchase suggestion report to a CSV or JSON Lines file.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        path (str): The file to write.
+        fmt (str): 'csv' or 'jsonl'.
+        store_id (int): Only plan this store; every store when omitted.
+        end (str/date): Day after the last day of the sales window; defaults to tomorrow.
+        window_days (int): Length of the sales window in days.
+        lead_time_days (int): Days for an order to arrive.
+        safety_days (int): Days of safety stock.
+        cover_days (int): Days of sales an order should cover.
+        include_all (bool): Write every product, not only those that need ordering.
+        batch_size (int): Rows fetched per round-trip.
+        progress_every (int): Print a progress line every this many rows.
+
+    Returns:
+        int: The number of rows written.
+    """
+    query, params = build_replenishment_query(end, window_days, lead_time_days, safety_days, cover_days,
+                                              store_id, include_all)
+    return export_query(conn, query, params, path, fmt, batch_size, progress_every)
+
@@ -0,0 +1,75 @@
+"""
+report_cache.py - Cached results for the sales and stock reports
+
+Report results are cached by (report, store, period start, period end, variant)
+so repeated requests for the same store and month are answered without going
+back to the database. Writes invalidate only the entries they can affect:
+a new transaction drops the sales reports for its store whose period contains
+the transaction date, and product changes drop the stock reports.
+"""
+from datetime import date
+
+from cache import LRUCache
+
+# Shared by every report function in database.py
+reports = LRUCache(max_entries=256, ttl=300.0)
+
+SALES_REPORTS = ("monthly", "day", "annual")
+STOCK_REPORTS = ("stock",)
+
+
+def cached_report(report, store_id, start, end, variant, loader):
+    """
+    Returns a cached report result, running loader() on a miss.
+
+    Args:
+        report (str): The report name, one of SALES_REPORTS or STOCK_REPORTS.
+        store_id (int): The store the report is for.
+        start (date): First day of the report period (None for stock reports).
+        end (date): Day after the last day of the period (None for stock reports).
+        variant: Anything else that changes the result, such as use_rollup.
+        loader (callable): Runs the report query and returns its result.
+    """
+    return reports.get_or_load((report, int(store_id), start, end, variant), loader)
+
+
+def invalidate_sales(store_id, day=None):
+    """
+    Drops cached sales reports for a store that cover the given day.
+
+    Args:
+        store_id (int): The store that was written to; None drops every store.
+        day (str/date): The PurchaseDate written; None drops every period.
+
+    Returns:
+        int: The number of entries removed.
+    """
+    if day is not None and not isinstance(day, date):
+        try:
+            day = date.fromisoformat(str(day))
+        except ValueError:
+            day = None
+
+    def affected(key):
+        report, key_store, start, end, _ = key
+        if report not in SALES_REPORTS:
+            return False
+        if store_id is not None and key_store != int(store_id):
+            return False
+        return day is None or start <= day < end
+
+    return reports.invalidate_where(affected)
+
+
+def invalidate_stock(store_id=None):
+    """
+    Drops cached stock reports.
+
+    Args:
+        store_id (int): The store whose stock changed; None drops every store.
+
+    Returns:
+        int: The number of entries removed.
+    """
+    return reports.invalidate_where(
+        lambda key: key[0] in STOCK_REPORTS and (store_id is None or key[1] == int(store_id)))
@@ -8,7 +8,18 @@ calculate employee rewards based on customer sign-ups.
 
 The rewards system tracks customer loyalty through accumulated reward points and
 recognizes employee performance by counting the number of customers they've signed up.
+
+Reward points are earned from purchases and taken back on returns by
+post_reward_points(), which posts every transaction after the watermark in
+RewardAccrual exactly once. It is meant to run every few minutes.
 """
+from concurrency import run_watermark_batches
+
+# Points per whole currency unit of TotalPrice, rounded down per transaction
+POINTS_PER_UNIT = 1
+
+# Transactions posted per accrual database transaction
+ACCRUAL_BATCH_SIZE = 5000
 
 def customer_rewards(conn):
     """
@@ -77,4 +88,60 @@ def employee_rewards(conn):
             return None
     except Exception as e:
         print(f"Error searching for employee: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def post_reward_points(conn, batch_size=ACCRUAL_BATCH_SIZE, points_per_unit=POINTS_PER_UNIT):
+    """
+    Posts reward points for every transaction since the last run.
+    
+    A Buy earns points_per_unit points per whole unit of its TotalPrice and a
+    Return takes the same amount back, never below zero. Transactions are taken
+    in TransactionID order from the watermark in RewardAccrual, in batches of
+    at most batch_size, through concurrency.run_watermark_batches(). Each batch
+    is summed per customer in the database and applied with a single UPDATE in
+    the same database transaction as the watermark, so a transaction is never
+    posted twice or skipped, even if the job is stopped part way or two copies
+    run at once.
+    
+    Parameters:
+        conn: Database connection object
+        batch_size: Maximum transactions posted per database transaction
+        points_per_unit: Points earned per whole currency unit spent
+    
+    Returns:
+        dict: transactions (posted), customers (balances changed), batches and watermark
+    
+    Raises:
+        Exception: Database errors are passed on after the current batch is rolled back
+    """
+    def apply_batch(cursor, batch):
+        # One pass over the batch's primary-key range, summed per customer, applied in one statement
+        cursor.execute(
+            """
+            UPDATE Customer c
+            JOIN (SELECT t.CustomerID,
+                         SUM(IF(t.TransactionType = 'Buy', 1, -1)
+                             * FLOOR(COALESCE(t.TotalPrice, 0) * %s)) AS Points
+                  FROM Transaction t
+                  WHERE t.TransactionID BETWEEN %s AND %s AND t.CustomerID IS NOT NULL
+                  GROUP BY t.CustomerID) AS earned ON earned.CustomerID = c.CustomerID
+            SET c.RewardPoints = GREATEST(0, COALESCE(c.RewardPoints, 0) + earned.Points),
+                c.RowVersion = c.RowVersion + 1
+            WHERE earned.Points <> 0
+            """,
+            (points_per_unit, batch[0][0], batch[-1][0])
+        )
+        return cursor.rowcount
+
+    result = run_watermark_batches(
+        conn,
+        "SELECT LastTransactionID FROM RewardAccrual WHERE AccrualID = 1 FOR UPDATE",
+        "SELECT TransactionID FROM Transaction WHERE TransactionID > %s "
+        "ORDER BY TransactionID LIMIT %s FOR SHARE",
+        "UPDATE RewardAccrual SET LastTransactionID = %s, PostedAt = NOW(), "
+        "TransactionsPosted = TransactionsPosted + %s WHERE AccrualID = 1",
+        apply_batch,
+        batch_size
+    )
+    return {"transactions": result["rows"], "customers": result["changed"], "batches": result["batches"],
+            "watermark": result["watermark"]}
@@ -0,0 +1,173 @@
+"""
+rollup.py - Daily sales rollup for the MuskieCo management system
+
+The SalesDailySummary table holds one row per store and day with the number
+of transactions, the Buy and Return totals and the units sold and returned.
+The write paths in database.py and checkout.py update it in the same database
+transaction as the sale itself, so the day, month and year sales reports can be
+answered from a handful of summary rows instead of re-reading every
+transaction.
+
+rebuild_daily_summary() recomputes the rollup from the raw tables, either for
+a date range or for the whole history.
+"""
+from report_cache import invalidate_sales
+
+# Adds one row's worth of counts to the matching summary row, creating it when missing
+UPSERT_SUMMARY = """
+    ON DUPLICATE KEY UPDATE
+        TransactionCount = TransactionCount + VALUES(TransactionCount),
+        GrossSales = GrossSales + VALUES(GrossSales),
+        ReturnsTotal = ReturnsTotal + VALUES(ReturnsTotal),
+        UnitsSold = UnitsSold + VALUES(UnitsSold),
+        UnitsReturned = UnitsReturned + VALUES(UnitsReturned)
+"""
+
+SUMMARY_COLUMNS = "StoreID, SalesDate, TransactionCount, GrossSales, ReturnsTotal, UnitsSold, UnitsReturned"
+
+
+def record_transaction(cursor, store_id, sales_date, total_price, transaction_type, units=0):
+    """
+    Adds a new transaction to the daily rollup.
+
+    Must run on the same connection and database transaction as the INSERT
+    into Transaction; the caller commits.
+
+    Args:
+        cursor (pymysql.cursors.Cursor): A cursor on the writing connection.
+        store_id (int): The store of the transaction (transactions without a store are not rolled up).
+        sales_date (str/date): The PurchaseDate of the transaction.
+        total_price (float/Decimal): The TotalPrice of the transaction.
+        transaction_type (str): 'Buy' or 'Return'.
+        units (int): The total quantity of its line items, when they are written in the same transaction.
+    """
+    if store_id is None:
+        return
+    total_price = total_price or 0
+    gross, returns = (total_price, 0) if transaction_type == "Buy" else (0, total_price)
+    sold, returned = (units, 0) if transaction_type == "Buy" else (0, units)
+    cursor.execute(
+        f"INSERT INTO SalesDailySummary ({SUMMARY_COLUMNS}) VALUES (%s, %s, 1, %s, %s, %s, %s)" + UPSERT_SUMMARY,
+        (store_id, sales_date, gross, returns, sold, returned)
+    )
+
+
+def record_items(cursor, transaction_id, units):
+    """
+    Adds line item units for an existing transaction to the daily rollup.
+
+    The store, date and type are read from the Transaction row inside the
+    caller's database transaction and returned, so the caller can invalidate
+    cached reports without another lookup. The caller commits.
+
+    Args:
+        cursor (pymysql.cursors.Cursor): A cursor on the writing connection.
+        transaction_id (int): The transaction the items were added to.
+        units (int): The total quantity of the items added.
+
+    Returns:
+        tuple: (StoreID, PurchaseDate) of the transaction, or None if it does not exist.
+    """
+    cursor.execute("SELECT StoreID, PurchaseDate, TransactionType FROM Transaction "
+                   "WHERE TransactionID = %s FOR SHARE", (transaction_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    store_id, purchase_date, transaction_type = row
+    if store_id is not None:
+        sold, returned = (units, 0) if transaction_type == "Buy" else (0, units)
+        cursor.execute(
+            f"INSERT INTO SalesDailySummary ({SUMMARY_COLUMNS}) VALUES (%s, %s, 0, 0, 0, %s, %s)" + UPSERT_SUMMARY,
+            (store_id, purchase_date, sold, returned)
+        )
+    return store_id, purchase_date
+
+
+def rebuild_daily_summary(conn, start=None, end=None):
+    """
+    Recomputes the daily rollup from Transaction and TransactionItem.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        start (str/date): First day to rebuild; the whole history when omitted.
+        end (str/date): Day after the last day to rebuild; open-ended when omitted.
+
+    Returns:
+        int: The number of summary rows written.
+    """
+    conditions = ["t.StoreID IS NOT NULL"]
+    params = []
+    if start is not None:
+        conditions.append("t.PurchaseDate >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append("t.PurchaseDate < %s")
+        params.append(end)
+    where = " AND ".join(conditions)
+    summary_where = where.replace("t.StoreID", "StoreID").replace("t.PurchaseDate", "SalesDate")
+
+    try:
+        conn.begin()
+        with conn.cursor() as cursor:
+            cursor.execute(f"DELETE FROM SalesDailySummary WHERE {summary_where}", params)
+            cursor.execute(
+                f"""
+                INSERT INTO SalesDailySummary ({SUMMARY_COLUMNS})
+                SELECT t.StoreID,
+                       t.PurchaseDate,
+                       COUNT(*),
+                       SUM(IF(t.TransactionType = 'Buy', COALESCE(t.TotalPrice, 0), 0)),
+                       SUM(IF(t.TransactionType = 'Return', COALESCE(t.TotalPrice, 0), 0)),
+                       SUM(IF(t.TransactionType = 'Buy', COALESCE(u.Units, 0), 0)),
+                       SUM(IF(t.TransactionType = 'Return', COALESCE(u.Units, 0), 0))
+                FROM Transaction t
+                LEFT JOIN (SELECT ti.TransactionID, SUM(ti.Quantity) AS Units
+                           FROM TransactionItem ti
+                           JOIN Transaction t ON t.TransactionID = ti.TransactionID
+                           WHERE {where}
+                           GROUP BY ti.TransactionID) u ON u.TransactionID = t.TransactionID
+                WHERE {where}
+                GROUP BY t.StoreID, t.PurchaseDate
+                """,
+                params + params
+            )
+            rows = cursor.rowcount
+        conn.commit()
+        # Cached reports may have been built from the old rollup rows
+        invalidate_sales(None)
+        return rows
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def summarize(cursor, store_id, start, end, by_month=False):
+    """
+    Reads the rollup for one store over a half-open date range.
+
+    Args:
+        cursor (pymysql.cursors.Cursor): A cursor on the database connection.
+        store_id (int): The store to summarize.
+        start (str/date): First day of the range.
+        end (str/date): Day after the last day of the range.
+        by_month (bool): Return one row per month instead of one row per day.
+
+    Returns:
+        list: Tuples of (period, TransactionCount, GrossSales, ReturnsTotal,
+              UnitsSold, UnitsReturned) where period is the date, or the month
+              number when by_month is set.
+    """
+    period = "MONTH(SalesDate)" if by_month else "SalesDate"
+    cursor.execute(
+        f"""
+        SELECT {period} AS Period,
+               SUM(TransactionCount), SUM(GrossSales), SUM(ReturnsTotal),
+               SUM(UnitsSold), SUM(UnitsReturned)
+        FROM SalesDailySummary
+        WHERE StoreID = %s AND SalesDate >= %s AND SalesDate < %s
+        GROUP BY Period
+        ORDER BY Period
+        """,
+        (store_id, start, end)
+    )
+    return cursor.fetchall()
@@ -0,0 +1,248 @@
+"""
+schema.py - Versioned schema migrations for the MuskieCo management system
+
+The database schema is built from numbered SQL files in the migrations folder
+(for example 0001_initial_schema.sql). Every applied migration is recorded in
+the SchemaVersion table together with a SHA-256 checksum of its file, so on
+startup only migrations that have not been applied yet are executed.
+
+When the schema is already current, startup costs a single query: the newest
+row of SchemaVersion is compared with the newest migration file.
+
+MySQL commits DDL statements as soon as they run, so a migration that fails
+part way cannot be rolled back. Instead, the number of statements completed is
+kept in SchemaProgress after every statement, and the next start resumes the
+migration from the statement that failed. Data changes are recorded in the
+same transaction as their progress, so they are never applied twice; a schema
+change is recorded right after MySQL commits it, so only a crash in between
+leaves one statement to check by hand. Session
+statements (SET @var, PREPARE, EXECUTE, DEALLOCATE) are not recorded on their
+own, because their state is lost with the connection: a block of them is run
+again from its first statement, so such blocks must be safe to repeat (look the
+current state up in information_schema, as 0011 does).
+"""
+import hashlib
+import os
+import re
+
+import pymysql
+
+# Folder holding the numbered migration files, next to this module
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+# Migration files are named NNNN_description.sql
+MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+# MySQL error code for "table doesn't exist"
+NO_SUCH_TABLE = 1146
+
+CREATE_VERSION_TABLE = """
+    CREATE TABLE IF NOT EXISTS SchemaVersion (
+        Version INT PRIMARY KEY,
+        Name VARCHAR(255) NOT NULL,
+        Checksum CHAR(64) NOT NULL,
+        AppliedAt DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+CREATE_PROGRESS_TABLE = """
+    CREATE TABLE IF NOT EXISTS SchemaProgress (
+        Version INT PRIMARY KEY,
+        Checksum CHAR(64) NOT NULL,
+        StatementsDone INT NOT NULL
+    )
+"""
+
+# Statements whose effect lives only in the session, and so cannot be resumed after
+SESSION_STATEMENT = re.compile(r"^(SET\s+@|PREPARE\s|EXECUTE\s|DEALLOCATE\s)", re.IGNORECASE)
+
+
+class MigrationError(Exception):
+    """Raised when the migration files and the SchemaVersion table disagree or a migration fails."""
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """
+    Reads every migration file from the migrations folder.
+
+    Args:
+        directory (str): The folder holding the migration files.
+
+    Returns:
+        list: Dictionaries with version, name, checksum and sql, ordered by version.
+
+    Raises:
+        MigrationError: If two files share the same version number.
+    """
+    migrations = {}
+    for filename in os.listdir(directory):
+        match = MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise MigrationError(f"Duplicate migration version {version}: {filename}")
+        with open(os.path.join(directory, filename), "rb") as file:
+            content = file.read()
+        migrations[version] = {
+            "version": version,
+            "name": match.group(2),
+            "checksum": hashlib.sha256(content).hexdigest(),
+            "sql": content.decode("utf-8"),
+        }
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def split_statements(sql_script):
+    """
+    Splits a migration script into individual statements.
+
+    Comment lines starting with -- are removed first so that semicolons inside
+    comments do not break statements apart.
+
+    Args:
+        sql_script (str): The contents of a migration file.
+
+    Returns:
+        list: The SQL statements in the order they appear.
+    """
+    lines = [line for line in sql_script.splitlines() if not line.strip().startswith("--")]
+    return [stmt.strip() for stmt in "\n".join(lines).split(";") if stmt.strip()]
+
+
+def current_version(conn):
+    """
+    Reads the newest applied migration from the SchemaVersion table.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+
+    Returns:
+        tuple: (Version, Checksum) of the newest applied migration,
+               (0, None) if nothing has been applied,
+               or None if the SchemaVersion table does not exist yet.
+    """
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT Version, Checksum FROM SchemaVersion ORDER BY Version DESC LIMIT 1")
+            row = cursor.fetchone()
+            return row if row else (0, None)
+    except pymysql.err.ProgrammingError as e:
+        if e.args[0] == NO_SUCH_TABLE:
+            return None
+        raise
+
+
+def _has_legacy_schema(cursor):
+    # Databases created by the old Database.sql script have the tables but no SchemaVersion
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Store'")
+    return cursor.fetchone()[0] > 0
+
+
+def _record(cursor, migration):
+    cursor.execute("INSERT INTO SchemaVersion (Version, Name, Checksum) VALUES (%s, %s, %s)",
+                   (migration["version"], migration["name"], migration["checksum"]))
+
+
+def _resume_point(cursor, migration):
+    # Statements of a migration that completed before an earlier run failed
+    cursor.execute("SELECT Checksum, StatementsDone FROM SchemaProgress WHERE Version = %s",
+                   (migration["version"],))
+    row = cursor.fetchone()
+    if row is None:
+        return 0
+    if row[0] != migration["checksum"]:
+        raise MigrationError(
+            f"Migration {migration['version']}_{migration['name']} was changed after it was partly applied; "
+            f"finish it with the original file or repair the schema by hand and delete its SchemaProgress row")
+    return row[1]
+
+
+def _save_progress(cursor, migration, done):
+    cursor.execute(
+        "INSERT INTO SchemaProgress (Version, Checksum, StatementsDone) VALUES (%s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE StatementsDone = VALUES(StatementsDone)",
+        (migration["version"], migration["checksum"], done))
+
+
+def migrate(conn, migrations=None):
+    """
+    Brings the database schema up to the newest migration.
+
+    A migration that failed part way on an earlier start is resumed from its
+    first unfinished statement.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        migrations (list): Migrations to apply, defaults to load_migrations().
+
+    Returns:
+        list: The version numbers that were applied (empty if the schema was current).
+
+    Raises:
+        MigrationError: If an applied or partly applied migration file was changed
+                        afterwards, or a migration statement fails.
+    """
+    if migrations is None:
+        migrations = load_migrations()
+    if not migrations:
+        return []
+    head = migrations[-1]
+
+    # Fast path: one round-trip when the newest applied migration matches the newest file
+    applied_head = current_version(conn)
+    if applied_head is not None and applied_head[0] == head["version"] and applied_head[1] == head["checksum"]:
+        return []
+
+    with conn.cursor() as cursor:
+        if applied_head is None:
+            cursor.execute(CREATE_VERSION_TABLE)
+            if _has_legacy_schema(cursor):
+                # Adopt a database built by the old Database.sql script: it already
+                # contains the initial schema and sample data, so only record them
+                for migration in migrations[:2]:
+                    _record(cursor, migration)
+                conn.commit()
+                print("Existing schema recorded as migrations 1-2.")
+
+        cursor.execute(CREATE_PROGRESS_TABLE)
+        cursor.execute("SELECT Version, Checksum FROM SchemaVersion")
+        applied = dict(cursor.fetchall())
+
+    # Refuse to continue if a migration that already ran was edited afterwards
+    for migration in migrations:
+        checksum = applied.get(migration["version"])
+        if checksum is not None and checksum != migration["checksum"]:
+            raise MigrationError(
+                f"Migration {migration['version']}_{migration['name']} was changed after it was applied")
+
+    applied_now = []
+    for migration in migrations:
+        if migration["version"] in applied:
+            continue
+        with conn.cursor() as cursor:
+            statements = split_statements(migration["sql"])
+            done = _resume_point(cursor, migration)
+            if done:
+                print(f"Resuming migration {migration['version']}_{migration['name']} "
+                      f"at statement {done + 1} of {len(statements)}.")
+            for number in range(done, len(statements)):
+                stmt = statements[number]
+                try:
+                    cursor.execute(stmt)
+                except Exception as e:
+                    # Statements before this one stay applied and recorded; the next start resumes here
+                    raise MigrationError(
+                        f"Migration {migration['version']}_{migration['name']} failed on statement "
+                        f"{number + 1} of {len(statements)}:\n{stmt}\n{e}")
+                if not SESSION_STATEMENT.match(stmt):
+                    _save_progress(cursor, migration, number + 1)
+                    conn.commit()
+            _record(cursor, migration)
+            cursor.execute("DELETE FROM SchemaProgress WHERE Version = %s", (migration["version"],))
+        conn.commit()
+        applied_now.append(migration["version"])
+        print(f"Applied migration {migration['version']}_{migration['name']}.")
+    return applied_now
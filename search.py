@@ -0,0 +1,159 @@
+"""
+search.py - Product name search for the MuskieCo management system
+
+Two ways to find a product without knowing its ID:
+
+- Prefix search ("choc" finds "Chocolate Bar") walks the ProductName index in
+  name order and pages with a keyset, so every page costs the same however
+  deep the cashier scrolls.
+- Full-text search finds products containing every typed word anywhere in
+  the name ("bar choc" finds "Chocolate Bar"), ranked by MySQL's relevance
+  score from the FULLTEXT index. Words shorter than MIN_WORD_LENGTH are not in
+  that index and are ignored; use prefix search for very short input.
+
+Both modes are case-insensitive, following the column's collation. Limiting
+a search to one store checks each match against that store's StoreInventory
+primary key.
+"""
+import re
+
+# Keeps products the given store carries
+STORE_FILTER = (" AND EXISTS (SELECT 1 FROM StoreInventory si "
+                "WHERE si.StoreID = %s AND si.ProductID = Product.ProductID)")
+
+# Shortest word the FULLTEXT index holds (InnoDB's innodb_ft_min_token_size default)
+MIN_WORD_LENGTH = 3
+
+DEFAULT_PAGE_SIZE = 20
+
+
+def escape_like(text):
+    """
+    Escapes the LIKE wildcards in text so it matches literally.
+
+    Args:
+        text (str): User input.
+
+    Returns:
+        str: text with backslash, % and _ escaped by a backslash.
+    """
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_products_by_prefix(conn, prefix, store_id=None, page_size=DEFAULT_PAGE_SIZE, after=None):
+    """
+    Finds products whose name starts with prefix, in name order.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        prefix (str): The start of the product name.
+        store_id (int): Only search the products this store carries.
+        page_size (int): Maximum number of products per page.
+        after (tuple): The next_page value of the previous page; None for the first page.
+
+    Returns:
+        dict: products (list of (ProductID, ProductName, SellPrice) tuples)
+              and next_page ((ProductName, ProductID) to pass as after, or None on
+              the last page). None if an error occurs.
+    """
+    try:
+        conditions = "ProductName LIKE %s"
+        params = [escape_like(prefix.strip()) + "%"]
+        if store_id is not None:
+            conditions += STORE_FILTER
+            params.append(store_id)
+        if after is not None:
+            # Continue strictly after the last product of the previous page
+            conditions += " AND (ProductName > %s OR (ProductName = %s AND ProductID > %s))"
+            params += [after[0], after[0], after[1]]
+        params.append(page_size + 1)
+
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT ProductID, ProductName, SellPrice
+                FROM Product
+                WHERE {conditions}
+                ORDER BY ProductName, ProductID
+                LIMIT %s
+                """,
+                params
+            )
+            products = list(cursor.fetchall())
+
+        next_page = None
+        if len(products) > page_size:
+            products.pop()
+            next_page = (products[-1][1], products[-1][0])
+        return {"products": products, "next_page": next_page}
+    except Exception as e:
+        print(f"Error searching products: {e}")
+        return None
+
+
+def fulltext_terms(text):
+    """
+    Turns free text into a boolean-mode query requiring every word as a word prefix.
+
+    Operators typed by the user are dropped, so input cannot change the query's meaning.
+
+    Args:
+        text (str): User input.
+
+    Returns:
+        str: e.g. '+choc* +bar*', or '' if no word is long enough to be indexed.
+    """
+    words = [word for word in re.findall(r"\w+", text) if len(word) >= MIN_WORD_LENGTH]
+    return " ".join(f"+{word}*" for word in words)
+
+
+def search_products_fulltext(conn, text, store_id=None, page_size=DEFAULT_PAGE_SIZE, page=0):
+    """
+    Finds products whose name contains every word of text, best matches first.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        text (str): Words to look for; each matches the start of a word in the name.
+        store_id (int): Only search the products this store carries.
+        page_size (int): Maximum number of products per page.
+        page (int): Zero-based page number.
+
+    Returns:
+        dict: products (list of (ProductID, ProductName, SellPrice, Relevance)
+              tuples) and next_page (the page number to ask for next, or None on the
+              last page). None if an error occurs.
+    """
+    terms = fulltext_terms(text)
+    if not terms:
+        # Nothing the FULLTEXT index can match
+        return {"products": [], "next_page": None}
+    try:
+        conditions = "MATCH(ProductName) AGAINST (%s IN BOOLEAN MODE)"
+        params = [terms, terms]
+        if store_id is not None:
+            conditions += STORE_FILTER
+            params.append(store_id)
+        params += [page_size + 1, page * page_size]
+
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT ProductID, ProductName, SellPrice,
+                       MATCH(ProductName) AGAINST (%s IN BOOLEAN MODE) AS Relevance
+                FROM Product
+                WHERE {conditions}
+                ORDER BY Relevance DESC, ProductID
+                LIMIT %s OFFSET %s
+                """,
+                params
+            )
+            products = list(cursor.fetchall())
+
+        next_page = None
+        if len(products) > page_size:
+            products.pop()
+            next_page = page + 1
+        return {"products": products, "next_page": next_page}
+    except Exception as e:
+        print(f"Error searching products: {e}")
+        return None
@@ -10,7 +10,11 @@ in the database.
 Each staff member is uniquely identified by a StaffID and is associated with a specific
 store via the StoreID. Staff records include personal information such as name, age,
 contact details, and employment information.
+
+Updates are optimistic: only the fields that changed are written, and only if
+no one else updated the staff record since it was read (see concurrency.py).
 """
+from concurrency import ConcurrentUpdateError, changed_columns, update_fields_with_retry
 
 def staff(conn):
     """
@@ -79,7 +83,8 @@ def staff(conn):
                     staff[6] = input("Enter new Email: ")
                 case 7:
                     staff[7] = input("Enter new Start Date: ")
-            update_staff(conn, staff[0],staff[1],staff[2],staff[3],staff[4],staff[5],staff[6],staff[7])
+            # Write only the changed field, based on the record as read
+            update_staff_fields(conn, staff[0], changed_columns("Staff", staff_data, staff), staff_data)
         case 3:
             delete_staff(conn,input("Enter Staff ID: "))
         case 4:
@@ -112,13 +117,50 @@ def update_staff(conn, StaffID, StoreId, Name, Age, HomeAddress, PhoneNumber, Em
     """
     try:
         with conn.cursor() as cursor:
-            cursor.execute("UPDATE Staff SET StoreId = %s, Name = %s, Age = %s, HomeAddress = %s, PhoneNumber = %s, Email = %s, StartDate = %s WHERE StaffID = %s",
+            cursor.execute("UPDATE Staff SET StoreId = %s, Name = %s, Age = %s, HomeAddress = %s, PhoneNumber = %s, Email = %s, StartDate = %s, RowVersion = RowVersion + 1 WHERE StaffID = %s",
                            (StoreId, Name, Age, HomeAddress, PhoneNumber, Email, StartDate, StaffID))
             conn.commit()
             print("Staff updated successfully.")
     except Exception as e:
         print(f"Error updating staff: {e}")
 
+def update_staff_fields(conn, StaffID, changes, original):
+    """
+    Update only the given fields of a staff record, if no one else changed them since it was read.
+    
+    The UPDATE matches on both StaffID and RowVersion, so a concurrent edit of the
+    same staff member is detected instead of being silently overwritten. If the
+    other edit touched different fields, the update is retried on top of it.
+    
+    Parameters:
+        conn: Database connection object
+        StaffID: Unique identifier of the staff member to be updated
+        changes: Dictionary of column name -> new value for the fields that changed
+        original: The staff record the changes were based on, as read (RowVersion last)
+    
+    Returns:
+        bool: True if the record was updated (or nothing changed), False otherwise
+    """
+    if not changes:
+        print("Nothing to update.")
+        return True
+    try:
+        if update_fields_with_retry(conn, "Staff", StaffID, changes, original):
+            conn.commit()
+            print("Staff updated successfully.")
+            return True
+        conn.rollback()
+        print("Staff record was changed by someone else. Please reload it and try again.")
+        return False
+    except ConcurrentUpdateError as e:
+        conn.rollback()
+        print(f"{e}. Please try again.")
+        return False
+    except Exception as e:
+        conn.rollback()
+        print(f"Error updating staff: {e}")
+        return False
+
 def delete_staff(conn,StaffID):
     """
     Delete a staff record from the database.
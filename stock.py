@@ -0,0 +1,328 @@
+"""
+stock.py - Stock movement journal for the MuskieCo management system
+
+Stock is kept per store in StoreInventory, one row per (StoreID, ProductID).
+Every stock change is appended to the StockMovement journal as a signed
+quantity (Sale, Return, Receipt or Adjustment) instead of rewriting
+StoreInventory.QuantityInStock. Appending only inserts a new row, so receipts
+and returns never wait for each other or for sales, and the inventory row
+itself is not rewritten until compact_stock() folds the journal in.
+
+StoreInventory.QuantityInStock is a snapshot: it includes every movement up to
+the watermark in StockSnapshot. The current stock of a product in a store is
+that snapshot plus the movements after the watermark (the tail).
+compact_stock() periodically folds the tail into the snapshot and moves the
+watermark, keeping the tail short. The journal itself is never deleted, so
+stock can also be read as of any earlier moment.
+
+Movements that take stock out (sales and negative adjustments) still lock the
+inventory row while checking the current stock, so stock never goes negative,
+and sales of the same product in the same store take turns for that check.
+checkout.py takes the lock as the last step before commit, so each turn is a
+few statements long. Receipts and returns only add stock and are appended
+without any lock. Adding stock to a store that does not carry the product yet
+starts carrying it.
+"""
+from concurrency import run_watermark_batches
+from report_cache import invalidate_stock
+
+MOVEMENT_TYPES = ("Sale", "Return", "Receipt", "Adjustment")
+
+# Movements folded into the snapshot per compaction transaction
+COMPACT_BATCH_SIZE = 10000
+
+# Highest MovementID already included in StoreInventory.QuantityInStock
+WATERMARK = "(SELECT LastMovementID FROM StockSnapshot WHERE SnapshotID = 1)"
+
+# Current stock of the inventory row aliased si: the snapshot plus its tail of movements
+STOCK_LEVEL = f"""CAST(si.QuantityInStock + COALESCE(
+    (SELECT SUM(m.Quantity) FROM StockMovement m
+     WHERE m.StoreID = si.StoreID AND m.ProductID = si.ProductID AND m.MovementID > {WATERMARK}), 0) AS SIGNED)"""
+
+
+def append_movements(cursor, movements):
+    """
+    Appends movements to the journal.
+
+    Must run in the caller's database transaction; the caller commits.
+
+    Args:
+        cursor (pymysql.cursors.Cursor): A cursor on the writing connection.
+        movements (list): (StoreID, ProductID, MovementType, Quantity, TransactionID, Note)
+                          tuples; Quantity is negative for stock taken out.
+    """
+    cursor.executemany(
+        "INSERT INTO StockMovement (StoreID, ProductID, MovementType, Quantity, TransactionID, Note) "
+        "VALUES (%s, %s, %s, %s, %s, %s)",
+        movements
+    )
+
+
+def pending_stock(cursor, store_id, product_ids):
+    """
+    Sums the movements after the watermark for some products in one store.
+
+    Args:
+        cursor (pymysql.cursors.Cursor): A cursor on the database connection.
+        store_id (int): The store.
+        product_ids (list): The products to look up.
+
+    Returns:
+        dict: ProductID -> pending quantity, for products that have a tail.
+    """
+    if not product_ids:
+        return {}
+    placeholders = ','.join(['%s'] * len(product_ids))
+    cursor.execute(
+        f"SELECT ProductID, SUM(Quantity) FROM StockMovement "
+        f"WHERE StoreID = %s AND ProductID IN ({placeholders}) AND MovementID > {WATERMARK} "
+        f"GROUP BY ProductID",
+        [store_id] + list(product_ids)
+    )
+    return {product_id: int(quantity) for product_id, quantity in cursor.fetchall()}
+
+
+def store_tail(cursor, store_id):
+    """
+    Sums the movements after the watermark for every product of one store.
+
+    Only the journal tail is read (a primary-key range after the watermark),
+    so the cost follows the movements since the last compaction, not the
+    size of the store.
+
+    Args:
+        cursor (pymysql.cursors.Cursor): A cursor on the database connection.
+        store_id (int): The store.
+
+    Returns:
+        dict: ProductID -> pending quantity, for products whose tail does not sum to zero.
+    """
+    cursor.execute(
+        f"SELECT ProductID, SUM(Quantity) FROM StockMovement FORCE INDEX (PRIMARY) "
+        f"WHERE MovementID > {WATERMARK} AND StoreID = %s "
+        f"GROUP BY ProductID HAVING SUM(Quantity) <> 0",
+        (store_id,)
+    )
+    return {product_id: int(quantity) for product_id, quantity in cursor.fetchall()}
+
+
+def _locked_level(cursor, store_id, product_id):
+    # Lock the inventory row, then read its tail. The lock must be the transaction's first read
+    # (or the transaction READ COMMITTED), so the tail includes every earlier removal
+    cursor.execute("SELECT QuantityInStock FROM StoreInventory WHERE StoreID = %s AND ProductID = %s FOR UPDATE",
+                   (store_id, product_id))
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return row[0] + pending_stock(cursor, store_id, [product_id]).get(product_id, 0)
+
+
+def _start_stocking(cursor, store_id, product_id):
+    # A store's first stock of a product creates its inventory row, empty; the stock itself is journalled.
+    # Fails on the foreign keys if the store or product does not exist
+    cursor.execute(
+        "INSERT INTO StoreInventory (StoreID, ProductID, QuantityInStock) VALUES (%s, %s, 0) "
+        "ON DUPLICATE KEY UPDATE QuantityInStock = QuantityInStock",
+        (store_id, product_id)
+    )
+
+
+def record_movement(conn, store_id, product_id, movement_type, quantity, note=None):
+    """
+    Records one receipt, return or adjustment and commits it.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        store_id (int): The store whose stock changes.
+        product_id (int): The product whose stock changes.
+        movement_type (str): One of MOVEMENT_TYPES.
+        quantity (int): The signed change in stock.
+        note (str): Optional reason, e.g. 'Damaged' or a delivery number.
+
+    Returns:
+        int: The product's stock in the store after the movement.
+
+    Raises:
+        ValueError: If the type is unknown, the store does not carry the product
+                    and the movement takes stock out, or the movement would take
+                    out more than is in stock.
+    """
+    if movement_type not in MOVEMENT_TYPES:
+        raise ValueError(f"Unknown movement type: {movement_type}")
+    quantity = int(quantity)
+    try:
+        conn.begin()
+        with conn.cursor() as cursor:
+            if quantity < 0:
+                level = _locked_level(cursor, store_id, product_id)
+                if level is None:
+                    raise ValueError(f"Store {store_id} does not stock product {product_id}")
+                if level + quantity < 0:
+                    raise ValueError(f"only {level} in stock")
+            else:
+                # Adding stock cannot overdraw it, so no lock is needed
+                cursor.execute(f"SELECT {STOCK_LEVEL} FROM StoreInventory si "
+                               f"WHERE si.StoreID = %s AND si.ProductID = %s", (store_id, product_id))
+                row = cursor.fetchone()
+                if row is None:
+                    _start_stocking(cursor, store_id, product_id)
+                level = int(row[0]) if row else 0
+            append_movements(cursor, [(store_id, product_id, movement_type, quantity, None, note)])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    invalidate_stock(store_id)
+    return level + quantity
+
+
+def set_stock_level(conn, store_id, product_id, quantity, note="Stock count"):
+    """
+    Sets a product's stock in a store to a counted quantity by recording the difference as an adjustment.
+
+    Counting a product the store does not carry yet starts carrying it.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        store_id (int): The store where the product was counted.
+        product_id (int): The product that was counted.
+        quantity (int): The counted quantity.
+        note (str): Reason stored with the adjustment.
+
+    Returns:
+        int: The adjustment recorded (0 if the count matched).
+
+    Raises:
+        ValueError: If the quantity is negative.
+    """
+    quantity = int(quantity)
+    if quantity < 0:
+        raise ValueError("Stock cannot be negative")
+    try:
+        conn.begin()
+        with conn.cursor() as cursor:
+            # Lock so a sale cannot slip in between reading the level and writing the difference
+            level = _locked_level(cursor, store_id, product_id)
+            if level is None:
+                # The new row stays locked by this transaction until the count is journalled
+                _start_stocking(cursor, store_id, product_id)
+                level = 0
+            difference = quantity - level
+            if difference:
+                append_movements(cursor, [(store_id, product_id, "Adjustment", difference, None, note)])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    invalidate_stock(store_id)
+    return difference
+
+
+def _fold_movements(cursor, movements):
+    # Add one batch of movements to the snapshot; returns the inventory rows changed
+    deltas = {}
+    for _, store_id, product_id, quantity in movements:
+        deltas[(store_id, product_id)] = deltas.get((store_id, product_id), 0) + quantity
+    changed = sorted(key for key, delta in deltas.items() if delta)
+    # One UPDATE per store, each a range of that store's inventory rows
+    by_store = {}
+    for store_id, product_id in changed:
+        by_store.setdefault(store_id, []).append(product_id)
+    for store_id, product_ids in by_store.items():
+        cases = " ".join(["WHEN %s THEN %s"] * len(product_ids))
+        params = []
+        for product_id in product_ids:
+            params.extend((product_id, deltas[(store_id, product_id)]))
+        cursor.execute(
+            f"UPDATE StoreInventory SET QuantityInStock = QuantityInStock + CASE ProductID {cases} END "
+            f"WHERE StoreID = %s AND ProductID IN ({','.join(['%s'] * len(product_ids))})",
+            params + [store_id] + product_ids
+        )
+    return len(changed)
+
+
+def compact_stock(conn, batch_size=COMPACT_BATCH_SIZE):
+    """
+    Folds the journal tail into StoreInventory.QuantityInStock and advances the watermark.
+
+    Works in batches of at most batch_size movements through
+    concurrency.run_watermark_batches(). The snapshot and the watermark move in
+    the same transaction, so the current stock never changes while compacting.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        batch_size (int): Maximum movements folded per transaction.
+
+    Returns:
+        dict: movements (folded), products (inventory rows updated), batches and watermark.
+    """
+    result = run_watermark_batches(
+        conn,
+        "SELECT LastMovementID FROM StockSnapshot WHERE SnapshotID = 1 FOR UPDATE",
+        "SELECT MovementID, StoreID, ProductID, Quantity FROM StockMovement "
+        "WHERE MovementID > %s ORDER BY MovementID LIMIT %s FOR SHARE",
+        "UPDATE StockSnapshot SET LastMovementID = %s, TakenAt = NOW(), "
+        "MovementsFolded = MovementsFolded + %s WHERE SnapshotID = 1",
+        _fold_movements,
+        batch_size
+    )
+    return {"movements": result["rows"], "products": result["changed"], "batches": result["batches"],
+            "watermark": result["watermark"]}
+
+
+def get_stock_as_of(conn, store_id, product_ids, as_of):
+    """
+    Reads what a store had in stock at an earlier moment.
+
+    The current stock (snapshot plus tail) minus every movement made after
+    as_of. Stock set directly when a product was created or imported is not
+    journalled, so it counts as present from the start.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        store_id (int): The store.
+        product_ids (list): The products to look up.
+        as_of (str/datetime): The moment; a date on its own means the start of that day.
+
+    Returns:
+        dict: ProductID -> quantity in stock at that moment, for products the store carries.
+    """
+    product_ids = [int(product_id) for product_id in product_ids]
+    if not product_ids:
+        return {}
+    placeholders = ','.join(['%s'] * len(product_ids))
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT si.ProductID,
+                   {STOCK_LEVEL} - COALESCE((SELECT SUM(later.Quantity) FROM StockMovement later
+                                            WHERE later.StoreID = si.StoreID AND later.ProductID = si.ProductID
+                                              AND later.MovedAt > %s), 0)
+            FROM StoreInventory si
+            WHERE si.StoreID = %s AND si.ProductID IN ({placeholders})
+            """,
+            [as_of, store_id] + product_ids
+        )
+        return {product_id: int(quantity) for product_id, quantity in cursor.fetchall()}
+
+
+def get_movements(conn, store_id, product_id, limit=50):
+    """
+    Lists the most recent stock movements of a product in a store.
+
+    Args:
+        conn (pymysql.connections.Connection): The database connection.
+        store_id (int): The store.
+        product_id (int): The product.
+        limit (int): Maximum number of movements.
+
+    Returns:
+        list: (MovementID, MovedAt, MovementType, Quantity, TransactionID, Note) tuples, newest first.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT MovementID, MovedAt, MovementType, Quantity, TransactionID, Note FROM StockMovement "
+            "WHERE StoreID = %s AND ProductID = %s ORDER BY MovementID DESC LIMIT %s",
+            (store_id, product_id, limit)
+        )
+        return cursor.fetchall()
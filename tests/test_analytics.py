@@ -0,0 +1,43 @@
+"""Tests for analytics.load_sales_columns, streaming from a fake cursor."""
+from contextlib import contextmanager
+
+import numpy as np
+
+import analytics
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.position = 0
+
+    def execute(self, query, params):
+        self.position = 0
+
+    def fetchmany(self, size):
+        rows = self.rows[self.position:self.position + size]
+        self.position += size
+        return rows
+
+
+def fake_streaming(rows):
+    @contextmanager
+    def streaming_cursor(conn):
+        yield FakeCursor(rows)
+    return streaming_cursor
+
+
+def test_columns_are_typed_and_complete(monkeypatch):
+    rows = [(i % 3, i, i - 5, 250, 100, 1000) for i in range(1234)]
+    monkeypatch.setattr(analytics, "streaming_cursor", fake_streaming(rows))
+    columns = analytics.load_sales_columns(None, chunk_size=100)
+    assert {name: array.dtype for name, array in columns.items()} == dict(analytics.COLUMN_TYPES)
+    assert all(len(array) == len(rows) for array in columns.values())
+    assert np.array_equal(columns["product_id"], np.arange(1234))
+    assert columns["quantity"][0] == -5
+
+
+def test_no_rows_gives_empty_columns(monkeypatch):
+    monkeypatch.setattr(analytics, "streaming_cursor", fake_streaming([]))
+    columns = analytics.load_sales_columns(None)
+    assert all(len(array) == 0 for array in columns.values())
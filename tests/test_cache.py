@@ -0,0 +1,92 @@
+"""Tests for cache.LRUCache."""
+import pytest
+
+import cache
+from cache import LRUCache, MISSING
+
+
+def test_get_returns_missing_for_unknown_key():
+    lru = LRUCache()
+    assert lru.get("a") is MISSING
+    assert lru.stats()["misses"] == 1
+
+
+def test_none_can_be_cached():
+    lru = LRUCache()
+    lru.put("a", None)
+    assert lru.get("a") is None
+
+
+def test_evicts_least_recently_used():
+    lru = LRUCache(max_entries=2, ttl=None)
+    lru.put("a", 1)
+    lru.put("b", 2)
+    lru.get("a")
+    lru.put("c", 3)
+    assert lru.get("b") is MISSING
+    assert lru.get("a") == 1
+    assert lru.get("c") == 3
+    assert lru.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    lru = LRUCache(ttl=10)
+    lru.put("a", 1)
+    now[0] += 9
+    assert lru.get("a") == 1
+    now[0] += 1
+    assert lru.get("a") is MISSING
+    assert lru.stats()["expirations"] == 1
+    assert lru.stats()["size"] == 0
+
+
+def test_get_or_load_calls_loader_once():
+    lru = LRUCache()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return "value"
+
+    assert lru.get_or_load("a", loader) == "value"
+    assert lru.get_or_load("a", loader) == "value"
+    assert len(calls) == 1
+
+
+def test_get_or_load_caches_nothing_when_loader_fails():
+    lru = LRUCache()
+
+    def loader():
+        raise RuntimeError("database down")
+
+    with pytest.raises(RuntimeError):
+        lru.get_or_load("a", loader)
+    assert lru.get("a") is MISSING
+
+
+def test_invalidate_and_invalidate_where():
+    lru = LRUCache()
+    for key in [("sales", 1), ("sales", 2), ("stock", 1)]:
+        lru.put(key, key)
+    assert lru.invalidate(("stock", 1))
+    assert not lru.invalidate(("stock", 1))
+    assert lru.invalidate_where(lambda key: key[0] == "sales") == 2
+    assert lru.stats()["size"] == 0
+    assert lru.stats()["invalidations"] == 3
+
+
+def test_clear_and_hit_rate():
+    lru = LRUCache()
+    lru.put("a", 1)
+    lru.get("a")
+    lru.get("b")
+    assert lru.stats()["hit_rate"] == 0.5
+    lru.clear()
+    assert lru.get("a") is MISSING
+
+
+def test_rejects_empty_cache():
+    with pytest.raises(ValueError):
+        LRUCache(max_entries=0)
@@ -0,0 +1,166 @@
+"""Tests for concurrency.py helpers that need no database."""
+import pytest
+
+from concurrency import ConcurrentUpdateError, changed_columns, run_watermark_batches, update_fields_with_retry
+
+
+class FakeJournal:
+    """A watermark row and an append-only table of IDs, answering the three batch queries."""
+
+    def __init__(self, ids, watermark=0, fail_on_batch=None):
+        self.ids = ids
+        self.watermark = watermark
+        self.fail_on_batch = fail_on_batch
+        self.statements = []
+        self.pending_watermark = None
+        self.result = None
+        self.batches_started = 0
+
+    # Connection
+    def commit(self):
+        if self.pending_watermark is not None:
+            self.watermark = self.pending_watermark
+        self.pending_watermark = None
+        self.statements.append("COMMIT")
+
+    def rollback(self):
+        self.pending_watermark = None
+        self.statements.append("ROLLBACK")
+
+    def begin(self):
+        self.statements.append("BEGIN")
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    # Cursor
+    def execute(self, query, params=None):
+        if query.startswith("SET TRANSACTION"):
+            self.statements.append(query)
+        elif query == "LOCK":
+            self.result = [(self.pending_watermark or self.watermark,)]
+        elif query == "BATCH":
+            self.batches_started += 1
+            if self.batches_started == self.fail_on_batch:
+                raise RuntimeError("lock wait timeout")
+            after, limit = params
+            self.result = [(i,) for i in self.ids if i > after][:limit]
+        elif query == "ADVANCE":
+            self.pending_watermark = params[0]
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+
+def test_processes_every_row_once_in_batches():
+    journal = FakeJournal(list(range(1, 8)))
+    seen = []
+
+    def apply_batch(cursor, rows):
+        seen.append([row[0] for row in rows])
+        return len(rows) * 10
+
+    result = run_watermark_batches(journal, "LOCK", "BATCH", "ADVANCE", apply_batch, 3)
+    assert seen == [[1, 2, 3], [4, 5, 6], [7]]
+    assert result == {"rows": 7, "changed": 70, "batches": 3, "watermark": 7}
+    assert journal.watermark == 7
+    assert "SET TRANSACTION ISOLATION LEVEL READ COMMITTED" in journal.statements
+
+
+def test_nothing_after_watermark():
+    journal = FakeJournal([1, 2], watermark=2)
+    result = run_watermark_batches(journal, "LOCK", "BATCH", "ADVANCE", lambda cursor, rows: 1, 10)
+    assert result == {"rows": 0, "changed": 0, "batches": 0, "watermark": 2}
+
+
+def test_failed_batch_keeps_earlier_batches_and_can_resume():
+    journal = FakeJournal(list(range(1, 6)), fail_on_batch=2)
+    try:
+        run_watermark_batches(journal, "LOCK", "BATCH", "ADVANCE", lambda cursor, rows: 0, 2)
+    except RuntimeError:
+        pass
+    assert journal.watermark == 2
+    assert journal.statements[-1] == "ROLLBACK"
+    result = run_watermark_batches(journal, "LOCK", "BATCH", "ADVANCE", lambda cursor, rows: 0, 2)
+    assert result["rows"] == 3
+    assert journal.watermark == 5
+
+
+def test_changed_columns_only_reports_differences():
+    original = (7, "Lure", 1.00, 2.00, 3)
+    edited = [7, "Lure", 1.50, 2.00, 3]
+    assert changed_columns("Product", original, edited) == {"BuyPrice": 1.50}
+
+
+class FakeVersionedRow:
+    """One Product row behind compare-and-set; other writers are simulated by edits between attempts."""
+
+    def __init__(self, row, concurrent_edits=()):
+        self.row = dict(zip(("ProductID", "ProductName", "BuyPrice", "SellPrice", "RowVersion"), row))
+        self.concurrent_edits = list(concurrent_edits)
+        self.rowcount = 0
+        self.result = None
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def rollback(self):
+        pass
+
+    def execute(self, query, params):
+        if query.startswith("UPDATE"):
+            # Another writer commits just before this attempt
+            if self.concurrent_edits:
+                self.row.update(self.concurrent_edits.pop(0))
+                self.row["RowVersion"] += 1
+            *values, key, version = params
+            columns = [part.split(" = ")[0] for part in query.split("SET ")[1].split(", ")[:-1]]
+            self.rowcount = 0
+            if self.row is not None and version == self.row["RowVersion"]:
+                self.row.update(zip(columns, values))
+                self.row["RowVersion"] += 1
+                self.rowcount = 1
+        else:
+            columns = query.split("SELECT ")[1].split(" FROM")[0].split(", ")
+            self.result = tuple(self.row[column] for column in columns)
+
+    def fetchone(self):
+        return self.result
+
+
+ORIGINAL = (1, "Lure", 1.00, 2.00, 5)
+
+
+def test_retry_applies_edit_over_change_to_other_column():
+    conn = FakeVersionedRow(ORIGINAL, concurrent_edits=[{"BuyPrice": 1.25}])
+    assert update_fields_with_retry(conn, "Product", 1, {"SellPrice": 2.50}, ORIGINAL)
+    assert conn.row["BuyPrice"] == 1.25
+    assert conn.row["SellPrice"] == 2.50
+    assert conn.row["RowVersion"] == 7
+
+
+def test_retry_refuses_edit_of_same_column():
+    conn = FakeVersionedRow(ORIGINAL, concurrent_edits=[{"SellPrice": 3.00}])
+    assert not update_fields_with_retry(conn, "Product", 1, {"SellPrice": 2.50}, ORIGINAL)
+    assert conn.row["SellPrice"] == 3.00
+
+
+def test_retry_gives_up_when_row_keeps_changing():
+    conn = FakeVersionedRow(ORIGINAL, concurrent_edits=[{"BuyPrice": 1.1}, {"BuyPrice": 1.2}, {"BuyPrice": 1.3}])
+    with pytest.raises(ConcurrentUpdateError):
+        update_fields_with_retry(conn, "Product", 1, {"SellPrice": 2.50}, ORIGINAL, attempts=3)
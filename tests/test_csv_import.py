@@ -0,0 +1,83 @@
+"""Tests for csv_import.import_csv, with a fake connection."""
+import pytest
+
+from csv_import import import_csv
+
+
+class FakeConnection:
+    def __init__(self):
+        self.commits = 0
+        self.rollbacks = 0
+
+    def begin(self):
+        pass
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = tmp_path / "rows.csv"
+    path.write_text("ID,Name\n1,a\n2,b\nx,c\n4,d\n5,e\n")
+    return str(path)
+
+
+def validate(row):
+    return int(row["ID"]), row["Name"]
+
+
+def test_imports_in_chunks_and_rejects_bad_rows(csv_file):
+    conn = FakeConnection()
+    chunks = []
+
+    def write(cursor, chunk, reject):
+        chunks.append([record for _, record in chunk])
+
+    summary = import_csv(conn, csv_file, ("ID", "Name"), validate, write, chunk_size=2)
+    assert chunks == [[(1, "a"), (2, "b")], [(4, "d"), (5, "e")]]
+    assert summary["imported"] == 4
+    assert summary["rejected"] == 1
+    assert summary["errors"][0][0] == 4
+    assert conn.commits == 2
+
+
+def test_rows_rejected_by_write_are_not_imported(csv_file):
+    def write(cursor, chunk, reject):
+        for line_num, record in chunk:
+            if record[0] == 2:
+                reject(line_num, "clash")
+
+    summary = import_csv(FakeConnection(), csv_file, ("ID", "Name"), validate, write, chunk_size=10)
+    assert summary["imported"] == 3
+    assert summary["rejected"] == 2
+
+
+def test_failed_chunk_is_rolled_back_and_import_continues(csv_file):
+    conn = FakeConnection()
+
+    def write(cursor, chunk, reject):
+        if chunk[0][1][0] == 1:
+            raise RuntimeError("duplicate key")
+
+    summary = import_csv(conn, csv_file, ("ID", "Name"), validate, write, chunk_size=2)
+    assert summary["failed"] == 2
+    assert summary["imported"] == 2
+    assert conn.rollbacks == 1
+
+
+def test_missing_columns_or_file_returns_none(csv_file, tmp_path):
+    assert import_csv(FakeConnection(), csv_file, ("ID", "Price"), validate, None) is None
+    assert import_csv(FakeConnection(), str(tmp_path / "missing.csv"), ("ID",), validate, None) is None
@@ -0,0 +1,94 @@
+"""Tests for customer_search.TrigramIndex."""
+import customer_search
+from customer_search import TrigramIndex, name_words, search_names, trigrams
+
+
+def make_index():
+    index = TrigramIndex()
+    index.load([
+        (1, "John", "Smith"),
+        (2, "Jane", "Smith"),
+        (3, "Johanna", "Schmidt"),
+        (4, "Bob", "Jones"),
+    ])
+    return index
+
+
+def test_name_words_and_trigrams():
+    assert name_words("O'Brien-Smith  Jr") == ["o", "brien", "smith", "jr"]
+    assert trigrams("smith") == {"  s", " sm", "smi", "mit", "ith", "th "}
+
+
+def test_exact_name_ranks_first():
+    matches = make_index().search("john smith")
+    assert matches[0][:2] == (1, "John Smith")
+    assert matches[0][2] == 1.0
+
+
+def test_misspelled_name_still_matches():
+    ids = [customer_id for customer_id, _, _ in make_index().search("jon smyth")]
+    assert ids[0] == 1
+
+
+def test_unrelated_text_finds_nothing():
+    assert make_index().search("xyzzy") == []
+    assert make_index().search("   ") == []
+
+
+def test_limit_and_tie_order():
+    matches = make_index().search("smith", limit=1)
+    assert [customer_id for customer_id, _, _ in matches] == [1]
+
+
+def test_add_replaces_and_remove_drops_words():
+    index = make_index()
+    index.add(4, "Robert", "Jones")
+    assert [m[0] for m in index.search("robert jones")][:1] == [4]
+    assert index.search("bob") == []
+    index.remove(4)
+    assert index.search("jones") == []
+    assert index.stats()["customers"] == 3
+
+
+def test_clear_marks_index_unbuilt():
+    index = make_index()
+    assert index.built
+    index.clear()
+    assert not index.built
+    assert len(index) == 0
+
+
+class FakeStreamingConnection:
+    """Serves Customer rows to rebuild_name_index through a streaming cursor."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.builds = 0
+
+    def cursor(self, cursor_class=None):
+        return self
+
+    def close(self):
+        pass
+
+    def execute(self, query, params=None):
+        self.builds += 1
+        self.pending = list(self.rows)
+
+    def fetchmany(self, size):
+        batch, self.pending = self.pending[:size], self.pending[size:]
+        return batch
+
+
+def test_search_names_rebuilds_a_stale_index(monkeypatch):
+    index = TrigramIndex()
+    monkeypatch.setattr(customer_search, "name_index", index)
+    conn = FakeStreamingConnection([(1, "John", "Smith")])
+    assert search_names(conn, "john smith")[0][0] == 1
+    conn.rows.append((2, "Jane", "Doe"))
+    assert search_names(conn, "jane doe") == []
+    assert conn.builds == 1
+    # Older than MAX_INDEX_AGE: rebuilt, and the other process's customer is found
+    index.built_at -= customer_search.MAX_INDEX_AGE + 1
+    assert search_names(conn, "jane doe")[0][0] == 2
+    assert conn.builds == 2
@@ -0,0 +1,55 @@
+"""Tests for the pure helpers in database.py."""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from database import coerce_line_items, decode_page_token, encode_page_token
+
+
+def test_coerce_line_items_converts_and_sorts():
+    rows = coerce_line_items([
+        {"product_id": "7", "quantity": "2", "discount": "10"},
+        {"product_id": "3", "quantity": "1", "discount": ""},
+    ])
+    assert rows == [(3, 1, Decimal("0.00")), (7, 2, Decimal("10.00"))]
+
+
+def test_coerce_line_items_merges_repeated_products():
+    rows = coerce_line_items([
+        {"product_id": "5", "quantity": "1"},
+        {"product_id": "5", "quantity": "4"},
+    ])
+    assert rows == [(5, 5, Decimal("0.00"))]
+
+
+@pytest.mark.parametrize("entry", [
+    {"product_id": "1", "quantity": "0"},
+    {"product_id": "1", "quantity": "x"},
+    {"product_id": "1", "quantity": "1", "discount": "101"},
+    {"product_id": "1", "quantity": "1", "discount": "ten"},
+    {"product_id": "1", "quantity": "1", "discount": "NaN"},
+    {"product_id": "1", "quantity": "1", "discount": "Infinity"},
+])
+def test_coerce_line_items_rejects_bad_entries(entry):
+    with pytest.raises(ValueError):
+        coerce_line_items([entry])
+
+
+def test_coerce_line_items_rejects_conflicting_discounts():
+    with pytest.raises(ValueError):
+        coerce_line_items([
+            {"product_id": "5", "quantity": "1", "discount": "5"},
+            {"product_id": "5", "quantity": "1", "discount": "10"},
+        ])
+
+
+def test_page_token_round_trip():
+    token = encode_page_token(date(2024, 2, 29), 12345)
+    assert decode_page_token(token) == (date(2024, 2, 29), 12345)
+
+
+@pytest.mark.parametrize("token", ["", "not a token", encode_page_token(date(2024, 1, 1), 1)[:-4]])
+def test_decode_page_token_rejects_garbage(token):
+    with pytest.raises(ValueError):
+        decode_page_token(token)
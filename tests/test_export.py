@@ -0,0 +1,47 @@
+"""Tests for export.export_query with a fake streaming cursor."""
+import pytest
+
+from export import export_query
+
+
+class FakeCursor:
+    def __init__(self, rows, error=None):
+        self.rows = list(rows)
+        self.error = error
+        self.description = [("ProductID",), ("ProductName",)]
+
+    def execute(self, query, params=None):
+        if self.error:
+            raise self.error
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self, cursor_class=None):
+        return self._cursor
+
+
+def test_export_writes_rows(tmp_path):
+    path = tmp_path / "products.csv"
+    count = export_query(FakeConnection(FakeCursor([(1, "Lure"), (2, "Rod")])), "SELECT", (), str(path))
+    assert count == 2
+    assert path.read_text().splitlines() == ["ProductID,ProductName", "1,Lure", "2,Rod"]
+    assert not (tmp_path / "products.csv.part").exists()
+
+
+def test_failed_query_keeps_previous_report(tmp_path):
+    path = tmp_path / "products.csv"
+    path.write_text("previous report\n")
+    with pytest.raises(RuntimeError):
+        export_query(FakeConnection(FakeCursor([], error=RuntimeError("lost connection"))), "SELECT", (), str(path))
+    assert path.read_text() == "previous report\n"
+    assert not (tmp_path / "products.csv.part").exists()
@@ -0,0 +1,193 @@
+"""Tests for pool.ConnectionPool, using fake connections instead of a database."""
+import threading
+import time
+
+import pytest
+
+from pool import ConnectionPool, PoolTimeoutError
+
+
+class FakeConnection:
+    """Records what the pool does with a connection."""
+
+    def __init__(self, number):
+        self.number = number
+        self.alive = True
+        self.closed = False
+        self.rollbacks = 0
+        self.fail_rollback = False
+
+    def ping(self, reconnect=True):
+        if not self.alive:
+            raise ConnectionError("server has gone away")
+
+    def rollback(self):
+        if self.fail_rollback:
+            raise ConnectionError("lost connection")
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class Factory:
+    def __init__(self):
+        self.opened = []
+
+    def __call__(self):
+        conn = FakeConnection(len(self.opened))
+        self.opened.append(conn)
+        return conn
+
+
+def test_opens_min_size_up_front():
+    factory = Factory()
+    pool = ConnectionPool(factory, min_size=2, max_size=4)
+    assert len(factory.opened) == 2
+    assert pool.stats()["size"] == 2
+    assert pool.stats()["idle"] == 2
+
+
+def test_rejects_bad_sizes():
+    with pytest.raises(ValueError):
+        ConnectionPool(Factory(), min_size=3, max_size=2)
+    with pytest.raises(ValueError):
+        ConnectionPool(Factory(), min_size=0, max_size=0)
+
+
+def test_reuses_most_recently_returned_connection():
+    factory = Factory()
+    pool = ConnectionPool(factory, min_size=0, max_size=2)
+    first = pool.acquire()
+    second = pool.acquire()
+    pool.release(first)
+    pool.release(second)
+    assert pool.acquire() is second
+    assert len(factory.opened) == 2
+
+
+def test_release_rolls_back_open_transaction():
+    pool = ConnectionPool(Factory(), min_size=0, max_size=1)
+    with pool.connection() as conn:
+        pass
+    assert conn.rollbacks == 1
+    assert pool.stats()["idle"] == 1
+
+
+def test_release_discards_connection_that_cannot_roll_back():
+    pool = ConnectionPool(Factory(), min_size=0, max_size=1)
+    conn = pool.acquire()
+    conn.fail_rollback = True
+    pool.release(conn)
+    assert conn.closed
+    assert pool.stats()["size"] == 0
+
+
+def test_never_opens_more_than_max_size():
+    factory = Factory()
+    pool = ConnectionPool(factory, min_size=0, max_size=3, borrow_timeout=5)
+    borrowed = []
+    lock = threading.Lock()
+    release = threading.Event()
+
+    def borrow():
+        with pool.connection() as conn:
+            with lock:
+                borrowed.append(conn)
+            release.wait(5)
+
+    threads = [threading.Thread(target=borrow) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while len(borrowed) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pool.stats()["in_use"] == 3
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert len(borrowed) == 8
+    assert len(factory.opened) == 3
+    assert pool.stats()["size"] == 3
+
+
+def test_failed_open_gives_the_slot_back():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ConnectionError("refused")
+        return FakeConnection(len(calls))
+
+    pool = ConnectionPool(factory, min_size=0, max_size=1)
+    with pytest.raises(ConnectionError):
+        pool.acquire()
+    assert pool.stats()["size"] == 0
+    conn = pool.acquire()
+    assert pool.stats()["size"] == 1
+    pool.release(conn)
+
+
+def test_replaces_connection_that_fails_ping():
+    factory = Factory()
+    pool = ConnectionPool(factory, min_size=1, max_size=1)
+    dead = factory.opened[0]
+    dead.alive = False
+    conn = pool.acquire()
+    assert conn is not dead
+    assert dead.closed
+    stats = pool.stats()
+    assert stats["ping_failures"] == 1
+    assert stats["size"] == 1
+    pool.release(conn)
+
+
+def test_times_out_when_exhausted():
+    pool = ConnectionPool(Factory(), min_size=0, max_size=1, borrow_timeout=0.05)
+    conn = pool.acquire()
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
+    assert pool.stats()["timeouts"] == 1
+    pool.release(conn)
+
+
+def test_waiter_gets_released_connection():
+    pool = ConnectionPool(Factory(), min_size=0, max_size=1, borrow_timeout=5)
+    conn = pool.acquire()
+    timer = threading.Timer(0.05, pool.release, args=(conn,))
+    timer.start()
+    assert pool.acquire() is conn
+    assert pool.stats()["waits"] == 1
+    timer.join()
+
+
+def test_evicts_idle_connections_above_min_size():
+    factory = Factory()
+    pool = ConnectionPool(factory, min_size=1, max_size=3, idle_timeout=0.05)
+    conns = [pool.acquire() for _ in range(3)]
+    for conn in conns:
+        pool.release(conn)
+    time.sleep(0.1)
+    kept = pool.acquire()
+    stats = pool.stats()
+    assert stats["evicted"] == 2
+    assert stats["size"] == 1
+    assert sum(conn.closed for conn in conns) == 2
+    assert not kept.closed
+    pool.release(kept)
+
+
+def test_close_closes_idle_and_later_released_connections():
+    pool = ConnectionPool(Factory(), min_size=0, max_size=2)
+    idle = pool.acquire()
+    borrowed = pool.acquire()
+    pool.release(idle)
+    pool.close()
+    assert idle.closed
+    assert not borrowed.closed
+    pool.release(borrowed)
+    assert borrowed.closed
+    assert pool.stats()["size"] == 0
+    with pytest.raises(RuntimeError):
+        pool.acquire()
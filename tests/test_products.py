@@ -0,0 +1,35 @@
+"""Tests for products.validate_product_row."""
+from decimal import Decimal
+
+import pytest
+
+from products import validate_product_row
+
+
+def row(**overrides):
+    values = {"ProductID": "7", "ProductName": " Muskie Lure ", "QuantityInStock": "12",
+              "BuyPrice": "3.5", "SellPrice": "7.25", "StoreID": "1"}
+    values.update(overrides)
+    return values
+
+
+def test_valid_row_is_converted():
+    assert validate_product_row(row(), {1}) == (7, "Muskie Lure", 12, Decimal("3.50"), Decimal("7.25"), 1)
+
+
+@pytest.mark.parametrize("overrides", [
+    {"BuyPrice": "NaN"},
+    {"SellPrice": "sNaN"},
+    {"BuyPrice": "Infinity"},
+    {"BuyPrice": "-1"},
+    {"SellPrice": "100000000"},
+    {"BuyPrice": "cheap"},
+    {"QuantityInStock": "-1"},
+    {"ProductID": "1.5"},
+    {"ProductName": "  "},
+    {"ProductName": "x" * 101},
+    {"StoreID": "2"},
+])
+def test_bad_rows_raise_value_error(overrides):
+    with pytest.raises(ValueError):
+        validate_product_row(row(**overrides), {1})
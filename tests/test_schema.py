@@ -0,0 +1,136 @@
+"""Tests for schema.migrate(), using a fake connection that records statements."""
+import pytest
+
+from schema import MigrationError, migrate, split_statements
+
+
+class FakeDatabase:
+    """Keeps SchemaVersion and SchemaProgress in memory and logs every other statement."""
+
+    def __init__(self, fail_on=None):
+        self.versions = {}
+        self.progress = {}
+        self.executed = []
+        self.fail_on = fail_on
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.result = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        db = self.db
+        text = " ".join(sql.split())
+        if text.startswith("CREATE TABLE IF NOT EXISTS Schema"):
+            self.result = []
+        elif text.startswith("SELECT Version, Checksum FROM SchemaVersion ORDER BY"):
+            newest = max(db.versions, default=None)
+            self.result = [(newest, db.versions[newest])] if newest else []
+        elif text.startswith("SELECT Version, Checksum FROM SchemaVersion"):
+            self.result = list(db.versions.items())
+        elif text.startswith("SELECT Checksum, StatementsDone FROM SchemaProgress"):
+            self.result = [db.progress[params[0]]] if params[0] in db.progress else []
+        elif text.startswith("INSERT INTO SchemaProgress"):
+            db.progress[params[0]] = (params[1], params[2])
+        elif text.startswith("INSERT INTO SchemaVersion"):
+            db.versions[params[0]] = params[2]
+        elif text.startswith("DELETE FROM SchemaProgress"):
+            db.progress.pop(params[0], None)
+        else:
+            if text == db.fail_on:
+                db.fail_on = None
+                raise RuntimeError("boom")
+            db.executed.append(text)
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return self.result
+
+
+def migration(version, sql, checksum=None):
+    return {"version": version, "name": f"m{version}", "checksum": checksum or f"sum{version}", "sql": sql}
+
+
+SCRIPT = """
+-- comment; with a semicolon
+CREATE TABLE A (ID INT);
+INSERT INTO A VALUES (1);
+SET @sql = 'DO 0';
+PREPARE stmt FROM @sql;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+CREATE TABLE B (ID INT)
+"""
+
+
+def test_split_statements_drops_comments():
+    assert split_statements(SCRIPT)[0] == "CREATE TABLE A (ID INT)"
+    assert len(split_statements(SCRIPT)) == 7
+
+
+def test_applies_pending_migrations_in_order():
+    db = FakeDatabase()
+    db.versions[1] = "sum1"
+    applied = migrate(db, [migration(1, "CREATE TABLE X (ID INT)"), migration(2, SCRIPT)])
+    assert applied == [2]
+    assert db.executed == split_statements(SCRIPT)
+    assert db.versions[2] == "sum2"
+    assert db.progress == {}
+
+
+def test_current_schema_runs_nothing():
+    db = FakeDatabase()
+    db.versions[1] = "sum1"
+    assert migrate(db, [migration(1, "CREATE TABLE X (ID INT)")]) == []
+    assert db.executed == []
+
+
+def test_failed_migration_resumes_after_last_completed_statement():
+    db = FakeDatabase(fail_on="CREATE TABLE B (ID INT)")
+    db.versions[1] = "sum1"
+    migrations = [migration(1, ""), migration(2, SCRIPT)]
+    with pytest.raises(MigrationError):
+        migrate(db, migrations)
+    assert 2 not in db.versions
+    assert db.progress[2] == ("sum2", 2)
+
+    db.executed = []
+    assert migrate(db, migrations) == [2]
+    # The session block is repeated as a whole; the table and insert before it are not
+    assert db.executed == split_statements(SCRIPT)[2:]
+    assert db.progress == {}
+
+
+def test_partly_applied_migration_must_not_change():
+    db = FakeDatabase(fail_on="INSERT INTO A VALUES (1)")
+    db.versions[1] = "sum1"
+    with pytest.raises(MigrationError):
+        migrate(db, [migration(1, ""), migration(2, SCRIPT)])
+    with pytest.raises(MigrationError, match="partly applied"):
+        migrate(db, [migration(1, ""), migration(2, SCRIPT, checksum="edited")])
+
+
+def test_edited_applied_migration_is_refused():
+    db = FakeDatabase()
+    db.versions[1] = "sum1"
+    with pytest.raises(MigrationError, match="changed after it was applied"):
+        migrate(db, [migration(1, "", checksum="edited"), migration(2, SCRIPT)])
@@ -1,10 +1,57 @@
-from database import add_products_to_transaction, get_transaction, get_transaction_price, add_transaction
+from database import add_products_to_transaction, get_transaction, add_transaction, get_transaction_price
+from checkout import checkout, CheckoutError
+from product_cache import get_catalog_entry
+
+
+def collect_product_entries(conn=None):
+    """
+    Prompts for products until the user types 'done'.
+
+    Args:
+        conn (pymysql.connections.Connection): When given, each product's name and
+                                               price are shown from the catalog cache.
+
+    Returns:
+        list: Dictionaries with product_id, quantity and discount as typed by the user.
+    """
+    # Using a loop to allow adding any number of products
+    product_entries = []
+    while True:
+        # Get product ID or exit the loop if user is done
+        product_id = input("Enter Product ID (or 'done' to finish): ")
+        if product_id.lower() == "done":
+            break
+
+        # Show what was scanned; repeat scans of a product are answered from memory
+        if conn is not None and product_id.isdigit():
+            entry = get_catalog_entry(conn, product_id)
+            if entry is None:
+                print("Unknown product.")
+                continue
+            print(f"{entry[1]} @ {entry[3]}")
+
+        # Get quantity of this product in the transaction
+        quantity = input("Enter Quantity: ")
+
+        # Get discount percentage applied to this product
+        # Discounts are stored as percentages (e.g., 10 for 10%)
+        discount = input("Discount Applied %: ")
+
+        # Add the product data to our collection
+        # Using dictionary to organize the data for each product
+        product_entries.append({
+            'product_id': product_id,  # The product identifier
+            'quantity': quantity,  # How many units were purchased
+            'discount': discount  # Discount percentage applied
+        })
+    return product_entries
 
 
 def transactions(conn):
     print("1. Add Transaction")
     print("2. Add Product to Transaction")
     print("3. Calculate Transaction Total")
+    print("4. Checkout (record a complete sale or return)")
     sub_choice = int(input("Enter choice: "))
 
     # Using match-case to handle transaction menu options
@@ -30,33 +77,12 @@ def transactions(conn):
             transaction_id = int(input("Enter Transaction ID: "))
 
             # Collect multiple products to add to the transaction
-            # Using a loop to allow adding any number of products
-            product_entries = []
-            while True:
-                # Get product ID or exit the loop if user is done
-                product_id = input("Enter Product ID (or 'done' to finish): ")
-                if product_id.lower() == "done":
-                    break
-
-                # Get quantity of this product in the transaction
-                quantity = input("Enter Quantity: ")
-
-                # Get discount percentage applied to this product
-                # Discounts are stored as percentages (e.g., 10 for 10%)
-                discount = input("Discount Applied %: ")
-
-                # Add the product data to our collection
-                # Using dictionary to organize the data for each product
-                product_entries.append({
-                    'product_id': product_id,  # The product identifier
-                    'quantity': quantity,  # How many units were purchased
-                    'discount': discount  # Discount percentage applied
-                })
+            product_entries = collect_product_entries(conn)
 
             # Add all products to the transaction in a single database operation
             # This ensures all products are added or none are (transaction integrity)
-            # The function handles the SQL insert operations for all products
-            add_products_to_transaction(conn, transaction_id, product_entries)
+            # The function converts the typed-in values and inserts all rows at once
+            add_products_to_transaction(conn, transaction_id, product_entries, show=True)
 
             # Option 3: Calculate the total price of a transaction
             # Computes the sum of all products in a transaction
@@ -70,10 +96,36 @@ def transactions(conn):
             # This shows what items are included in the total
             get_transaction(conn, transactionid)
 
-            # Calculate and display the total price of all items in the transaction
-            # This function computes the sum based on product prices and quantities
-            totalprice = get_transaction_price(conn, transactionid)
-            print("Transaction Total: " + str(totalprice))
+            # Price every line of the transaction in one query
+            # Each line is sell price × quantity less the discount applied to it
+            price = get_transaction_price(conn, transactionid)
+            if price is None:
+                return
+            for line in price["lines"]:
+                print(f"ProductID: {line['product_id']}, Quantity: {line['quantity']}, "
+                      f"Unit Price: {line['unit_price']}, Discount: {line['discount_percentage']}%, "
+                      f"Line Total: {line['total']}")
+            print(f"Subtotal: {price['gross']}, Discounts: {price['discount']}")
+            print("Transaction Total: " + str(price["total"]))
+
+        # Option 4: Record a complete sale or return in one step
+        # Creates the transaction, adds its products, updates stock and computes the total together
+        case 4:
+            storeid = int(input("Enter Store ID: "))
+            customerid = int(input("Enter Customer ID: "))
+            cashierid = int(input("Enter Cashier ID: "))
+            purchasedate = input("Enter Purchase Date: ")
+            Transactiontype = input("Transaction Type (Buy/Return): ") or "Buy"
+            product_entries = collect_product_entries(conn)
+            try:
+                result = checkout(conn, storeid, customerid, cashierid, purchasedate, product_entries, Transactiontype)
+                print(f"Transaction id: {result['transaction_id']}, Items: {result['items']}, "
+                      f"Units: {result['units']}, Transaction Total: {result['total']}")
+            except (CheckoutError, ValueError) as e:
+                # Nothing was written; show why the checkout was refused
+                print(f"Checkout failed: {e}")
+            except Exception as e:
+                print(f"Error during checkout: {e}")
 
             # Handle invalid transaction menu choice with wildcard pattern match
             # Provides feedback if user enters an unrecognized option